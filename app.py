@@ -1,49 +1,204 @@
-from flask import Flask, render_template, request, jsonify, send_file
-from scraper import scrape_delhi_high_court
+from flask import (
+    Flask, Response, render_template, request, jsonify, make_response, send_file, send_from_directory, url_for,
+    session
+)
+from scraper import (
+    DelhiHighCourtScraper, fetch_case_metadata, Deadline, DeadlineExceeded,
+    CASE_NOT_FOUND, DEADLINE_EXCEEDED, DEFAULT_CASE_TYPES, DEFAULT_CASE_YEARS
+)
+from database import (
+    init_db, get_connection, log_query, search_cases, search_orders, get_hearings, iter_hearings, get_hearings_version, is_known_missing, record_missing_case,
+    clear_missing_case, load_case_metadata, store_case_metadata, get_last_known_result, is_mock_response, DEFAULT_COURT,
+    record_lookup, get_stats, get_page_timings, get_case_page_loads, LOOKUP_OUTCOMES, UPSTREAM_OUTCOMES,
+    UPSTREAM_FAILURES
+)
+from circuit_breaker import CircuitBreaker
+from async_scraper import scrape_engine
+from courts import get_court, registered_courts, SCRAPER_BACKEND
+from job_queue import enqueue_job, get_job, start_job_workers
+from scheduler import scrape_scheduler, QueueTimeout, PRIORITY_CLASSES, INTERACTIVE, API, BACKGROUND
+from exports import hearings_csv, hearings_ics, local_to_utc
+from profiling import profile_request, should_profile, stage as profile_stage
 import sqlite3
+import asyncio
+import gzip
+import hashlib
 import json
+import mimetypes
 import os
+import threading
+import time
 import requests
-from datetime import datetime
+from datetime import datetime, date, timedelta
 
 app = Flask(__name__)
 
+# Case type / filing year options change rarely, so they are scraped at most once per TTL
+CASE_METADATA_TTL = int(os.environ.get('CASE_METADATA_TTL', 7 * 24 * 3600))
+# Minimum gap between database checks / refresh attempts while the options are stale
+CASE_METADATA_RETRY = int(os.environ.get('CASE_METADATA_RETRY', 15 * 60))
+# How long a "case not found" answer is reused before the court is asked again
+NEGATIVE_CACHE_TTL = int(os.environ.get('NEGATIVE_CACHE_TTL', 15 * 60))
+# Party search is experimental (its court page and form ids are unverified): off unless set to 1
+PARTY_SEARCH_ENABLED = os.environ.get('PARTY_SEARCH_ENABLED', '0') == '1'
+# Upper bound on result pages walked by one party search
+PARTY_SEARCH_MAX_PAGES = int(os.environ.get('PARTY_SEARCH_MAX_PAGES', 10))
+# Default window of the hearings export, in days from today
+EXPORT_HEARINGS_DAYS = int(os.environ.get('EXPORT_HEARINGS_DAYS', 180))
+# Time budget of one case fetch; must stay below gunicorn's worker timeout (30s)
+SCRAPE_DEADLINE_SECONDS = float(os.environ.get('SCRAPE_DEADLINE_SECONDS', 25))
+# JSON responses at least this large are gzip-compressed on the fly
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+# Where /api/download-pdf saves order PDFs
+DOWNLOAD_DIR = os.environ.get('DOWNLOAD_DIR', '/downloads')
+# Signs the session cookie that marks the web UI's lookups interactive; set it to one value on every instance
+# (the random default is shared by the workers of one gunicorn master, which loads the app before forking)
+SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(24).hex()
+
+app.secret_key = SECRET_KEY
+app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+
+# Party search and the form options are Delhi High Court features
+delhi_court = get_court(DEFAULT_COURT)
+court_breaker = delhi_court.breaker
+# Party search failures (e.g. a changed search page) must never trip case lookups
+party_search_breaker = CircuitBreaker(
+    f'{delhi_court.host} party search',
+    window=int(os.environ.get('CIRCUIT_WINDOW', 20)),
+    min_calls=int(os.environ.get('CIRCUIT_MIN_CALLS', 5)),
+    failure_rate=float(os.environ.get('CIRCUIT_FAILURE_RATE', 0.5)),
+    slow_call_seconds=float(os.environ.get('CIRCUIT_SLOW_SECONDS', 25)),
+    open_seconds=float(os.environ.get('CIRCUIT_OPEN_SECONDS', 60))
+)
+
+# Fingerprinted static assets written by build_assets.py (absent in development)
+ASSET_DIST_DIR = os.path.join(app.static_folder, 'dist')
+try:
+    with open(os.path.join(ASSET_DIST_DIR, 'manifest.json')) as manifest_file:
+        ASSET_MANIFEST = json.load(manifest_file)
+except (OSError, ValueError):
+    ASSET_MANIFEST = {}
 
-# Database setup
-def init_db():
-    conn = sqlite3.connect('court_data.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS queries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            case_type TEXT,
-            case_number TEXT,
-            filing_year TEXT,
-            query_timestamp DATETIME,
-            raw_response TEXT,
-            parsed_data TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
 
 # Initialize database on startup
 init_db()
 
 
-def log_query(case_type, case_number, filing_year, raw_response, parsed_data):
-    conn = sqlite3.connect('court_data.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO queries (case_type, case_number, filing_year, query_timestamp, raw_response, parsed_data)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (case_type, case_number, filing_year, datetime.now(), raw_response, json.dumps(parsed_data)))
-    conn.commit()
-    conn.close()
+# In-process copy of the case metadata so validation never touches the database or browser
+_case_metadata = {
+    'case_types': DEFAULT_CASE_TYPES,
+    'years': DEFAULT_CASE_YEARS,
+    'case_type_set': frozenset(DEFAULT_CASE_TYPES),
+    'year_set': frozenset(DEFAULT_CASE_YEARS),
+    'fetched_at': None,
+    'checked_at': 0
+}
+_case_metadata_refresh_lock = threading.Lock()
+
+
+def set_case_metadata(case_types, years, fetched_at):
+    _case_metadata.update({
+        'case_types': case_types,
+        'years': years,
+        'case_type_set': frozenset(case_types),
+        'year_set': frozenset(years),
+        'fetched_at': fetched_at
+    })
+
+
+def refresh_case_metadata():
+    """Scrape the search form options and store them (runs in a background thread)"""
+    try:
+        with delhi_court.capacity(BACKGROUND):
+            metadata = fetch_case_metadata(headless=True)
+        if metadata['case_types'] and metadata['years']:
+            fetched_at = time.time()
+            store_case_metadata(metadata, fetched_at)
+            set_case_metadata(metadata['case_types'], metadata['years'], fetched_at)
+            print(f"Case metadata refreshed: {len(metadata['case_types'])} case types")
+    except Exception as e:
+        print('Case metadata refresh failed', e)
+    finally:
+        _case_metadata_refresh_lock.release()
+
+
+def get_case_metadata():
+    """
+    Return the cached case type/year options without ever blocking on a scrape.
+    Stale or missing options are refreshed in a background thread; until then the
+    last stored options (or the built-in defaults) are served.
+    """
+    now = time.time()
+    fetched_at = _case_metadata['fetched_at']
+    if fetched_at and now - fetched_at < CASE_METADATA_TTL:
+        return _case_metadata
+
+    if now - _case_metadata['checked_at'] >= CASE_METADATA_RETRY:
+        _case_metadata['checked_at'] = now
+        try:
+            stored = load_case_metadata()
+        except sqlite3.Error as e:
+            print('Failed to load case metadata', e)
+            stored = None
+        if stored:
+            metadata, fetched_at = stored
+            set_case_metadata(metadata['case_types'], metadata['years'], fetched_at)
+
+        # Another worker may already have refreshed the stored copy; the stub backend has no form to scrape
+        if (not fetched_at or now - fetched_at >= CASE_METADATA_TTL) and SCRAPER_BACKEND != 'stub':
+            if _case_metadata_refresh_lock.acquire(blocking=False):
+                threading.Thread(target=refresh_case_metadata, daemon=True).start()
+
+    return _case_metadata
+
+
+@app.template_global()
+def asset_url(filename):
+    """URL of a static asset, fingerprinted when build_assets.py has been run"""
+    return url_for('static', filename=ASSET_MANIFEST.get(filename, filename))
+
+
+@app.route('/static/dist/<path:filename>')
+def fingerprinted_static(filename):
+    """Serve fingerprinted assets forever-cacheable, using a precompressed variant when accepted"""
+    response = None
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(ASSET_DIST_DIR, filename + suffix)):
+            response = send_from_directory(ASSET_DIST_DIR, filename + suffix,
+                                           mimetype=mimetypes.guess_type(filename)[0])
+            response.headers['Content-Encoding'] = encoding
+            break
+    if response is None:
+        response = send_from_directory(ASSET_DIST_DIR, filename)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+@app.after_request
+def compress_json(response):
+    """gzip large JSON API responses when the client accepts it"""
+    if (response.mimetype != 'application/json' or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or not request.accept_encodings['gzip']):
+        return response
+    
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    
+    response.set_data(gzip.compress(data, compresslevel=5))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    metadata = get_case_metadata()
+    # Lookups from this page's session are a person waiting (see request_priority)
+    session['web_ui'] = True
+    return render_template('index.html', case_types=metadata['case_types'], years=metadata['years'],
+                           party_search=PARTY_SEARCH_ENABLED)
 
 @app.route('/health')
 def health_check():
@@ -51,54 +206,569 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'service': 'court-scraper'
+        'service': 'court-scraper',
+        'upstream': court_breaker.snapshot(),
+        'partySearchUpstream': party_search_breaker.snapshot() if PARTY_SEARCH_ENABLED else None,
+        'scheduler': scrape_scheduler.snapshot(),
+        'courts': {court.code: court.snapshot() for court in registered_courts()}
+    })
+
+@app.route('/api/courts')
+def courts():
+    """Courts that /api/fetch-case can look cases up in (the "court" parameter), with this process's probe verdicts"""
+    return jsonify({
+        'success': True,
+        'default': DEFAULT_COURT,
+        'courts': [
+            {'code': court.code, 'name': court.name, 'probes': court.snapshot()['probes']}
+            for court in registered_courts()
+        ]
+    })
+
+
+def request_priority():
+    """
+    Scheduling class of the current request, decided by the server: interactive for the
+    web UI's session, api for other callers. X-Scrape-Priority can only lower it.
+    """
+    priority = INTERACTIVE if session.get('web_ui') else API
+    requested = request.headers.get('X-Scrape-Priority')
+    if requested in PRIORITY_CLASSES and PRIORITY_CLASSES.index(requested) > PRIORITY_CLASSES.index(priority):
+        return requested
+    return priority
+
+
+def scheduler_busy_response(court, case_type, case_number, filing_year):
+    record_lookup('busy', court.code, (case_type, case_number, filing_year))
+    return serve_stale_case(court, case_type, case_number, filing_year, 503,
+                            f'All {court.name} lookups are busy. Please try again shortly.')
+
+
+def serve_stale_case(court, case_type, case_number, filing_year, status_code=503,
+                     error='The court website is currently unavailable. Please try again later.'):
+    """Degraded-mode answer while the court website is unavailable: the last stored result"""
+    stored = get_last_known_result(case_type, case_number, filing_year, court.code)
+    retry_after = court.breaker.retry_after()
+    if stored is None:
+        response = jsonify({'error': error})
+        response.status_code = status_code
+    else:
+        parsed_data, fetched_at = stored
+        response = jsonify({
+            'success': True,
+            'data': parsed_data,
+            'stale': True,
+            'fetchedAt': fetched_at,
+            'message': 'The court website is currently unavailable; showing the last known data.'
+        })
+    if retry_after:
+        response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def check_case_request(data):
+    """
+    Validate a case lookup; returns ((court adapter, (case_type, case_number, filing_year)), None)
+    or (None, error response)
+    """
+    data = data or {}
+    court = get_court(data.get('court') or DEFAULT_COURT)
+    case_type = data.get('caseType')
+    case_number = data.get('caseNumber')
+    filing_year = data.get('filingYear')
+    
+    if court is None:
+        return None, (jsonify({'error': f"Unknown court: {data.get('court')}"}), 400)
+    if not all([case_type, case_number, filing_year]):
+        return None, (jsonify({'error': 'All fields are required'}), 400)
+    
+    # Reject unknown options before paying for a browser session
+    filing_year = str(filing_year)
+    # The Delhi High Court options are scraped from its search form; other courts declare theirs
+    options = get_case_metadata() if court is delhi_court else court.options
+    if case_type not in options['case_type_set']:
+        return None, (jsonify({'error': f'Invalid case type: {case_type}'}), 400)
+    if filing_year not in options['year_set']:
+        return None, (jsonify({'error': f'Invalid filing year: {filing_year}'}), 400)
+    return (court, (case_type, case_number, filing_year)), None
+
+def answer_without_scrape(court, case_type, case_number, filing_year):
+    """The response for a lookup that must not reach the court site, or None to scrape"""
+    # Repeat lookups of a missing case are answered without a browser
+    if NEGATIVE_CACHE_TTL > 0 and is_known_missing(case_type, case_number, filing_year, court.code):
+        record_lookup('cached', court.code, (case_type, case_number, filing_year))
+        return jsonify({'error': CASE_NOT_FOUND, 'cached': True}), 404
+    
+    if not court.breaker.allow_request():
+        record_lookup('stale', court.code, (case_type, case_number, filing_year))
+        return serve_stale_case(court, case_type, case_number, filing_year)
+    return None
+
+def lookup_outcome(parsed_data, raw_response):
+    """Analytics outcome of a finished scrape"""
+    if raw_response == CASE_NOT_FOUND:
+        return 'not_found'
+    if raw_response == DEADLINE_EXCEEDED:
+        return 'deadline'
+    if parsed_data is None:
+        return 'failed'
+    return 'mock' if is_mock_response(raw_response) else 'ok'
+
+def case_lookup_response(court, case_type, case_number, filing_year, parsed_data, raw_response, elapsed):
+    """Record the scrape outcome and turn it into the API response"""
+    # "Not found" is a real answer from the court; mock data means the scrape failed
+    outcome = lookup_outcome(parsed_data, raw_response)
+    scrape_failed = outcome in UPSTREAM_FAILURES
+    court.breaker.record(not scrape_failed, elapsed)
+    # Results that reach log_query are counted in its transaction; every other outcome here
+    if parsed_data is None or (scrape_failed and court.breaker.state != CircuitBreaker.CLOSED):
+        record_lookup(outcome, court.code, (case_type, case_number, filing_year))
+    
+    if scrape_failed and court.breaker.state != CircuitBreaker.CLOSED:
+        return serve_stale_case(court, case_type, case_number, filing_year)
+    
+    if raw_response == DEADLINE_EXCEEDED:
+        return serve_stale_case(court, case_type, case_number, filing_year, 504,
+                                'The court website is responding too slowly. Please try again later.')
+    
+    if raw_response == CASE_NOT_FOUND:
+        if NEGATIVE_CACHE_TTL > 0:
+            record_missing_case(case_type, case_number, filing_year, NEGATIVE_CACHE_TTL, court.code)
+        return jsonify({'error': CASE_NOT_FOUND}), 404
+    
+    if parsed_data is None:
+        return jsonify({'error': f'Failed to fetch case data: {raw_response}'}), 500
+    
+    # Log the query
+    log_query(case_type, case_number, filing_year, raw_response, parsed_data, court.code)
+    clear_missing_case(case_type, case_number, filing_year, court.code)
+    
+    return jsonify({
+        'success': True,
+        'data': parsed_data
     })
 
 @app.route('/api/fetch-case', methods=['POST'])
 def fetch_case():
+    # Opt-in per request (X-Profile header or PROFILE_SAMPLE_RATE); see profiling.py
+    with profile_request('fetch_case', should_profile(request.headers.get('X-Profile'))) as profile:
+        response = make_response(lookup_case())
+    if profile is not None:
+        response.headers['X-Profile-Id'] = profile.id
+    return response
+
+def lookup_case():
     try:
         print("fetching case")
-        data = request.get_json()
-        case_type = data.get('caseType')
-        case_number = data.get('caseNumber')
-        filing_year = data.get('filingYear')
+        # The budget starts with the request, so validation and queueing count against it too
+        deadline = Deadline(SCRAPE_DEADLINE_SECONDS)
+        lookup, error_response = check_case_request(request.get_json())
+        if error_response is not None:
+            return error_response
+        court, case = lookup
         
-        if not all([case_type, case_number, filing_year]):
-            return jsonify({'error': 'All fields are required'}), 400
+        early_response = answer_without_scrape(court, *case)
+        if early_response is not None:
+            return early_response
         
-        # Scrape the court website (headless mode for production)
-        parsed_data, raw_response = scrape_delhi_high_court(case_type, case_number, filing_year, headless=True)
+        # Scrape the court website within the court's own budget and a shared browser slot
+        try:
+            with court.capacity(request_priority(), timeout=deadline.remaining()):
+                started = time.monotonic()
+                try:
+                    parsed_data, raw_response = court.scrape_case(*case, deadline=deadline)
+                except Exception:
+                    court.breaker.record(False, time.monotonic() - started)
+                    record_lookup('failed', court.code, case)
+                    raise
+        except QueueTimeout:
+            return scheduler_busy_response(court, *case)
+        with profile_stage('store'):
+            return case_lookup_response(court, *case, parsed_data, raw_response, time.monotonic() - started)
         
-        if parsed_data is None:
-            return jsonify({'error': f'Failed to fetch case data: {raw_response}'}), 500
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@app.route('/api/async/fetch-case', methods=['POST'])
+async def fetch_case_async():
+    """fetch_case on the shared asyncio engine: browser stages are pooled, the order lookup is plain HTTP"""
+    try:
+        deadline = Deadline(SCRAPE_DEADLINE_SECONDS)
+        lookup, error_response = check_case_request(request.get_json())
+        if error_response is not None:
+            return error_response
+        court, case = lookup
         
-        # Log the query
-        log_query(case_type, case_number, filing_year, raw_response, parsed_data)
+        early_response = answer_without_scrape(court, *case)
+        if early_response is not None:
+            return early_response
         
-        return jsonify({
+        started = time.monotonic()
+        try:
+            parsed_data, raw_response = await asyncio.wrap_future(scrape_engine.submit(
+                scrape_engine.scrape_case(*case, deadline=deadline, priority=request_priority(), court=court.code)
+            ))
+        except QueueTimeout:
+            return scheduler_busy_response(court, *case)
+        except Exception:
+            court.breaker.record(False, time.monotonic() - started)
+            record_lookup('failed', court.code, case)
+            raise
+        return case_lookup_response(court, *case, parsed_data, raw_response, time.monotonic() - started)
+        
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Queue a case lookup for whichever app instance has a free browser; poll /api/jobs/<id> for the result"""
+    try:
+        lookup, error_response = check_case_request(request.get_json())
+        if error_response is not None:
+            return error_response
+        court, case = lookup
+        
+        # A probe job refreshes a stored case without a browser when a cheap check shows no change
+        job_id, created = enqueue_job(*case, court=court.code, priority=request_priority(),
+                                      probe=bool((request.get_json() or {}).get('probe')))
+        response = jsonify({
             'success': True,
-            'data': parsed_data
+            'jobId': job_id,
+            'created': created,
+            'statusUrl': url_for('job_status', job_id=job_id)
         })
+        response.status_code = 202
+        return response
         
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+@app.route('/api/jobs/<int:job_id>')
+def job_status(job_id):
+    try:
+        job = get_job(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        return jsonify({
+            'success': True,
+            'jobId': job['id'],
+            'court': job['court'],
+            'caseType': job['case_type'],
+            'caseNumber': job['case_number'],
+            'filingYear': job['filing_year'],
+            'priority': job['priority'],
+            'probe': bool(job['probe']),
+            'status': job['status'],
+            'attempts': job['attempts'],
+            'leaseOwner': job['lease_owner'],
+            'enqueuedAt': job['enqueued_at'],
+            'finishedAt': job['finished_at'],
+            'error': job['error'],
+            'data': json.loads(job['result']) if job['result'] else None
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch job: {str(e)}'}), 500
+
+@app.route('/api/search-party', methods=['POST'])
+def search_party():
+    """Stream party-name search results as newline-delimited JSON, one row per line (experimental)"""
+    if not PARTY_SEARCH_ENABLED:
+        return jsonify({'error': 'Party search is not enabled'}), 404
+    data = request.get_json() or {}
+    party_name = (data.get('partyName') or '').strip()
+    filing_year = str(data.get('filingYear') or '') or None
+    
+    if len(party_name) < 3:
+        return jsonify({'error': 'Party name must be at least 3 characters'}), 400
+    if filing_year and filing_year not in get_case_metadata()['year_set']:
+        return jsonify({'error': f'Invalid filing year: {filing_year}'}), 400
+    
+    try:
+        max_pages = min(int(data.get('maxPages') or PARTY_SEARCH_MAX_PAGES), PARTY_SEARCH_MAX_PAGES)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'maxPages must be a number'}), 400
+    
+    if not party_search_breaker.allow_request():
+        response = jsonify({'error': 'The court website is currently unavailable. Please try again later.'})
+        response.headers['Retry-After'] = str(party_search_breaker.retry_after())
+        return response, 503
+    
+    priority = request_priority()
+    # Like fetch_case, the whole stream must end before gunicorn's worker timeout kills it with its browser
+    deadline = Deadline(SCRAPE_DEADLINE_SECONDS)
+    
+    def generate():
+        scraper = DelhiHighCourtScraper(headless=True, deadline=deadline, court=delhi_court.code)
+        rows = scraper.iter_party_search(party_name, filing_year, max_pages)
+        started = time.monotonic()
+        count = 0
+        try:
+            # The slot is held while the browser walks the result pages
+            with delhi_court.capacity(priority, timeout=deadline.remaining()):
+                started = time.monotonic()
+                for row in rows:
+                    if count == 0:
+                        # The first row proves the court answered; record latency up to that point
+                        party_search_breaker.record(True, time.monotonic() - started)
+                    count += 1
+                    yield json.dumps(row) + '\n'
+                if count == 0:
+                    party_search_breaker.record(True, time.monotonic() - started)
+            yield json.dumps({'done': True, 'count': count}) + '\n'
+        except QueueTimeout:
+            yield json.dumps({'error': 'All court lookups are busy. Please try again shortly.', 'count': 0}) + '\n'
+        except DeadlineExceeded:
+            if count == 0:
+                party_search_breaker.record(False, time.monotonic() - started)
+            # The rows already sent stand; the search just did not get through every page
+            yield json.dumps({'done': True, 'count': count, 'partial': True}) + '\n'
+        except Exception as e:
+            if count == 0:
+                party_search_breaker.record(False, time.monotonic() - started)
+            yield json.dumps({'error': f'Search failed: {str(e)}', 'count': count}) + '\n'
+        finally:
+            # Closes the browser even when the client disconnects mid-stream or the search never started
+            rows.close()
+            scraper.close()
+    
+    response = Response(generate(), mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/search')
+def search():
+    """Ranked full-text search over previously fetched cases (no scraping)"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be numbers'}), 400
+    
+    try:
+        total, results = search_cases(query, page, per_page)
+        return jsonify({
+            'success': True,
+            'query': query,
+            'page': page,
+            'perPage': per_page,
+            'total': total,
+            'results': results
+        })
+    except Exception as e:
+        return jsonify({'error': f'Search failed: {str(e)}'}), 500
+
+@app.route('/api/orders/search')
+def orders_search():
+    """Ranked full-text search inside indexed order PDFs, with <mark>-highlighted snippets"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be numbers'}), 400
+    
+    try:
+        total, results = search_orders(query, page, per_page)
+        return jsonify({
+            'success': True,
+            'query': query,
+            'page': page,
+            'perPage': per_page,
+            'total': total,
+            'results': results
+        })
+    except Exception as e:
+        return jsonify({'error': f'Search failed: {str(e)}'}), 500
+
+@app.route('/api/hearings')
+def hearings():
+    """Tracked cases heard between ?from= and ?to= (ISO dates, default: the next 7 days), optionally per ?court= / ?courtCode="""
+    try:
+        start_date = date.fromisoformat(request.args.get('from') or date.today().isoformat())
+        end_date = date.fromisoformat(request.args.get('to') or (start_date + timedelta(days=7)).isoformat())
+    except ValueError:
+        return jsonify({'error': 'from and to must be dates in YYYY-MM-DD format'}), 400
+    
+    court_no = request.args.get('court') or None
+    court_code = request.args.get('courtCode') or None
+    
+    try:
+        results = get_hearings(start_date.isoformat(), end_date.isoformat(), court_no, court=court_code)
+        return jsonify({
+            'success': True,
+            'from': start_date.isoformat(),
+            'to': end_date.isoformat(),
+            'court': court_no,
+            'courtCode': court_code,
+            'hearings': results
+        })
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch hearings: {str(e)}'}), 500
+
+@app.route('/api/export/hearings')
+@app.route('/api/export/hearings.<fmt>')
+def export_hearings(fmt=None):
+    """Stream upcoming hearings as CSV or iCalendar (?format=csv|ics), with ETag/Last-Modified"""
+    fmt = (fmt or request.args.get('format') or 'csv').lower()
+    if fmt not in ('csv', 'ics'):
+        return jsonify({'error': 'format must be csv or ics'}), 400
+    
+    try:
+        start_date = date.fromisoformat(request.args.get('from') or date.today().isoformat())
+        end_date = date.fromisoformat(request.args.get('to') or (start_date + timedelta(days=EXPORT_HEARINGS_DAYS)).isoformat())
+    except ValueError:
+        return jsonify({'error': 'from and to must be dates in YYYY-MM-DD format'}), 400
+    
+    court_no = request.args.get('court') or None
+    court_code = request.args.get('courtCode') or None
+    if court_code and get_court(court_code) is None:
+        return jsonify({'error': f'Unknown court: {court_code}'}), 400
+    start, end = start_date.isoformat(), end_date.isoformat()
+    
+    # Polling calendar clients get a 304 from one indexed aggregate query, without a rebuild
+    count, last_updated = get_hearings_version(start, end, court_no, court_code)
+    etag = hashlib.sha1(f'{fmt}|{start}|{end}|{court_no}|{court_code}|{count}|{last_updated}'.encode()).hexdigest()
+    # updated_at is naive local time; HTTP dates are UTC
+    last_modified = local_to_utc(last_updated)
+    if last_modified:
+        last_modified = last_modified.replace(microsecond=0)
+    
+    if etag in request.if_none_match or (
+        not request.if_none_match and last_modified and request.if_modified_since
+        and request.if_modified_since >= last_modified
+    ):
+        response = Response(status=304)
+    else:
+        rows = iter_hearings(start, end, court_no, court_code)
+        if fmt == 'ics':
+            courts_named = [get_court(court_code)] if court_code else registered_courts()
+            calendar_name = ' / '.join(court.name for court in courts_named) + ' hearings'
+            court_names = {court.code: court.name for court in registered_courts()}
+            response = Response(hearings_ics(rows, calendar_name, court_names), mimetype='text/calendar')
+        else:
+            response = Response(hearings_csv(rows), mimetype='text/csv')
+        response.headers['Content-Disposition'] = f'attachment; filename=hearings-{start}-{end}.{fmt}'
+    
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, max-age=300'
+    return response
+
+@app.route('/api/stats')
+def stats():
+    """Usage analytics from the incrementally maintained summary tables (?hours=, ?top=, ?court=)"""
+    try:
+        hours = min(max(int(request.args.get('hours', 24)), 1), 24 * 31)
+        top = min(max(int(request.args.get('top', 10)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'hours and top must be numbers'}), 400
+    
+    court_code = request.args.get('court') or None
+    
+    try:
+        since = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+        totals, hourly, top_cases = get_stats(since.strftime('%Y-%m-%d %H:00'), top, court_code)
+        upstream = sum(totals.get(outcome, 0) for outcome in UPSTREAM_OUTCOMES)
+        failures = sum(totals.get(outcome, 0) for outcome in UPSTREAM_FAILURES)
+        return jsonify({
+            'success': True,
+            'court': court_code,
+            'totals': {outcome: totals.get(outcome, 0) for outcome in LOOKUP_OUTCOMES},
+            'upstreamFailureRate': round(failures / upstream, 4) if upstream else None,
+            'mockFallbacks': totals.get('mock', 0),
+            # Refreshes a change probe settled without a browser, against full scrapes
+            'probeOnly': totals.get('unchanged', 0),
+            'fullScrapes': upstream,
+            'hourly': [
+                {'hour': hour, 'lookups': sum(outcomes.values()), 'outcomes': outcomes}
+                for hour, outcomes in hourly.items()
+            ],
+            'topCases': top_cases
+        })
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch stats: {str(e)}'}), 500
+
+@app.route('/api/page-timings')
+def page_timings():
+    """
+    Browser-side timing of court page loads: hourly averages per stage and the slowest
+    subresources (?hours=, ?top=, ?court=); ?caseType=&caseNumber=&filingYear= adds
+    the latest page loads of that case
+    """
+    try:
+        hours = min(max(int(request.args.get('hours', 24)), 1), 24 * 31)
+        top = min(max(int(request.args.get('top', 10)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'hours and top must be numbers'}), 400
+    
+    court_code = request.args.get('court') or None
+    case = (request.args.get('caseType'), request.args.get('caseNumber'), request.args.get('filingYear'))
+    
+    try:
+        since = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+        hourly, resources = get_page_timings(since.strftime('%Y-%m-%d %H:00'), top, court_code)
+        result = {
+            'success': True,
+            'court': court_code,
+            'hourly': hourly,
+            'slowestResources': resources
+        }
+        if all(case):
+            result['pageLoads'] = get_case_page_loads(*case, court=court_code or DEFAULT_COURT)
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch page timings: {str(e)}'}), 500
+
+@app.route('/api/case-types')
+def case_types():
+    metadata = get_case_metadata()
+    fetched_at = metadata['fetched_at']
+    response = jsonify({
+        'success': True,
+        'caseTypes': metadata['case_types'],
+        'years': metadata['years'],
+        'source': 'court' if fetched_at else 'default',
+        'fetchedAt': datetime.fromtimestamp(fetched_at).isoformat() if fetched_at else None
+    })
+    response.headers['Cache-Control'] = 'public, max-age=3600'
+    return response
+
+def download_path(filename):
+    """Where a PDF named `filename` is saved: always a file directly in DOWNLOAD_DIR, or None"""
+    name = os.path.basename(filename or '')
+    if name in ('', '.', '..'):
+        return None
+    download_dir = os.path.realpath(DOWNLOAD_DIR)
+    save_path = os.path.realpath(os.path.join(download_dir, name))
+    if os.path.dirname(save_path) != download_dir:
+        return None
+    return save_path
+
 @app.route('/api/download-pdf', methods=['POST'])
 def download_pdf():
 
     data = request.get_json()
     pdf_url = data.get('pdfUrl')
     filename = data.get('filename')
+    save_path = download_path(filename)
+    if save_path is None:
+        return jsonify({'error': 'Invalid filename'}), 400
 
-    
     try:
         # Send a GET request to the URL
         response = requests.get(pdf_url, stream=True)
         response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
 
-        download_directory = "/downloads"  # Replace with your desired path
-        save_path = os.path.join(download_directory, filename) 
-
         # Open the local file in binary write mode
         with open(save_path, 'wb') as pdf_file:
             # Iterate over the response content in chunks to handle large files
@@ -110,7 +780,7 @@ def download_pdf():
 
         return jsonify({
             'success': True,
-            'message': f'PDF downloaded successfully to: Project/downloads/{filename}'
+            'message': f'PDF downloaded successfully to: Project/downloads/{os.path.basename(save_path)}'
         })
 
         
@@ -118,10 +788,32 @@ def download_pdf():
         print('error' , e)
         return jsonify({'error': f'Download failed: {str(e)}'}), 500
 
+@app.route('/api/async/download-pdf', methods=['POST'])
+async def download_pdf_async():
+    """download_pdf streamed by the asyncio engine instead of a blocking requests.get"""
+    data = request.get_json()
+    pdf_url = data.get('pdfUrl')
+    filename = data.get('filename')
+    save_path = download_path(filename)
+    if save_path is None:
+        return jsonify({'error': 'Invalid filename'}), 400
+    
+    try:
+        await asyncio.wrap_future(scrape_engine.submit(scrape_engine.download_pdf(pdf_url, save_path)))
+        print(f"PDF downloaded successfully to: {save_path}")
+        
+        return jsonify({
+            'success': True,
+            'message': f'PDF downloaded successfully to: Project/downloads/{os.path.basename(save_path)}'
+        })
+    except Exception as e:
+        print('error' , e)
+        return jsonify({'error': f'Download failed: {str(e)}'}), 500
+
 @app.route('/api/query-history')
 def query_history():
     try:
-        conn = sqlite3.connect('court_data.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('''
             SELECT case_type, case_number, filing_year, query_timestamp 
@@ -150,6 +842,7 @@ def query_history():
 
 # Production configuration
 if __name__ == '__main__':
+    start_job_workers()
     app.run(debug=True, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
     # app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=False)
 else:
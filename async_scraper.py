@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+asyncio scrape engine.
+
+One event loop per process, on its own thread, multiplexes every in-flight
+lookup and PDF download. The browser stages of a lookup (search form, results)
+run on worker threads, at most ASYNC_MAX_BROWSERS at a time; the lightweight
+stages run as aiohttp requests on the loop: the order listing is read from the
+court's DataTables endpoint and order PDFs are streamed to disk.
+
+Usage (benchmark against the sync one-lookup-per-worker model):
+    python async_scraper.py cases.csv --browsers 2 [--mode replay]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+
+from courts import get_court
+from database import is_mock_response, DEFAULT_COURT
+from page_parser import read_latest_order_link
+from scheduler import scrape_scheduler, API
+from scraper import (
+    order_listing_params, read_order_listing_link, CASE_NOT_FOUND, DEADLINE_EXCEEDED,
+    DATATABLES_AJAX_URL, USER_AGENT
+)
+
+logger = logging.getLogger(__name__)
+
+# Browser sessions the engine runs at once; everything else is plain HTTP on the loop
+ASYNC_MAX_BROWSERS = int(os.environ.get('ASYNC_MAX_BROWSERS', 2))
+# Open connections to the court site shared by all lookups and downloads
+ASYNC_HTTP_CONNECTIONS = int(os.environ.get('ASYNC_HTTP_CONNECTIONS', 20))
+HTTP_TIMEOUT = 20
+
+
+class AsyncScrapeEngine:
+    """Process-wide event loop running scrape coroutines; safe to call from any thread"""
+
+    def __init__(self, max_browsers=ASYNC_MAX_BROWSERS, http_connections=ASYNC_HTTP_CONNECTIONS):
+        self.max_browsers = max_browsers
+        self.http_connections = http_connections
+        self.loop = None
+        self.pid = None
+        self.lock = threading.Lock()
+        # Created on the loop itself (asyncio primitives bind to a loop on Python 3.9)
+        self.browser_slots = None
+        self.http = None
+
+    def start(self):
+        with self.lock:
+            # gunicorn preloads the app: a forked worker has to start its own loop thread
+            if self.loop is not None and self.pid == os.getpid():
+                return
+            self.loop = asyncio.new_event_loop()
+            self.pid = os.getpid()
+            self.browser_slots = None
+            self.http = None
+            threading.Thread(target=self.loop.run_forever, name='scrape-engine', daemon=True).start()
+
+    def submit(self, coroutine):
+        """Schedule a coroutine on the engine loop; returns a concurrent.futures.Future"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine, timeout=None):
+        return self.submit(coroutine).result(timeout)
+
+    async def session(self):
+        if self.http is None or self.http.closed:
+            self.http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.http_connections),
+                timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+                headers={'User-Agent': USER_AGENT}
+            )
+        return self.http
+
+    async def fetch_latest_order_link(self, order_page_link, cookies=None):
+        """Link of the latest order on an order listing page, without a browser"""
+        http = await self.session()
+        async with http.get(order_page_link, cookies=cookies) as response:
+            response.raise_for_status()
+            page = await response.text()
+
+        match = DATATABLES_AJAX_URL.search(page)
+        if match is None:
+            # Rows rendered into the page itself
+            return read_latest_order_link(page)
+
+        async with http.get(match.group(1), params=order_listing_params(), cookies=cookies,
+                            headers={'X-Requested-With': 'XMLHttpRequest', 'Referer': order_page_link}) as response:
+            response.raise_for_status()
+            listing = await response.json(content_type=None)
+        return read_order_listing_link(listing)
+
+    async def scrape_case(self, case_type, case_number, filing_year, deadline=None, mode=None, priority=API,
+                          court=DEFAULT_COURT):
+        """Same contract as scrape_delhi_high_court: (parsed_data, raw_response); may raise QueueTimeout"""
+        if self.browser_slots is None:
+            self.browser_slots = asyncio.Semaphore(self.max_browsers)
+
+        # Replays keep the recorded order page; live lookups read it over HTTP where the court allows
+        adapter = get_court(court)
+        http_orders = adapter.http_order_listing and mode != 'replay'
+        scraper = adapter.get_scraper(deadline=deadline, mode=mode, fetch_orders=not http_orders)
+        # The court's own budget is taken first, so a throttled court never occupies an engine browser slot
+        await asyncio.to_thread(adapter.acquire, priority, deadline.remaining() if deadline is not None else None)
+        try:
+            async with self.browser_slots:
+                if deadline is not None and deadline.expired():
+                    return None, DEADLINE_EXCEEDED
+                parsed_data, raw_response = await asyncio.to_thread(
+                    self._scrape_in_slot, scraper, priority, deadline, case_type, case_number, filing_year
+                )
+        finally:
+            adapter.release(priority)
+
+        if not http_orders or parsed_data is None or is_mock_response(raw_response):
+            return parsed_data, raw_response
+
+        order_page_link = parsed_data.get('order_page_link') or '#'
+        if order_page_link != '#':
+            try:
+                timeout = min(HTTP_TIMEOUT, deadline.remaining()) if deadline is not None else HTTP_TIMEOUT
+                pdf_link = await asyncio.wait_for(self.fetch_latest_order_link(order_page_link, scraper.cookies), timeout)
+                parsed_data['pdf_link'] = pdf_link or '#'
+            except Exception as e:
+                logger.warning(f"Skipping latest order PDF link: {e!r}")
+                parsed_data['partial'] = True
+                parsed_data['skipped_stages'] = parsed_data.get('skipped_stages', []) + ['order_pdf_link']
+        return parsed_data, raw_response
+
+    @staticmethod
+    def _scrape_in_slot(scraper, priority, deadline, *case):
+        # Browser capacity is shared with the sync routes through the process-wide scheduler
+        with scrape_scheduler.slot(priority, timeout=deadline.remaining() if deadline is not None else None):
+            return scraper.scrape_case(*case)
+
+    async def download_pdf(self, pdf_url, save_path):
+        """Stream a PDF to save_path"""
+        http = await self.session()
+        async with http.get(pdf_url) as response:
+            response.raise_for_status()
+            with open(save_path, 'wb') as pdf_file:
+                async for chunk in response.content.iter_chunked(8192):
+                    pdf_file.write(chunk)
+        return save_path
+
+
+# Shared by the app's async routes (one loop per worker process)
+scrape_engine = AsyncScrapeEngine()
+
+
+def _outcome(parsed_data, raw_response):
+    if raw_response == CASE_NOT_FOUND:
+        return 'not_found'
+    if parsed_data is None or is_mock_response(raw_response):
+        return 'failed'
+    return 'ok'
+
+
+def benchmark_sync(cases, workers, mode=None):
+    """The sync worker model: each of `workers` handles one whole lookup at a time"""
+    adapter = get_court(DEFAULT_COURT)
+
+    def timed(case):
+        started = time.perf_counter()
+        # Same admission (court budget, then a scheduler slot) as the async engine's lookups
+        with adapter.capacity(API):
+            parsed_data, raw_response = adapter.scrape_case(*case, mode=mode)
+        return time.perf_counter() - started, _outcome(parsed_data, raw_response)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(timed, cases))
+
+
+async def benchmark_async(engine, cases, mode=None):
+    async def timed(case):
+        started = time.perf_counter()
+        parsed_data, raw_response = await engine.scrape_case(*case, mode=mode)
+        return time.perf_counter() - started, _outcome(parsed_data, raw_response)
+
+    return await asyncio.gather(*(timed(case) for case in cases))
+
+
+def report(label, results, elapsed):
+    latencies = sorted(latency for latency, _ in results)
+    outcomes = {}
+    for _, outcome in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    print(f'{label}: {len(results)} lookup(s) in {elapsed:.1f}s ({len(results) / elapsed * 60 if elapsed else 0:.1f}/min), '
+          f'median latency {latencies[len(latencies) // 2]:.1f}s, max {latencies[-1]:.1f}s; '
+          + ', '.join(f'{outcome}={count}' for outcome, count in sorted(outcomes.items())))
+
+
+def main():
+    from bulk_import import read_cases
+
+    parser = argparse.ArgumentParser(description='Benchmark the asyncio engine against sync workers')
+    parser.add_argument('csv_path', help='CSV with case_type, case_number, filing_year columns')
+    parser.add_argument('--browsers', type=int, default=ASYNC_MAX_BROWSERS,
+                        help='browser sessions for both models (sync workers / async browser slots)')
+    parser.add_argument('--mode', choices=['replay'], help='replay recorded scrapes instead of the live site')
+    args = parser.parse_args()
+
+    cases = [(case_type, case_number, filing_year) for _, case_type, case_number, filing_year in read_cases(args.csv_path)]
+    if not cases:
+        print('No cases in the CSV', file=sys.stderr)
+        return 1
+
+    # Both runs get the same admission: `--browsers` scheduler and court slots, no slot held back for
+    # interactive lookups and no rate budget (it would throttle whichever run comes second)
+    scrape_scheduler.capacity, scrape_scheduler.reserved_interactive = args.browsers, 0
+    adapter = get_court(DEFAULT_COURT)
+    adapter.rate.rate_per_minute = 0
+    adapter.slots.capacity = args.browsers
+
+    started = time.perf_counter()
+    results = benchmark_sync(cases, args.browsers, args.mode)
+    report(f'sync  ({args.browsers} worker(s))', results, time.perf_counter() - started)
+
+    engine = AsyncScrapeEngine(max_browsers=args.browsers)
+    started = time.perf_counter()
+    results = engine.run(benchmark_async(engine, cases, args.mode))
+    report(f'async ({args.browsers} browser slot(s))', results, time.perf_counter() - started)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
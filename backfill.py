@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Re-parse the stored raw responses of the query log and write corrected parsed_data back.
+
+After a parser fix, lookups already logged keep the output of the old parser.
+This command streams `queries` in id order, in chunks, and re-parses each
+chunk's raw_response HTML on a process pool with page_parser (no browser). A
+logged results page gives parties, dates, status and order page link again;
+a logged order listing gives the latest order PDF link, and every other field
+is kept. Lookups hold both pages; those logged before both were kept hold only
+one (usually the order listing), so most of them only get their PDF link back.
+Changed rows are written back by this
+process alone, one transaction per chunk that also refreshes `cases` for rows
+that are a case's latest lookup and moves the run's checkpoint, so an
+interrupted run resumes after the last chunk written.
+
+Usage:
+    python backfill.py [--name reparse] [--workers 4] [--chunk-size 500] [--restart]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from database import init_db, get_connection, is_mock_response, to_iso_date, upsert_case
+from page_parser import read_case_table_rows, read_latest_order_date, read_latest_order_link, split_pages
+from scraper import parse_result_row
+
+REPORT_INTERVAL = 10
+
+
+def reparse_row(raw_response, parsed_data):
+    """parsed_data with the fields raw_response holds parsed again; None when nothing can be re-read"""
+    if not raw_response or not parsed_data or is_mock_response(raw_response):
+        return None
+    try:
+        parsed = json.loads(parsed_data)
+    except ValueError:
+        return None
+    if not isinstance(parsed, dict):
+        return None
+
+    results_html, orders_html = split_pages(raw_response)
+    reparsed = False
+    rows = read_case_table_rows(results_html) if results_html else []
+    if rows:
+        # The results page's first row is the case (the order PDF link is not on it)
+        row = parse_result_row(rows[0])
+        parsed.update({key: row[key] for key in ('parties', 'dates', 'order_page_link', 'case_status')})
+        reparsed = True
+
+    # Only a listing whose first row is a dated order has an order PDF link to take
+    if orders_html and to_iso_date(read_latest_order_date(orders_html)):
+        pdf_link = read_latest_order_link(orders_html)
+        if pdf_link:
+            parsed['pdf_link'] = pdf_link
+            reparsed = True
+    return parsed if reparsed else None
+
+
+def reparse_chunk(rows):
+    """Re-parse (id, raw_response, parsed_data) rows (runs in a pool process); returns changed (id, parsed_data)"""
+    changed = []
+    for query_id, raw_response, parsed_data in rows:
+        try:
+            reparsed = reparse_row(raw_response, parsed_data)
+        except Exception as e:
+            print(f'Query {query_id} could not be re-parsed: {e}')
+            continue
+        if reparsed is not None and reparsed != json.loads(parsed_data):
+            changed.append((query_id, json.dumps(reparsed)))
+    return changed
+
+
+def get_checkpoint(cursor, name, restart=False):
+    """Last query id written back by the run (0 for a new or restarted run)"""
+    now = datetime.now()
+    if restart:
+        cursor.execute('DELETE FROM backfill_runs WHERE name = ?', (name,))
+    cursor.execute('''
+        INSERT OR IGNORE INTO backfill_runs (name, started_at, updated_at) VALUES (?, ?, ?)
+    ''', (name, now, now))
+    cursor.execute('SELECT last_id FROM backfill_runs WHERE name = ?', (name,))
+    return cursor.fetchone()[0]
+
+
+def read_chunk(conn, after_id, chunk_size):
+    return conn.execute('''
+        SELECT id, raw_response, parsed_data FROM queries WHERE id > ? ORDER BY id LIMIT ?
+    ''', (after_id, chunk_size)).fetchall()
+
+
+def write_chunk(conn, name, last_id, rows_read, changed):
+    """Write back one chunk's changes and move the checkpoint, in one transaction"""
+    cursor = conn.cursor()
+    for query_id, parsed_data in changed:
+        cursor.execute('UPDATE queries SET parsed_data = ? WHERE id = ?', (parsed_data, query_id))
+        # Only a case's latest lookup describes its current state
+        cursor.execute('''
+            SELECT q.court, q.case_type, q.case_number, q.filing_year, q.query_timestamp
+            FROM queries q JOIN cases c ON c.last_query_id = q.id
+            WHERE q.id = ?
+        ''', (query_id,))
+        latest = cursor.fetchone()
+        if latest:
+            court, case_type, case_number, filing_year, query_timestamp = latest
+            upsert_case(cursor, query_id, case_type, case_number, filing_year, json.loads(parsed_data),
+                        updated_at=query_timestamp, court=court)
+    cursor.execute('''
+        UPDATE backfill_runs
+        SET last_id = ?, rows_read = rows_read + ?, rows_updated = rows_updated + ?, updated_at = ?
+        WHERE name = ?
+    ''', (last_id, rows_read, len(changed), datetime.now(), name))
+    conn.commit()
+
+
+def run_backfill(name='reparse', workers=None, chunk_size=500, restart=False):
+    init_db()
+    conn = get_connection()
+    last_id = get_checkpoint(conn.cursor(), name, restart)
+    conn.commit()
+    if last_id:
+        print(f'Resuming backfill {name!r} after query {last_id}')
+
+    counts = {'read': 0, 'updated': 0}
+    started_at = reported_at = time.time()
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Enough chunks queued to keep every process busy while this one writes
+        max_in_flight = 2 * workers
+        in_flight = deque()  # (future, last id of the chunk, rows in it), in id order
+        read_id = last_id
+        exhausted = False
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < max_in_flight:
+                rows = read_chunk(conn, read_id, chunk_size)
+                if not rows:
+                    exhausted = True
+                    break
+                read_id = rows[-1][0]
+                in_flight.append((pool.submit(reparse_chunk, rows), read_id, len(rows)))
+            if not in_flight:
+                break
+
+            # Chunks are written in order, so the checkpoint never skips an unwritten chunk
+            future, chunk_last_id, rows_read = in_flight.popleft()
+            changed = future.result()
+            write_chunk(conn, name, chunk_last_id, rows_read, changed)
+            counts['read'] += rows_read
+            counts['updated'] += len(changed)
+
+            now = time.time()
+            if now - reported_at >= REPORT_INTERVAL:
+                reported_at = now
+                print(f"{counts['read']} rows read, {counts['updated']} updated, up to query {chunk_last_id} "
+                      f"({counts['read'] / (now - started_at):.0f} rows/s)")
+    conn.close()
+
+    elapsed = time.time() - started_at
+    print(f"Backfill {name!r} done in {elapsed:.1f}s: {counts['read']} rows read, {counts['updated']} updated "
+          f"({counts['read'] / elapsed if elapsed else 0:.0f} rows/s)")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-parse logged raw responses and write corrected parsed_data back')
+    parser.add_argument('--name', default='reparse',
+                        help='run name; re-running the same name resumes it (default: reparse)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='parser processes (default: one per CPU)')
+    parser.add_argument('--chunk-size', type=int, default=500,
+                        help='queries read, parsed and written per batch (default: 500)')
+    parser.add_argument('--restart', action='store_true',
+                        help='start the named run over from the first query')
+    args = parser.parse_args()
+
+    try:
+        run_backfill(args.name, args.workers, max(1, args.chunk_size), args.restart)
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
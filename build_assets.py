@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Build fingerprinted, precompressed copies of the static assets.
+
+Each file under static/css and static/js is copied to static/dist with a content
+hash in its name (css/style.css -> dist/css/style.3f2a9c1b0d.css), next to gzip
+and (when the brotli package is installed) brotli variants. static/dist/manifest.json
+maps original names to fingerprinted ones; the app serves those URLs with an
+immutable Cache-Control header.
+
+Usage:
+    python build_assets.py
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip variants are always built
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+ASSET_DIRS = ('css', 'js')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+
+def fingerprint(path):
+    with open(path, 'rb') as asset_file:
+        return hashlib.sha256(asset_file.read()).hexdigest()[:10]
+
+
+def build_asset(relative_path):
+    """Copy one asset to its fingerprinted name and write its compressed variants"""
+    source = os.path.join(STATIC_DIR, relative_path)
+    name, extension = os.path.splitext(relative_path)
+    hashed_path = f'{name}.{fingerprint(source)}{extension}'
+    target = os.path.join(DIST_DIR, hashed_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copyfile(source, target)
+
+    with open(source, 'rb') as asset_file:
+        content = asset_file.read()
+    # mtime=0 keeps the .gz byte-identical between builds of the same content
+    with open(target + '.gz', 'wb') as gz_file:
+        gz_file.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(target + '.br', 'wb') as br_file:
+            br_file.write(brotli.compress(content, quality=11))
+
+    return 'dist/' + hashed_path.replace(os.sep, '/')
+
+
+def build():
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+
+    manifest = {}
+    for asset_dir in ASSET_DIRS:
+        for root, _, files in os.walk(os.path.join(STATIC_DIR, asset_dir)):
+            for filename in sorted(files):
+                relative_path = os.path.relpath(os.path.join(root, filename), STATIC_DIR).replace(os.sep, '/')
+                manifest[relative_path] = build_asset(relative_path)
+                print(f'{relative_path} -> {manifest[relative_path]}')
+
+    with open(MANIFEST_PATH, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+
+    if brotli is None:
+        print('brotli is not installed; only gzip variants were written', file=sys.stderr)
+    return manifest
+
+
+if __name__ == '__main__':
+    build()
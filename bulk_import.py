@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Bulk-import cases from a CSV of (case_type, case_number, filing_year) rows.
+
+By default every case is queued as a background job in the shared job queue
+and scraped by the job workers (the app's, or `python job_queue.py`), so the
+batch goes through the scrape scheduler and the court budgets like any other
+background work and never delays interactive lookups. This command checkpoints
+each case as its job finishes.
+
+With --local, cases are scraped on a pool of worker processes of this command
+instead, each driving its own browser session: one browser per worker performs
+its searches back-to-back on the same loaded search form. These browsers are
+outside the app's scheduler and court budgets.
+
+Progress is checkpointed per case in SQLite, so re-running the same command
+after an interruption only scrapes the cases that are not finished yet.
+
+Usage:
+    python bulk_import.py cases.csv
+    python bulk_import.py cases.csv --local --workers 4
+"""
+
+import argparse
+import csv
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from multiprocessing.util import Finalize
+
+from database import (
+    init_db, get_connection, log_query, is_mock_response, record_missing_case, clear_missing_case,
+    load_case_metadata, record_lookup
+)
+from job_queue import enqueue_job, get_jobs
+from scheduler import BACKGROUND
+from scraper import DelhiHighCourtScraper, CASE_NOT_FOUND, DEFAULT_CASE_TYPES, DEFAULT_CASE_YEARS
+
+# Same default as the web app's NEGATIVE_CACHE_TTL
+NEGATIVE_CACHE_TTL = int(os.environ.get('NEGATIVE_CACHE_TTL', 15 * 60))
+# Seconds between checks of a queued import's jobs
+QUEUE_POLL_INTERVAL = 2
+# Import item status of each finished job status
+JOB_ITEM_STATUS = {'done': 'done', 'unchanged': 'done', 'not_found': 'not_found', 'failed': 'failed'}
+
+
+def read_cases(csv_path):
+    """Read (line_no, case_type, case_number, filing_year) rows; a header row is optional"""
+    with open(csv_path, newline='', encoding='utf-8-sig') as csv_file:
+        for line_no, row in enumerate(csv.reader(csv_file), start=1):
+            if not row or not any(cell.strip() for cell in row):
+                continue
+            if line_no == 1 and row[0].strip().lower() in ('case_type', 'casetype', 'type'):
+                continue
+            cells = [cell.strip() for cell in row] + ['', '', '']
+            yield line_no, cells[0], cells[1], cells[2]
+
+
+def get_run_id(csv_path):
+    """Runs are keyed by file content, so the same CSV always resumes the same run"""
+    digest = hashlib.sha1()
+    with open(csv_path, 'rb') as csv_file:
+        for chunk in iter(lambda: csv_file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def create_run(run_id, csv_path):
+    """Register the run and its items; items already checkpointed are left untouched"""
+    metadata = load_case_metadata()
+    case_types, years = (metadata[0]['case_types'], metadata[0]['years']) if metadata else (DEFAULT_CASE_TYPES, DEFAULT_CASE_YEARS)
+    case_types, years = set(case_types), set(years)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    total = 0
+    for line_no, case_type, case_number, filing_year in read_cases(csv_path):
+        total += 1
+        # Invalid rows are rejected here instead of costing a browser session each
+        if case_type not in case_types or filing_year not in years or not case_number:
+            status, error = 'invalid', 'Unknown case type or filing year, or missing case number'
+        else:
+            status, error = 'pending', None
+        cursor.execute('''
+            INSERT OR IGNORE INTO import_items (run_id, line_no, case_type, case_number, filing_year, status, error)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (run_id, line_no, case_type, case_number, filing_year, status, error))
+    cursor.execute('''
+        INSERT OR IGNORE INTO import_runs (id, source, total, created_at) VALUES (?, ?, ?, ?)
+    ''', (run_id, os.path.abspath(csv_path), total, datetime.now()))
+    conn.commit()
+    conn.close()
+    return total
+
+
+def get_pending_items(run_id, max_attempts):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT line_no, case_type, case_number, filing_year FROM import_items
+        WHERE run_id = ? AND (status = 'pending' OR (status = 'failed' AND attempts < ?))
+        ORDER BY line_no
+    ''', (run_id, max_attempts))
+    items = cursor.fetchall()
+    conn.close()
+    return items
+
+
+def get_status_counts(run_id):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT status, count(*) FROM import_items WHERE run_id = ? GROUP BY status', (run_id,))
+    counts = dict(cursor.fetchall())
+    conn.close()
+    return counts
+
+
+def get_item_jobs(run_id):
+    """Job ids of the run's items queued but not checkpointed yet, by line number"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT line_no, job_id FROM import_items WHERE run_id = ? AND job_id IS NOT NULL', (run_id,))
+    jobs = dict(cursor.fetchall())
+    conn.close()
+    return jobs
+
+
+def set_item_job(run_id, line_no, job_id):
+    conn = get_connection()
+    conn.execute('UPDATE import_items SET job_id = ? WHERE run_id = ? AND line_no = ?', (job_id, run_id, line_no))
+    conn.commit()
+    conn.close()
+
+
+def checkpoint_item(run_id, line_no, status, error=None):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        UPDATE import_items
+        SET status = ?, error = ?, attempts = attempts + 1, finished_at = ?, job_id = NULL
+        WHERE run_id = ? AND line_no = ?
+    ''', (status, error, datetime.now(), run_id, line_no))
+    conn.commit()
+    conn.close()
+
+
+# The scraper of this worker process, set up by init_worker
+_worker_scraper = None
+
+
+def init_worker(session=True):
+    """Runs once per worker process: create the scraper whose browser it keeps"""
+    global _worker_scraper
+    _worker_scraper = DelhiHighCourtScraper(headless=True, session=session)
+    # atexit handlers do not run in pool workers; multiprocessing finalizers do
+    Finalize(None, _worker_scraper.close, exitpriority=10)
+
+
+def scrape_item(item):
+    """Runs in a worker process: scrape one case with that process's own browser"""
+    line_no, case_type, case_number, filing_year = item
+    pages_before = _worker_scraper.pages_loaded
+    try:
+        parsed_data, raw_response = _worker_scraper.scrape_case(case_type, case_number, filing_year)
+        return line_no, parsed_data, raw_response, None, _worker_scraper.pages_loaded - pages_before
+    except Exception as e:
+        return line_no, None, None, str(e), _worker_scraper.pages_loaded - pages_before
+
+
+def scrape_batch(items, tabs):
+    """Runs in a worker process: scrape a batch of cases concurrently in the tabs of one browser"""
+    from tab_scraper import scrape_cases_in_tabs
+
+    # A case listed twice in the CSV is scraped once for all of its lines
+    line_numbers = {}
+    for line_no, case_type, case_number, filing_year in items:
+        line_numbers.setdefault((case_type, case_number, filing_year), []).append(line_no)
+
+    results = []
+    try:
+        for case, parsed_data, raw_response, pages in scrape_cases_in_tabs(list(line_numbers), tabs=tabs):
+            for index, line_no in enumerate(line_numbers.pop(case)):
+                results.append((line_no, parsed_data, raw_response, None, pages if index == 0 else 0))
+    except Exception as e:
+        for case_lines in line_numbers.values():
+            results.extend((line_no, None, None, str(e), 0) for line_no in case_lines)
+    return results
+
+
+def store_result(run_id, item, parsed_data, raw_response, error):
+    """Write a finished case through the same storage as the web app and checkpoint it"""
+    line_no, case_type, case_number, filing_year = item
+    if error:
+        record_lookup('failed', case=(case_type, case_number, filing_year))
+        checkpoint_item(run_id, line_no, 'failed', error)
+    elif raw_response == CASE_NOT_FOUND:
+        record_lookup('not_found', case=(case_type, case_number, filing_year))
+        if NEGATIVE_CACHE_TTL > 0:
+            record_missing_case(case_type, case_number, filing_year, NEGATIVE_CACHE_TTL)
+        checkpoint_item(run_id, line_no, 'not_found')
+    elif parsed_data is None or is_mock_response(raw_response):
+        # Mock fallbacks are retried on the next run rather than stored as real data
+        record_lookup('failed' if parsed_data is None else 'mock', case=(case_type, case_number, filing_year))
+        checkpoint_item(run_id, line_no, 'failed', raw_response or 'No data returned')
+    else:
+        log_query(case_type, case_number, filing_year, raw_response, parsed_data)
+        clear_missing_case(case_type, case_number, filing_year)
+        checkpoint_item(run_id, line_no, 'done')
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f'{seconds // 3600:d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}'
+
+
+def report_progress(finished, remaining_at_start, started_at, counts, pages_loaded):
+    elapsed = time.monotonic() - started_at
+    rate = finished / elapsed if elapsed > 0 else 0
+    left = remaining_at_start - finished
+    eta = format_duration(left / rate) if rate > 0 else '--:--:--'
+    summary = ' '.join(f'{status}={count}' for status, count in sorted(counts.items()))
+    # Pages are only counted by this command's own browsers (--local)
+    pages = f'{pages_loaded / finished if finished else 0:.2f} pages/case, ' if pages_loaded is not None else ''
+    print(f'\r[{finished}/{remaining_at_start}] {rate * 60:.1f} cases/min, {pages}'
+          f'ETA {eta} ({summary})  ', end='', file=sys.stderr, flush=True)
+
+
+def run_queued(run_id, items, max_attempts=3):
+    """Queue the items as background jobs and checkpoint each one as its job finishes"""
+    # Items queued by an interrupted run keep their job, finished or not; its result is collected below
+    item_jobs = get_item_jobs(run_id)
+    known_jobs = {job['id'] for job in get_jobs(list(set(item_jobs.values())))} if item_jobs else set()
+    # A case listed twice in the CSV is one job for all of its lines
+    jobs = {}
+    for item in items:
+        job_id = item_jobs.get(item[0])
+        if job_id not in known_jobs:
+            job_id = enqueue_job(*item[1:], priority=BACKGROUND, max_attempts=max_attempts)[0]
+            set_item_job(run_id, item[0], job_id)
+        jobs.setdefault(job_id, []).append(item)
+
+    started_at = time.monotonic()
+    finished = 0
+    try:
+        while jobs:
+            for job in get_jobs(list(jobs)):
+                status = JOB_ITEM_STATUS.get(job['status'])
+                if status is None:
+                    continue
+                for line_no, *_ in jobs.pop(job['id']):
+                    checkpoint_item(run_id, line_no, status, job['error'] if status == 'failed' else None)
+                    finished += 1
+            report_progress(finished, len(items), started_at, get_status_counts(run_id), None)
+            if jobs:
+                time.sleep(QUEUE_POLL_INTERVAL)
+    except KeyboardInterrupt:
+        print('\nInterrupted; queued jobs keep running, re-run the same command to pick up their results',
+              file=sys.stderr)
+        raise
+    print(file=sys.stderr)
+
+
+def run_import(csv_path, workers=2, max_attempts=3, session=True, tabs=1, local=False):
+    init_db()
+    run_id = get_run_id(csv_path)
+    total = create_run(run_id, csv_path)
+    items = get_pending_items(run_id, max_attempts)
+    counts = get_status_counts(run_id)
+
+    if not local:
+        print(f'Import run {run_id}: {total} cases in {csv_path}, {len(items)} left to scrape '
+              f'as background jobs', file=sys.stderr)
+        if items:
+            run_queued(run_id, items, max_attempts)
+        return run_id, get_status_counts(run_id)
+
+    print(f'Import run {run_id}: {total} cases in {csv_path}, {len(items)} left to scrape '
+          f'with {workers} worker process(es), {tabs} tab(s) each', file=sys.stderr)
+    if not items:
+        return run_id, counts
+
+    started_at = time.monotonic()
+    finished = 0
+    pages_loaded = 0
+    # With tabs, each task is a batch of cases scraped concurrently in one browser
+    pending_batches = iter([items[start:start + tabs] for start in range(0, len(items), tabs)])
+    in_flight = {}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(session,)) as executor:
+        def submit(batch):
+            if tabs > 1:
+                in_flight[executor.submit(scrape_batch, batch, tabs)] = batch
+            else:
+                in_flight[executor.submit(scrape_item, batch[0])] = batch
+
+        try:
+            # Keep only a small window of cases queued so an interrupt loses little work
+            for batch in pending_batches:
+                submit(batch)
+                if len(in_flight) >= workers * 2:
+                    break
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = in_flight.pop(future)
+                    results = future.result() if tabs > 1 else [future.result()]
+                    items_by_line = {item[0]: item for item in batch}
+                    for line_no, parsed_data, raw_response, error, pages in results:
+                        store_result(run_id, items_by_line[line_no], parsed_data, raw_response, error)
+                        finished += 1
+                        pages_loaded += pages
+
+                    next_batch = next(pending_batches, None)
+                    if next_batch is not None:
+                        submit(next_batch)
+
+                counts = get_status_counts(run_id)
+                report_progress(finished, len(items), started_at, counts, pages_loaded)
+        except KeyboardInterrupt:
+            print('\nInterrupted; finished cases are checkpointed, re-run the same command to resume',
+                  file=sys.stderr)
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    print(file=sys.stderr)
+    if finished:
+        print(f'Loaded {pages_loaded} page(s) for {finished} case(s), {pages_loaded / finished:.2f} per case',
+              file=sys.stderr)
+    return run_id, get_status_counts(run_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-import Delhi High Court cases from a CSV file')
+    parser.add_argument('csv_path', help='CSV with case_type, case_number, filing_year columns')
+    parser.add_argument('--local', action='store_true',
+                        help='scrape in browsers of this command instead of queuing background jobs '
+                             '(bypasses the app\'s scheduler and court budgets)')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('IMPORT_WORKERS', 2)),
+                        help='with --local, worker processes, each with its own browser (default: 2)')
+    parser.add_argument('--max-attempts', type=int, default=3,
+                        help='attempts per case before it is left as failed (default: 3)')
+    parser.add_argument('--tabs', type=int, default=1,
+                        help='with --local, concurrent searches in the tabs of each worker\'s browser (default: 1)')
+    parser.add_argument('--no-session', dest='session', action='store_false',
+                        help='with --local, start a fresh browser for every case instead of reusing one per worker')
+    args = parser.parse_args()
+
+    try:
+        run_id, counts = run_import(args.csv_path, args.workers, args.max_attempts, args.session, max(1, args.tabs),
+                                    args.local)
+    except KeyboardInterrupt:
+        return 130
+
+    print(f'Import run {run_id} finished: ' + ', '.join(f'{status}={count}' for status, count in sorted(counts.items())))
+    return 0 if not counts.get('failed') else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import deque
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker around an upstream dependency (here: the court website).
+
+    The outcomes of the last `window` calls are kept; when at least `min_calls` of
+    them are known and the share of failed or slow calls reaches `failure_rate`,
+    the circuit opens and callers fail fast for `open_seconds`. After that a
+    limited number of trial calls are let through (half-open): a success closes
+    the circuit again, a failure re-opens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, window=20, min_calls=5, failure_rate=0.5, slow_call_seconds=20.0,
+                 open_seconds=60.0, half_open_max_calls=1):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = self.CLOSED
+        self.outcomes = deque(maxlen=window)  # (failed, slow, latency) per call
+        self.opened_at = None
+        self.half_open_since = None
+        self.half_open_calls = 0
+        self.lock = threading.Lock()
+
+    def allow_request(self):
+        """Whether a call to the upstream may go ahead right now"""
+        with self.lock:
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                if now - self.opened_at < self.open_seconds:
+                    return False
+                self.state = self.HALF_OPEN
+                self.half_open_since = now
+                self.half_open_calls = 0
+
+            if self.state == self.HALF_OPEN:
+                if self.half_open_calls >= self.half_open_max_calls:
+                    # A trial whose outcome never got recorded must not wedge the circuit
+                    if now - self.half_open_since < self.open_seconds:
+                        return False
+                    self.half_open_since = now
+                    self.half_open_calls = 0
+                self.half_open_calls += 1
+
+            return True
+
+    def record(self, succeeded, latency, slow_call_seconds=None):
+        """Record the outcome of a call that allow_request() let through (with its own slow threshold, if given)"""
+        slow = latency >= (slow_call_seconds or self.slow_call_seconds)
+        failed = not succeeded
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                if failed or slow:
+                    self._open()
+                else:
+                    # The trial call worked: start over with a clean window
+                    self.state = self.CLOSED
+                    self.outcomes.clear()
+                    self.outcomes.append((failed, slow, latency))
+                return
+
+            self.outcomes.append((failed, slow, latency))
+            if self.state == self.CLOSED and len(self.outcomes) >= self.min_calls:
+                bad_calls = sum(1 for failed_call, slow_call, _ in self.outcomes if failed_call or slow_call)
+                if bad_calls / len(self.outcomes) >= self.failure_rate:
+                    self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.half_open_calls = 0
+
+    def retry_after(self):
+        """Seconds until the next trial call is allowed (0 when not open)"""
+        with self.lock:
+            if self.state != self.OPEN:
+                return 0
+            return max(0, int(self.open_seconds - (time.monotonic() - self.opened_at)) + 1)
+
+    def snapshot(self):
+        with self.lock:
+            calls = len(self.outcomes)
+            failures = sum(1 for failed, _, _ in self.outcomes if failed)
+            slow_calls = sum(1 for _, slow, _ in self.outcomes if slow)
+            latencies = sorted(latency for _, _, latency in self.outcomes)
+            state = self.state
+        return {
+            'name': self.name,
+            'state': state,
+            'recentCalls': calls,
+            'failureRate': round(failures / calls, 3) if calls else 0,
+            'slowRate': round(slow_calls / calls, 3) if calls else 0,
+            'medianLatency': round(latencies[calls // 2], 3) if calls else None,
+            'retryAfter': self.retry_after()
+        }
@@ -0,0 +1,254 @@
+"""
+Court adapters.
+
+Each court the app can look cases up in is a CourtAdapter registered under a
+short code. Adapters share the browser slots of the process-wide scrape
+scheduler, the database and the metrics, but each court also has a budget of
+its own: at most `max_concurrency` scrapes at once per process, at most
+`rate_per_minute` scrapes started per minute, and its own circuit breaker. The
+rate budget is a token bucket in the database, so it caps the scrapes of every
+worker process and instance together; background scrapes always leave a token
+in it for lookups. The court budget is taken before a shared scheduler slot,
+so lookups for a throttled or slow court wait on that court's limits and never
+hold a slot another court could use. The court's concurrency slots are handed
+out by priority like the scheduler's, so batch work queued on a court does not
+get ahead of an interactive lookup there either.
+
+Adding a court means subclassing CourtAdapter (usually around a scraper class
+like DelhiHighCourtScraper) and calling register_court() at the bottom of this
+module.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from circuit_breaker import CircuitBreaker
+from database import DEFAULT_COURT, take_rate_token
+from scheduler import ScrapeScheduler, scrape_scheduler, QueueTimeout, API, BACKGROUND
+from scraper import DelhiHighCourtScraper, fetch_latest_order_link, DEFAULT_CASE_TYPES, DEFAULT_CASE_YEARS
+from stub_scraper import StubScraper
+
+# "stub" replaces every court's scraper with stub_scraper.StubScraper (load tests; no browser)
+SCRAPER_BACKEND = os.environ.get('SCRAPER_BACKEND', 'selenium')
+
+
+class RateBudget:
+    """
+    Token bucket: `rate_per_minute` scrapes per minute, in bursts of up to `burst` (0 = unlimited)
+
+    The bucket is kept in the rate_budgets table under `name`, so every process
+    using the database draws from the same budget.
+    """
+
+    def __init__(self, name, rate_per_minute, burst=1):
+        self.name = name
+        self.rate_per_minute = rate_per_minute
+        self.burst = max(1, burst)
+
+    def acquire(self, timeout=None, reserve=0):
+        """
+        Take one token, waiting up to timeout seconds; False when none would come in time
+
+        reserve: tokens that must be left in the bucket (capped so a token can always come)
+        """
+        if self.rate_per_minute <= 0:
+            return True
+        reserve = min(reserve, self.burst - 1)
+        expires_at = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            wait = take_rate_token(self.name, self.rate_per_minute, self.burst, reserve)
+            if not wait:
+                return True
+            # Fail fast instead of sleeping through a wait that cannot end in time
+            if expires_at is not None and time.monotonic() + wait > expires_at:
+                return False
+            time.sleep(wait)
+
+
+class CourtAdapter:
+    """
+    One court: how to scrape it and how much of it may be used at once.
+
+    Subclasses set the class attributes and implement create_scraper(); limits
+    can be overridden per deployment with COURT_<CODE>_CONCURRENCY and
+    COURT_<CODE>_RATE_PER_MINUTE.
+    """
+
+    code = None
+    name = None
+    # Site name reported by the court's circuit breaker
+    host = None
+    case_types = ()
+    years = ()
+    max_concurrency = 1
+    rate_per_minute = 30
+    # The order listing can be read over plain HTTP (see async_scraper) instead of in the browser
+    http_order_listing = False
+
+    def __init__(self):
+        prefix = f'COURT_{self.code.upper()}'
+        self.max_concurrency = max(1, int(os.environ.get(f'{prefix}_CONCURRENCY', self.max_concurrency)))
+        self.rate_per_minute = float(os.environ.get(f'{prefix}_RATE_PER_MINUTE', self.rate_per_minute))
+        self.options = {'case_type_set': frozenset(self.case_types), 'year_set': frozenset(self.years)}
+
+        self.rate = RateBudget(self.code, self.rate_per_minute, burst=self.max_concurrency)
+        # The court's own slots, handed out by priority like the shared scheduler's
+        self.slots = ScrapeScheduler(self.max_concurrency, weights=scrape_scheduler.weights, reserved_interactive=0)
+        # Fail fast while this court's website is down or slow (state is per worker process)
+        self.breaker = CircuitBreaker(
+            self.host or self.code,
+            window=int(os.environ.get('CIRCUIT_WINDOW', 20)),
+            min_calls=int(os.environ.get('CIRCUIT_MIN_CALLS', 5)),
+            failure_rate=float(os.environ.get('CIRCUIT_FAILURE_RATE', 0.5)),
+            slow_call_seconds=float(os.environ.get('CIRCUIT_SLOW_SECONDS', 25)),
+            open_seconds=float(os.environ.get('CIRCUIT_OPEN_SECONDS', 60))
+        )
+
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.probes = {'unchanged': 0, 'changed': 0, 'inconclusive': 0}
+
+    def acquire(self, priority=API, timeout=None):
+        """Take a concurrency slot of this court, then its rate token; raises QueueTimeout"""
+        started = time.monotonic()
+        try:
+            self.slots.acquire(priority, timeout)
+        except QueueTimeout:
+            reason = 'concurrency limit'
+        else:
+            remaining = max(0, timeout - (time.monotonic() - started)) if timeout is not None else None
+            # Background scrapes leave a token for lookups, whichever process either runs in
+            if self.rate.acquire(remaining, reserve=1 if priority == BACKGROUND else 0):
+                with self.lock:
+                    self.in_flight += 1
+                return
+            self.slots.release(priority)
+            reason = 'rate budget'
+        with self.lock:
+            self.timeouts += 1
+        raise QueueTimeout(f'{self.name} {reason} reached')
+
+    def release(self, priority=API):
+        with self.lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self.slots.release(priority)
+
+    @contextmanager
+    def capacity(self, priority=API, timeout=None):
+        """Hold this court's budget, then a shared scheduler slot, for the with-block"""
+        started = time.monotonic()
+        # Always court first, shared second: nothing waits on a court while holding a shared slot
+        self.acquire(priority, timeout)
+        try:
+            remaining = max(0, timeout - (time.monotonic() - started)) if timeout is not None else None
+            with scrape_scheduler.slot(priority, timeout=remaining):
+                yield
+        finally:
+            self.release(priority)
+
+    def create_scraper(self, deadline=None, mode=None, fetch_orders=True):
+        """
+        A scraper whose scrape_case(case_type, case_number, filing_year) returns
+        (parsed_data, raw_response) like DelhiHighCourtScraper.scrape_case
+
+        fetch_orders=False is only asked of adapters with http_order_listing
+        """
+        raise NotImplementedError
+
+    def get_scraper(self, deadline=None, mode=None, fetch_orders=True):
+        """create_scraper(), or the browser-free stub when SCRAPER_BACKEND=stub"""
+        if SCRAPER_BACKEND == 'stub':
+            return StubScraper(deadline=deadline)
+        return self.create_scraper(deadline=deadline, mode=mode, fetch_orders=fetch_orders)
+
+    def scrape_case(self, case_type, case_number, filing_year, deadline=None, mode=None):
+        """Scrape one case; the caller holds capacity()"""
+        return self.get_scraper(deadline=deadline, mode=mode).scrape_case(case_type, case_number, filing_year)
+
+    def probe_case(self, case_type, case_number, filing_year, known):
+        """
+        Cheap check of whether a case changed since `known`, its last stored parsed_data
+
+        Returns:
+            str: 'unchanged' or 'changed', or None when the probe cannot tell
+        """
+        return None
+
+    def probe(self, case_type, case_number, filing_year, known):
+        """probe_case() with failures as None; verdicts are counted in snapshot()"""
+        verdict = None
+        if SCRAPER_BACKEND != 'stub':
+            try:
+                verdict = self.probe_case(case_type, case_number, filing_year, known)
+            except Exception as e:
+                print(f'{self.name} change probe failed: {e}')
+        with self.lock:
+            self.probes[verdict or 'inconclusive'] += 1
+        return verdict
+
+    def snapshot(self):
+        with self.lock:
+            in_flight, completed, timeouts = self.in_flight, self.completed, self.timeouts
+            probes = dict(self.probes)
+        return {
+            'code': self.code,
+            'name': self.name,
+            'maxConcurrency': self.max_concurrency,
+            'ratePerMinute': self.rate_per_minute,
+            'inFlight': in_flight,
+            'completed': completed,
+            'timeouts': timeouts,
+            'probes': probes,
+            'upstream': self.breaker.snapshot()
+        }
+
+
+class DelhiHighCourtAdapter(CourtAdapter):
+    code = DEFAULT_COURT
+    name = 'Delhi High Court'
+    host = 'delhihighcourt.nic.in'
+    case_types = DEFAULT_CASE_TYPES
+    years = DEFAULT_CASE_YEARS
+    max_concurrency = 2
+    rate_per_minute = 20
+    http_order_listing = True
+
+    def create_scraper(self, deadline=None, mode=None, fetch_orders=True):
+        return DelhiHighCourtScraper(headless=True, mode=mode, deadline=deadline, fetch_orders=fetch_orders,
+                                     court=self.code)
+
+    def probe_case(self, case_type, case_number, filing_year, known):
+        # The order listing is readable over plain HTTP; a case changes when a new order is published
+        order_page_link = known.get('order_page_link') or '#'
+        pdf_link = known.get('pdf_link') or '#'
+        if order_page_link == '#' or pdf_link == '#' or known.get('partial'):
+            return None
+        latest = fetch_latest_order_link(order_page_link)
+        if not latest:
+            return None
+        return 'unchanged' if latest == pdf_link else 'changed'
+
+
+_courts = {}
+
+
+def register_court(adapter):
+    _courts[adapter.code] = adapter
+    return adapter
+
+
+def get_court(code):
+    """The adapter registered under code, or None"""
+    return _courts.get(code)
+
+
+def registered_courts():
+    return list(_courts.values())
+
+
+register_court(DelhiHighCourtAdapter())
@@ -0,0 +1,988 @@
+import sqlite3
+import html
+import json
+import os
+import re
+import time
+from datetime import datetime, timedelta
+
+# Shared SQLite database used by the web app and the command-line tools
+DB_PATH = os.environ.get('COURT_DB_PATH', 'court_data.db')
+
+# Court of rows stored before lookups named a court (the Delhi High Court adapter)
+DEFAULT_COURT = 'delhi_hc'
+
+# Columns of the full-text index over the latest known state of each case
+CASE_SEARCH_COLUMNS = ('case_type', 'case_number', 'filing_year', 'petitioner', 'respondent', 'case_status')
+
+# Lookup outcomes counted by the analytics tables; the upstream ones are answers from a scrape
+# ('unchanged': a change probe found the stored result current, so no scrape ran)
+LOOKUP_OUTCOMES = ('ok', 'not_found', 'mock', 'failed', 'deadline', 'cached', 'stale', 'busy', 'unchanged')
+UPSTREAM_OUTCOMES = ('ok', 'not_found', 'mock', 'failed', 'deadline')
+UPSTREAM_FAILURES = ('mock', 'failed', 'deadline')
+
+# Browser-side timings of a court page load, in milliseconds (get_ms is driver.get as seen from Python)
+PAGE_TIMING_METRICS = ('get_ms', 'dns_ms', 'connect_ms', 'tls_ms', 'ttfb_ms', 'download_ms',
+                       'dom_content_loaded_ms', 'load_ms')
+
+# Averages kept per hour: each timing, and driver.get time beyond the browser's own load
+PAGE_TIMING_AVERAGES = PAGE_TIMING_METRICS + ('overhead_ms',)
+# Per-sample SQL value of each average over page_loads; NULL (missing or 0) samples are left out
+PAGE_TIMING_SAMPLE_SQL = dict(
+    {metric: f'NULLIF({metric}, 0)' for metric in PAGE_TIMING_METRICS},
+    overhead_ms='CASE WHEN load_ms > 0 THEN get_ms - load_ms END'
+)
+# Days single page loads are kept (the hourly and per-resource sums are kept for good)
+PAGE_LOADS_RETENTION_DAYS = int(os.environ.get('PAGE_LOADS_RETENTION_DAYS', 30))
+
+# Normalized hearing/order columns of the cases table (added after the table was introduced)
+CASE_STATE_COLUMNS = (
+    ('next_hearing', 'DATE'),
+    ('last_date', 'DATE'),
+    ('court_no', 'TEXT'),
+    ('pdf_link', 'TEXT'),
+    ('order_page_link', 'TEXT'),
+)
+
+
+def get_connection():
+    return sqlite3.connect(DB_PATH)
+
+
+def is_mock_response(raw_response):
+    """The scraper falls back to mock data on errors; such rows never describe a real case"""
+    return isinstance(raw_response, str) and raw_response.startswith('Mock data')
+
+
+# Database setup
+def init_db():
+    conn = get_connection()
+    cursor = conn.cursor()
+    # Several app instances and job workers share the file: readers must not wait on a writer
+    cursor.execute('PRAGMA journal_mode=WAL')
+    # Case keys are per court now; the derived tables are rebuilt with the court in their keys
+    for table in ('cases', 'negative_cache'):
+        cursor.execute(f'PRAGMA table_info({table})')
+        columns = {row[1] for row in cursor.fetchall()}
+        if columns and 'court' not in columns:
+            cursor.execute(f'DROP TABLE {table}')
+            if table == 'cases':
+                cursor.execute('DROP TABLE IF EXISTS case_search')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS queries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            case_type TEXT,
+            case_number TEXT,
+            filing_year TEXT,
+            query_timestamp DATETIME,
+            raw_response TEXT,
+            parsed_data TEXT
+        )
+    ''')
+    cursor.execute('PRAGMA table_info(queries)')
+    if 'court' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute(f"ALTER TABLE queries ADD COLUMN court TEXT NOT NULL DEFAULT '{DEFAULT_COURT}'")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS metadata_cache (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            fetched_at REAL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS negative_cache (
+            court TEXT,
+            case_type TEXT,
+            case_number TEXT,
+            filing_year TEXT,
+            recorded_at REAL,
+            expires_at REAL,
+            PRIMARY KEY (court, case_type, case_number, filing_year)
+        )
+    ''')
+
+    # Latest known state of every case, searchable through the case_search FTS5 index
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cases (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            court TEXT NOT NULL,
+            case_type TEXT NOT NULL,
+            case_number TEXT NOT NULL,
+            filing_year TEXT NOT NULL,
+            petitioner TEXT,
+            respondent TEXT,
+            case_status TEXT,
+            next_hearing DATE,
+            last_date DATE,
+            court_no TEXT,
+            pdf_link TEXT,
+            order_page_link TEXT,
+            last_query_id INTEGER,
+            updated_at DATETIME,
+            UNIQUE (court, case_type, case_number, filing_year)
+        )
+    ''')
+    # Databases created before the hearing columns existed need them added (and filled below)
+    cursor.execute('PRAGMA table_info(cases)')
+    existing_columns = {row[1] for row in cursor.fetchall()}
+    missing_columns = [column for column in CASE_STATE_COLUMNS if column[0] not in existing_columns]
+    for name, column_type in missing_columns:
+        cursor.execute(f'ALTER TABLE cases ADD COLUMN {name} {column_type}')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_cases_next_hearing ON cases (next_hearing)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_cases_court_hearing ON cases (court_no, next_hearing)')
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS case_search USING fts5(
+            case_type, case_number, filing_year, petitioner, respondent, case_status,
+            content='cases', content_rowid='id'
+        )
+    ''')
+    # Keep the external-content index in step with the cases table
+    columns = ', '.join(CASE_SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in CASE_SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in CASE_SEARCH_COLUMNS)
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS cases_search_insert AFTER INSERT ON cases BEGIN
+            INSERT INTO case_search (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS cases_search_delete AFTER DELETE ON cases BEGIN
+            INSERT INTO case_search (case_search, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS cases_search_update AFTER UPDATE OF {columns} ON cases BEGIN
+            INSERT INTO case_search (case_search, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO case_search (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    ''')
+
+    # Checkpoints of bulk imports, so an interrupted run resumes where it stopped
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS import_runs (
+            id TEXT PRIMARY KEY,
+            source TEXT,
+            total INTEGER,
+            created_at DATETIME
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS import_items (
+            run_id TEXT,
+            line_no INTEGER,
+            case_type TEXT,
+            case_number TEXT,
+            filing_year TEXT,
+            status TEXT DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            error TEXT,
+            finished_at DATETIME,
+            PRIMARY KEY (run_id, line_no)
+        )
+    ''')
+    # Job of a queued import item until the item is checkpointed, so a resumed import collects it
+    cursor.execute('PRAGMA table_info(import_items)')
+    if 'job_id' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute('ALTER TABLE import_items ADD COLUMN job_id INTEGER')
+    # Re-parse backfills of the query log: the last query id each run has written back
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS backfill_runs (
+            name TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            rows_read INTEGER NOT NULL DEFAULT 0,
+            rows_updated INTEGER NOT NULL DEFAULT 0,
+            started_at DATETIME,
+            updated_at DATETIME
+        )
+    ''')
+
+    # Scrape jobs shared by all app instances; a running job is leased to one worker at a time
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scrape_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            court TEXT NOT NULL,
+            case_type TEXT NOT NULL,
+            case_number TEXT NOT NULL,
+            filing_year TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            lease_owner TEXT,
+            lease_expires_at REAL,
+            enqueued_at REAL,
+            started_at REAL,
+            finished_at REAL,
+            result TEXT,
+            error TEXT,
+            probe INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('PRAGMA table_info(scrape_jobs)')
+    if 'probe' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute('ALTER TABLE scrape_jobs ADD COLUMN probe INTEGER NOT NULL DEFAULT 0')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scrape_jobs_status ON scrape_jobs (status, lease_expires_at)")
+    # At most one queued or running job per case, however many instances enqueue it
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_scrape_jobs_active
+        ON scrape_jobs (court, case_type, case_number, filing_year)
+        WHERE status IN ('queued', 'running')
+    ''')
+    # Token buckets of the per-court rate budgets, shared by every process using this database
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rate_budgets (
+            name TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    ''')
+
+    # Usage analytics, kept up to date by every recorded lookup so /api/stats never scans queries
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stats_hourly (
+            hour TEXT,
+            court TEXT,
+            outcome TEXT,
+            lookups INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (hour, court, outcome)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stats_outcomes (
+            court TEXT,
+            outcome TEXT,
+            lookups INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (court, outcome)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stats_cases (
+            court TEXT,
+            case_type TEXT,
+            case_number TEXT,
+            filing_year TEXT,
+            lookups INTEGER NOT NULL DEFAULT 0,
+            last_lookup_at DATETIME,
+            PRIMARY KEY (court, case_type, case_number, filing_year)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_stats_cases_lookups ON stats_cases (lookups DESC)')
+
+    # Navigation/Resource Timing of every court page load, and hourly and per-resource sums of them
+    metric_columns = ',\n'.join(f'            {metric} REAL' for metric in PAGE_TIMING_METRICS)
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS page_loads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            court TEXT NOT NULL,
+            case_type TEXT,
+            case_number TEXT,
+            filing_year TEXT,
+            stage TEXT,
+            url TEXT,
+            loaded_at DATETIME,
+{metric_columns},
+            transfer_bytes INTEGER,
+            resource_count INTEGER,
+            slowest_resources TEXT
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_page_loads_case ON page_loads (court, case_type, case_number, filing_year)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_page_loads_loaded_at ON page_loads (loaded_at)')
+    # Sums that predate the per-timing sample counts averaged missing timings in as 0: rebuild them
+    cursor.execute('PRAGMA table_info(page_load_hourly)')
+    hourly_columns = {row[1] for row in cursor.fetchall()}
+    rebuild_hourly = bool(hourly_columns) and 'get_ms_samples' not in hourly_columns
+    if rebuild_hourly:
+        cursor.execute('DROP TABLE page_load_hourly')
+    sum_columns = ',\n'.join(
+        f'            {metric} REAL NOT NULL DEFAULT 0,\n            {metric}_samples INTEGER NOT NULL DEFAULT 0'
+        for metric in PAGE_TIMING_AVERAGES
+    )
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS page_load_hourly (
+            hour TEXT,
+            court TEXT,
+            stage TEXT,
+            loads INTEGER NOT NULL DEFAULT 0,
+{sum_columns},
+            PRIMARY KEY (hour, court, stage)
+        )
+    ''')
+    if rebuild_hourly:
+        rebuild_page_load_hourly(cursor)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS page_resources (
+            court TEXT,
+            url TEXT,
+            initiator TEXT,
+            loads INTEGER NOT NULL DEFAULT 0,
+            total_ms REAL NOT NULL DEFAULT 0,
+            max_ms REAL NOT NULL DEFAULT 0,
+            transfer_bytes INTEGER NOT NULL DEFAULT 0,
+            last_seen_at DATETIME,
+            PRIMARY KEY (court, url)
+        )
+    ''')
+
+    # Text of order PDFs, one row per distinct PDF content, searchable through order_search
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_documents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content_hash TEXT NOT NULL UNIQUE,
+            text TEXT,
+            pages INTEGER,
+            extracted_at DATETIME
+        )
+    ''')
+    # Where each PDF came from: the case and order it belongs to
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_sources (
+            pdf_url TEXT PRIMARY KEY,
+            court TEXT NOT NULL,
+            case_type TEXT NOT NULL,
+            case_number TEXT NOT NULL,
+            filing_year TEXT NOT NULL,
+            order_date DATE,
+            content_hash TEXT,
+            fetched_at DATETIME
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_order_sources_hash ON order_sources (content_hash)')
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS order_search USING fts5(
+            text, content='order_documents', content_rowid='id'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS order_search_insert AFTER INSERT ON order_documents BEGIN
+            INSERT INTO order_search (rowid, text) VALUES (new.id, new.text);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS order_search_delete AFTER DELETE ON order_documents BEGIN
+            INSERT INTO order_search (order_search, rowid, text) VALUES ('delete', old.id, old.text);
+        END
+    ''')
+    conn.commit()
+
+    # Index cases fetched before the search index / hearing columns existed
+    cursor.execute('SELECT 1 FROM cases LIMIT 1')
+    if cursor.fetchone() is None or missing_columns:
+        rebuild_case_index(conn)
+    # Count the lookups logged before the analytics tables existed
+    cursor.execute('SELECT 1 FROM stats_outcomes LIMIT 1')
+    if cursor.fetchone() is None:
+        rebuild_stats(conn)
+    conn.close()
+
+
+def to_iso_date(value):
+    """Convert a court date ("DD/MM/YYYY", or already ISO) to "YYYY-MM-DD"; anything else gives None"""
+    if not value:
+        return None
+    value = value.strip()
+    for date_format in ('%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def upsert_case(cursor, query_id, case_type, case_number, filing_year, parsed_data, updated_at=None,
+                court=DEFAULT_COURT):
+    """Record the latest parsed state of a case (the FTS index follows via triggers)"""
+    parties = parsed_data.get('parties') or {}
+    dates = parsed_data.get('dates') or {}
+    pdf_link = parsed_data.get('pdf_link')
+    order_page_link = parsed_data.get('order_page_link')
+    cursor.execute('''
+        INSERT INTO cases (court, case_type, case_number, filing_year, petitioner, respondent, case_status,
+                           next_hearing, last_date, court_no, pdf_link, order_page_link,
+                           last_query_id, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (court, case_type, case_number, filing_year) DO UPDATE SET
+            petitioner = excluded.petitioner,
+            respondent = excluded.respondent,
+            case_status = excluded.case_status,
+            next_hearing = excluded.next_hearing,
+            last_date = excluded.last_date,
+            court_no = excluded.court_no,
+            -- A partial scrape (order stage skipped) keeps the PDF link already on record
+            pdf_link = CASE WHEN ? THEN COALESCE(excluded.pdf_link, cases.pdf_link) ELSE excluded.pdf_link END,
+            order_page_link = excluded.order_page_link,
+            last_query_id = excluded.last_query_id,
+            updated_at = excluded.updated_at
+    ''', (court, case_type, case_number, str(filing_year), parties.get('petitioner'), parties.get('respondent'),
+          parsed_data.get('case_status'),
+          # "filing_date" in parsed_data holds the court's "Last Date"
+          to_iso_date(dates.get('next_hearing')), to_iso_date(dates.get('filing_date')), dates.get('court_no'),
+          pdf_link if pdf_link and pdf_link != '#' else None,
+          order_page_link if order_page_link and order_page_link != '#' else None,
+          query_id, updated_at or datetime.now(), bool(parsed_data.get('partial'))))
+
+
+def rebuild_case_index(conn):
+    """Populate cases (and so case_search) from the stored query log"""
+    cursor = conn.cursor()
+    rows = conn.execute('''
+        SELECT id, court, case_type, case_number, filing_year, query_timestamp, raw_response, parsed_data
+        FROM queries ORDER BY id
+    ''')
+    for query_id, court, case_type, case_number, filing_year, query_timestamp, raw_response, parsed_data in rows:
+        if is_mock_response(raw_response) or not parsed_data:
+            continue
+        try:
+            upsert_case(cursor, query_id, case_type, case_number, filing_year, json.loads(parsed_data),
+                        updated_at=query_timestamp, court=court)
+        except (ValueError, AttributeError):
+            continue
+    conn.commit()
+
+
+def count_lookup(cursor, outcome, court=DEFAULT_COURT, case=None, at=None):
+    """Add one lookup to the analytics tables (and to its case's counter when case is given)"""
+    at = at or datetime.now()
+    hour = at.strftime('%Y-%m-%d %H:00')
+    cursor.execute('''
+        INSERT INTO stats_hourly (hour, court, outcome, lookups) VALUES (?, ?, ?, 1)
+        ON CONFLICT (hour, court, outcome) DO UPDATE SET lookups = lookups + 1
+    ''', (hour, court, outcome))
+    cursor.execute('''
+        INSERT INTO stats_outcomes (court, outcome, lookups) VALUES (?, ?, 1)
+        ON CONFLICT (court, outcome) DO UPDATE SET lookups = lookups + 1
+    ''', (court, outcome))
+    if case is not None:
+        case_type, case_number, filing_year = case
+        cursor.execute('''
+            INSERT INTO stats_cases (court, case_type, case_number, filing_year, lookups, last_lookup_at)
+            VALUES (?, ?, ?, ?, 1, ?)
+            ON CONFLICT (court, case_type, case_number, filing_year) DO UPDATE SET
+                lookups = lookups + 1,
+                last_lookup_at = excluded.last_lookup_at
+        ''', (court, case_type, case_number, str(filing_year), at))
+
+
+def record_lookup(outcome, court=DEFAULT_COURT, case=None):
+    """Count a lookup that is not logged to queries (not found, failed, cached, ...)"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    count_lookup(cursor, outcome, court, case)
+    conn.commit()
+    conn.close()
+
+
+def record_page_loads(page_loads, court=DEFAULT_COURT):
+    """
+    Store the page loads timed by a scraper and add them to the hourly and per-resource sums
+
+    Args:
+        page_loads (list): dicts with stage, url, loaded_at, case (or None), the PAGE_TIMING_METRICS,
+            transfer_bytes, resource_count and slowest_resources ({url, initiator, duration_ms, transfer_bytes})
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM page_loads WHERE loaded_at < ?',
+                   (datetime.now() - timedelta(days=PAGE_LOADS_RETENTION_DAYS),))
+    columns = ', '.join(PAGE_TIMING_METRICS)
+    sum_columns = ', '.join(f'{metric}, {metric}_samples' for metric in PAGE_TIMING_AVERAGES)
+    for page_load in page_loads:
+        case_type, case_number, filing_year = page_load.get('case') or (None, None, None)
+        loaded_at = page_load['loaded_at']
+        metrics = [page_load.get(metric) for metric in PAGE_TIMING_METRICS]
+        resources = page_load.get('slowest_resources') or []
+        cursor.execute(f'''
+            INSERT INTO page_loads (court, case_type, case_number, filing_year, stage, url, loaded_at, {columns},
+                                    transfer_bytes, resource_count, slowest_resources)
+            VALUES ({', '.join('?' * (len(PAGE_TIMING_METRICS) + 10))})
+        ''', (court, case_type, case_number, str(filing_year) if filing_year else None, page_load['stage'],
+              page_load.get('url'), loaded_at, *metrics, page_load.get('transfer_bytes'),
+              page_load.get('resource_count'), json.dumps(resources)))
+
+        # Missing or 0 timings (no TLS on a reused connection, load not finished) are not samples
+        samples = [value or None for value in metrics]
+        load_ms, get_ms = page_load.get('load_ms'), page_load.get('get_ms')
+        samples.append(get_ms - load_ms if load_ms and get_ms is not None else None)
+        sums = []
+        for value in samples:
+            sums += [value or 0, 0 if value is None else 1]
+        cursor.execute(f'''
+            INSERT INTO page_load_hourly (hour, court, stage, loads, {sum_columns})
+            VALUES (?, ?, ?, 1, {', '.join('?' * len(sums))})
+            ON CONFLICT (hour, court, stage) DO UPDATE SET
+                loads = loads + 1,
+                {', '.join(f'{column} = {column} + excluded.{column}' for column in sum_columns.split(', '))}
+        ''', (loaded_at.strftime('%Y-%m-%d %H:00'), court, page_load['stage'], *sums))
+
+        for resource in resources:
+            cursor.execute('''
+                INSERT INTO page_resources (court, url, initiator, loads, total_ms, max_ms, transfer_bytes, last_seen_at)
+                VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+                ON CONFLICT (court, url) DO UPDATE SET
+                    loads = loads + 1,
+                    total_ms = total_ms + excluded.total_ms,
+                    max_ms = max(max_ms, excluded.max_ms),
+                    transfer_bytes = transfer_bytes + excluded.transfer_bytes,
+                    last_seen_at = excluded.last_seen_at
+            ''', (court, resource['url'], resource.get('initiator'), resource['duration_ms'], resource['duration_ms'],
+                  resource.get('transfer_bytes') or 0, loaded_at))
+    conn.commit()
+    conn.close()
+
+
+def rebuild_page_load_hourly(cursor):
+    """Refill page_load_hourly from the page loads still kept"""
+    sum_columns = ', '.join(f'{metric}, {metric}_samples' for metric in PAGE_TIMING_AVERAGES)
+    sums = ', '.join(f'COALESCE(sum({PAGE_TIMING_SAMPLE_SQL[metric]}), 0), count({PAGE_TIMING_SAMPLE_SQL[metric]})'
+                     for metric in PAGE_TIMING_AVERAGES)
+    cursor.execute(f'''
+        INSERT INTO page_load_hourly (hour, court, stage, loads, {sum_columns})
+        SELECT substr(loaded_at, 1, 13) || ':00', court, stage, count(*), {sums}
+        FROM page_loads
+        GROUP BY substr(loaded_at, 1, 13), court, stage
+    ''')
+
+
+def get_page_timings(since_hour, top=10, court=None):
+    """Average page load timings per hour and stage since since_hour, and the slowest resources overall"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    court_filter = ' AND court = ?' if court else ''
+    court_params = [court] if court else []
+
+    sums = ', '.join(f'sum({metric}), sum({metric}_samples)' for metric in PAGE_TIMING_AVERAGES)
+    cursor.execute(f'''
+        SELECT hour, stage, sum(loads), {sums}
+        FROM page_load_hourly
+        WHERE hour >= ?{court_filter}
+        GROUP BY hour, stage ORDER BY hour, stage
+    ''', [since_hour] + court_params)
+    hourly = []
+    for hour, stage, loads, *sums in cursor.fetchall():
+        # Each timing is averaged over the loads that reported it (None when none did)
+        averages = {
+            metric: round(total / samples, 1) if samples else None
+            for metric, total, samples in zip(PAGE_TIMING_AVERAGES, sums[0::2], sums[1::2])
+        }
+        hourly.append({'hour': hour, 'stage': stage, 'loads': loads, 'averages': averages})
+
+    cursor.execute(f'''
+        SELECT url, initiator, sum(loads), sum(total_ms), max(max_ms), sum(transfer_bytes), max(last_seen_at)
+        FROM page_resources
+        WHERE 1 = 1{court_filter}
+        GROUP BY url ORDER BY sum(total_ms) DESC LIMIT ?
+    ''', court_params + [top])
+    resources = [
+        {
+            'url': row[0],
+            'initiator': row[1],
+            'loads': row[2],
+            'totalMs': round(row[3], 1),
+            'averageMs': round(row[3] / row[2], 1),
+            'maxMs': round(row[4], 1),
+            'transferBytes': row[5],
+            'lastSeenAt': row[6]
+        }
+        for row in cursor.fetchall()
+    ]
+    conn.close()
+    return hourly, resources
+
+
+def get_case_page_loads(case_type, case_number, filing_year, court=DEFAULT_COURT, limit=20):
+    """Latest timed page loads of one case's scrapes, newest first"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT stage, url, loaded_at, {', '.join(PAGE_TIMING_METRICS)}, transfer_bytes, resource_count,
+               slowest_resources
+        FROM page_loads
+        WHERE court = ? AND case_type = ? AND case_number = ? AND filing_year = ?
+        ORDER BY id DESC LIMIT ?
+    ''', (court, case_type, case_number, str(filing_year), limit))
+    page_loads = []
+    for row in cursor.fetchall():
+        transfer_bytes, resource_count, slowest_resources = row[-3:]
+        page_loads.append({
+            'stage': row[0],
+            'url': row[1],
+            'loadedAt': row[2],
+            'timings': dict(zip(PAGE_TIMING_METRICS, row[3:-3])),
+            'transferBytes': transfer_bytes,
+            'resourceCount': resource_count,
+            'slowestResources': json.loads(slowest_resources) if slowest_resources else []
+        })
+    conn.close()
+    return page_loads
+
+
+def rebuild_stats(conn):
+    """Fill the analytics tables from the stored query log (one scan, on first start)"""
+    cursor = conn.cursor()
+    rows = conn.execute('SELECT court, case_type, case_number, filing_year, query_timestamp, raw_response FROM queries')
+    for court, case_type, case_number, filing_year, query_timestamp, raw_response in rows:
+        try:
+            at = datetime.fromisoformat(str(query_timestamp))
+        except ValueError:
+            continue
+        count_lookup(cursor, 'mock' if is_mock_response(raw_response) else 'ok', court,
+                     (case_type, case_number, filing_year), at)
+    conn.commit()
+
+
+def log_query(case_type, case_number, filing_year, raw_response, parsed_data, court=DEFAULT_COURT):
+    conn = get_connection()
+    cursor = conn.cursor()
+    now = datetime.now()
+    cursor.execute('''
+        INSERT INTO queries (court, case_type, case_number, filing_year, query_timestamp, raw_response, parsed_data)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (court, case_type, case_number, filing_year, now, raw_response, json.dumps(parsed_data)))
+    # Mock fallbacks are logged but never replace the known state of a case
+    if not is_mock_response(raw_response):
+        upsert_case(cursor, cursor.lastrowid, case_type, case_number, filing_year, parsed_data, court=court)
+    count_lookup(cursor, 'mock' if is_mock_response(raw_response) else 'ok', court,
+                 (case_type, case_number, filing_year), now)
+    conn.commit()
+    conn.close()
+
+
+def get_stats(since_hour, top=10, court=None):
+    """Outcome totals, hourly lookups since since_hour ("YYYY-MM-DD HH:00") and the most-queried cases"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    court_filter = ' AND court = ?' if court else ''
+    court_params = [court] if court else []
+
+    cursor.execute(f'SELECT outcome, sum(lookups) FROM stats_outcomes WHERE 1 = 1{court_filter} GROUP BY outcome',
+                   court_params)
+    totals = dict(cursor.fetchall())
+
+    cursor.execute(f'''
+        SELECT hour, outcome, sum(lookups) FROM stats_hourly
+        WHERE hour >= ?{court_filter}
+        GROUP BY hour, outcome ORDER BY hour
+    ''', [since_hour] + court_params)
+    hourly = {}
+    for hour, outcome, lookups in cursor.fetchall():
+        hourly.setdefault(hour, {})[outcome] = lookups
+
+    cursor.execute(f'''
+        SELECT court, case_type, case_number, filing_year, lookups, last_lookup_at FROM stats_cases
+        WHERE 1 = 1{court_filter}
+        ORDER BY lookups DESC LIMIT ?
+    ''', court_params + [top])
+    top_cases = [
+        {
+            'court': row[0],
+            'caseType': row[1],
+            'caseNumber': row[2],
+            'filingYear': row[3],
+            'lookups': row[4],
+            'lastLookupAt': row[5]
+        }
+        for row in cursor.fetchall()
+    ]
+    conn.close()
+    return totals, hourly, top_cases
+
+
+def build_fts_query(text):
+    """Turn free text into a safe FTS5 query: every word must match, the last one as a prefix"""
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_cases(text, page=1, per_page=20):
+    """
+    Ranked full-text search over the indexed cases
+
+    Returns:
+        tuple: (total match count, list of result dicts for the requested page)
+    """
+    fts_query = build_fts_query(text)
+    if fts_query is None:
+        return 0, []
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT count(*) FROM case_search WHERE case_search MATCH ?', (fts_query,))
+    total = cursor.fetchone()[0]
+    # bm25 column weights: party names count most, then the case keys
+    cursor.execute('''
+        SELECT c.case_type, c.case_number, c.filing_year, c.petitioner, c.respondent,
+               c.case_status, c.updated_at, bm25(case_search, 3.0, 3.0, 1.0, 5.0, 5.0, 1.0) AS score, c.court
+        FROM case_search
+        JOIN cases c ON c.id = case_search.rowid
+        WHERE case_search MATCH ?
+        ORDER BY score
+        LIMIT ? OFFSET ?
+    ''', (fts_query, per_page, (page - 1) * per_page))
+    results = [
+        {
+            'caseType': row[0],
+            'caseNumber': row[1],
+            'filingYear': row[2],
+            'petitioner': row[3],
+            'respondent': row[4],
+            'caseStatus': row[5],
+            'updatedAt': row[6],
+            'score': round(-row[7], 4),
+            'court': row[8]
+        }
+        for row in cursor.fetchall()
+    ]
+    conn.close()
+    return total, results
+
+
+def search_orders(text, page=1, per_page=20):
+    """
+    Ranked full-text search inside order PDFs, with highlighted snippets
+
+    Returns:
+        tuple: (total match count, list of result dicts for the requested page)
+    """
+    fts_query = build_fts_query(text)
+    if fts_query is None:
+        return 0, []
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT count(*) FROM order_search
+        JOIN order_documents d ON d.id = order_search.rowid
+        JOIN order_sources s ON s.content_hash = d.content_hash
+        WHERE order_search MATCH ?
+    ''', (fts_query,))
+    total = cursor.fetchone()[0]
+    # Control characters mark the matches so the snippet can be HTML-escaped before highlighting
+    cursor.execute('''
+        SELECT s.court, s.case_type, s.case_number, s.filing_year, s.order_date, s.pdf_url, d.pages,
+               snippet(order_search, 0, char(2), char(3), '…', 24) AS snippet, bm25(order_search) AS score
+        FROM order_search
+        JOIN order_documents d ON d.id = order_search.rowid
+        JOIN order_sources s ON s.content_hash = d.content_hash
+        WHERE order_search MATCH ?
+        ORDER BY score, s.order_date DESC
+        LIMIT ? OFFSET ?
+    ''', (fts_query, per_page, (page - 1) * per_page))
+    results = [
+        {
+            'court': row[0],
+            'caseType': row[1],
+            'caseNumber': row[2],
+            'filingYear': row[3],
+            'orderDate': row[4],
+            'pdfUrl': row[5],
+            'pages': row[6],
+            'snippet': html.escape(row[7]).replace('\x02', '<mark>').replace('\x03', '</mark>'),
+            'score': round(-row[8], 4)
+        }
+        for row in cursor.fetchall()
+    ]
+    conn.close()
+    return total, results
+
+
+def get_hearings(start_date, end_date, court_no=None, limit=500, court=None):
+    """Cases with a next hearing between start_date and end_date (inclusive, ISO dates), of one court or all"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    sql = '''
+        SELECT case_type, case_number, filing_year, petitioner, respondent, case_status,
+               next_hearing, last_date, court_no, pdf_link, updated_at, court
+        FROM cases
+        WHERE next_hearing BETWEEN ? AND ?
+    '''
+    params = [start_date, end_date]
+    if court_no:
+        sql += ' AND court_no = ?'
+        params.append(court_no)
+    if court:
+        sql += ' AND court = ?'
+        params.append(court)
+    sql += ' ORDER BY next_hearing, court_no LIMIT ?'
+    params.append(limit)
+    cursor.execute(sql, params)
+    hearings = [
+        {
+            'caseType': row[0],
+            'caseNumber': row[1],
+            'filingYear': row[2],
+            'petitioner': row[3],
+            'respondent': row[4],
+            'caseStatus': row[5],
+            'nextHearing': row[6],
+            'lastDate': row[7],
+            'courtNo': row[8],
+            'pdfLink': row[9],
+            'updatedAt': row[10],
+            'courtCode': row[11]
+        }
+        for row in cursor.fetchall()
+    ]
+    conn.close()
+    return hearings
+
+
+def iter_hearings(start_date, end_date, court_no=None, court=None):
+    """
+    Stream cases with a next hearing in the range straight off the SQLite cursor,
+    so exports of any size run in constant memory
+    """
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    try:
+        sql = '''
+            SELECT case_type, case_number, filing_year, petitioner, respondent, case_status,
+                   next_hearing, last_date, court_no, pdf_link, updated_at, court
+            FROM cases
+            WHERE next_hearing BETWEEN ? AND ?
+        '''
+        params = [start_date, end_date]
+        if court_no:
+            sql += ' AND court_no = ?'
+            params.append(court_no)
+        if court:
+            sql += ' AND court = ?'
+            params.append(court)
+        sql += ' ORDER BY next_hearing, court_no'
+        for row in conn.execute(sql, params):
+            yield row
+    finally:
+        conn.close()
+
+
+def get_hearings_version(start_date, end_date, court_no=None, court=None):
+    """(row count, latest updated_at) of a hearings range; changes whenever the export would"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    sql = 'SELECT count(*), max(updated_at) FROM cases WHERE next_hearing BETWEEN ? AND ?'
+    params = [start_date, end_date]
+    if court_no:
+        sql += ' AND court_no = ?'
+        params.append(court_no)
+    if court:
+        sql += ' AND court = ?'
+        params.append(court)
+    cursor.execute(sql, params)
+    count, last_updated = cursor.fetchone()
+    conn.close()
+    return count, last_updated
+
+
+def get_last_known_result(case_type, case_number, filing_year, court=DEFAULT_COURT):
+    """Latest real (non-mock) parsed result stored for a case, as (parsed_data, fetched_at)"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT q.parsed_data, q.query_timestamp
+        FROM cases c
+        JOIN queries q ON q.id = c.last_query_id
+        WHERE c.court = ? AND c.case_type = ? AND c.case_number = ? AND c.filing_year = ?
+    ''', (court, case_type, case_number, filing_year))
+    row = cursor.fetchone()
+    conn.close()
+    if row is None:
+        return None
+    return json.loads(row[0]), row[1]
+
+
+def is_known_missing(case_type, case_number, filing_year, court=DEFAULT_COURT):
+    """Check whether the case was recently reported as not found by the court"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT 1 FROM negative_cache
+        WHERE court = ? AND case_type = ? AND case_number = ? AND filing_year = ? AND expires_at > ?
+    ''', (court, case_type, case_number, filing_year, time.time()))
+    found = cursor.fetchone() is not None
+    conn.close()
+    return found
+
+
+def record_missing_case(case_type, case_number, filing_year, ttl, court=DEFAULT_COURT):
+    """Remember a "case not found" outcome for ttl seconds"""
+    now = time.time()
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM negative_cache WHERE expires_at <= ?', (now,))
+    cursor.execute('''
+        INSERT OR REPLACE INTO negative_cache (court, case_type, case_number, filing_year, recorded_at, expires_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (court, case_type, case_number, filing_year, now, now + ttl))
+    conn.commit()
+    conn.close()
+
+
+def clear_missing_case(case_type, case_number, filing_year, court=DEFAULT_COURT):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        DELETE FROM negative_cache WHERE court = ? AND case_type = ? AND case_number = ? AND filing_year = ?
+    ''', (court, case_type, case_number, filing_year))
+    conn.commit()
+    conn.close()
+
+
+def load_case_metadata():
+    """Load the scraped case type/year options from the database, if any"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT value, fetched_at FROM metadata_cache WHERE key = 'case_options'")
+    row = cursor.fetchone()
+    conn.close()
+    if row is None:
+        return None
+    return json.loads(row[0]), row[1]
+
+
+def store_case_metadata(metadata, fetched_at):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT OR REPLACE INTO metadata_cache (key, value, fetched_at)
+        VALUES ('case_options', ?, ?)
+    ''', (json.dumps(metadata), fetched_at))
+    conn.commit()
+    conn.close()
+
+
+def take_rate_token(name, rate_per_minute, burst=1, reserve=0):
+    """
+    Take a token from the named token bucket (refilled at rate_per_minute, holding up to burst),
+    only while `reserve` more would be left in it
+
+    Returns:
+        float: 0 when a token was taken, otherwise the seconds until one is due
+    """
+    conn = get_connection()
+    # The read and the update are one write transaction, so processes never take the same token
+    conn.isolation_level = None
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        now = time.time()
+        row = conn.execute('SELECT tokens, updated_at FROM rate_budgets WHERE name = ?', (name,)).fetchone()
+        tokens = float(burst) if row is None else min(burst, row[0] + max(0, now - row[1]) * rate_per_minute / 60)
+        wait = 0.0
+        if tokens >= 1 + reserve:
+            tokens -= 1
+        else:
+            wait = (1 + reserve - tokens) * 60 / rate_per_minute
+        conn.execute('''
+            INSERT INTO rate_budgets (name, tokens, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at
+        ''', (name, tokens, now))
+        conn.execute('COMMIT')
+        return wait
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
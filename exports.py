@@ -0,0 +1,106 @@
+import csv
+from datetime import date, datetime, timedelta, timezone
+
+# Columns of the hearings CSV export, in order
+HEARING_CSV_COLUMNS = [
+    'next_hearing', 'court_no', 'case_type', 'case_number', 'filing_year',
+    'petitioner', 'respondent', 'case_status', 'last_date', 'pdf_link'
+]
+
+
+class _LineBuffer:
+    """File-like object that hands each csv.writer line straight back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def hearings_csv(rows):
+    """Yield the hearings export as CSV, one line per case"""
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(HEARING_CSV_COLUMNS)
+    for row in rows:
+        yield writer.writerow([row[column] or '' for column in HEARING_CSV_COLUMNS])
+
+
+def _ics_escape(value):
+    """Escape text for an iCalendar property value (RFC 5545, section 3.3.11)"""
+    return (str(value or '')
+            .replace('\\', '\\\\')
+            .replace(';', '\\;')
+            .replace(',', '\\,')
+            .replace('\r\n', '\\n')
+            .replace('\n', '\\n'))
+
+
+def _ics_line(line):
+    """Fold a content line at 75 octets as iCalendar requires"""
+    parts, current, size, limit = [], '', 0, 75
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        if size + char_size > limit:
+            # Continuation lines start with a space, which counts towards their 75 octets
+            parts.append(current)
+            current, size, limit = '', 0, 74
+        current += char
+        size += char_size
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def local_to_utc(value):
+    """A stored timestamp (naive local time, ISO text or datetime) as an aware UTC datetime, or None"""
+    if not value:
+        return None
+    try:
+        stamp = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    return stamp.astimezone(timezone.utc)
+
+
+def _ics_timestamp(value):
+    """DTSTAMP value: UTC with the Z suffix, as RFC 5545 requires"""
+    stamp = local_to_utc(value) or datetime.now(timezone.utc)
+    return stamp.strftime('%Y%m%dT%H%M%SZ')
+
+
+def hearings_ics(rows, calendar_name='Court hearings', court_names=None):
+    """
+    Yield the hearings export as an iCalendar feed with one all-day event per hearing
+
+    court_names maps a row's court code to the name used in its LOCATION
+    """
+    court_names = court_names or {}
+    yield ''.join([
+        _ics_line('BEGIN:VCALENDAR'),
+        _ics_line('VERSION:2.0'),
+        _ics_line('PRODID:-//Court Data Fetcher//Hearings Export//EN'),
+        _ics_line('CALSCALE:GREGORIAN'),
+        _ics_line('METHOD:PUBLISH'),
+        _ics_line(f'X-WR-CALNAME:{_ics_escape(calendar_name)}')
+    ])
+    for row in rows:
+        hearing_date = date.fromisoformat(row['next_hearing'])
+        case_label = f"{row['case_type']} {row['case_number']}/{row['filing_year']}"
+        uid = ''.join(ch if ch.isalnum() else '-' for ch in case_label)
+        summary = case_label + (f" - Court {row['court_no']}" if row['court_no'] else '')
+        description = f"{row['petitioner'] or 'N/A'} vs. {row['respondent'] or 'N/A'}\nStatus: {row['case_status'] or 'N/A'}"
+        if row['pdf_link']:
+            description += f"\nLatest order: {row['pdf_link']}"
+        court_name = court_names.get(row['court'], row['court'])
+        location = court_name + (f", Court No. {row['court_no']}" if row['court_no'] else '')
+
+        yield ''.join([
+            _ics_line('BEGIN:VEVENT'),
+            _ics_line(f'UID:{uid}-{hearing_date:%Y%m%d}@court-scraper'),
+            _ics_line(f"DTSTAMP:{_ics_timestamp(row['updated_at'])}"),
+            _ics_line(f'DTSTART;VALUE=DATE:{hearing_date:%Y%m%d}'),
+            _ics_line(f'DTEND;VALUE=DATE:{hearing_date + timedelta(days=1):%Y%m%d}'),
+            _ics_line(f'SUMMARY:{_ics_escape(summary)}'),
+            _ics_line(f'LOCATION:{_ics_escape(location)}'),
+            _ics_line(f'DESCRIPTION:{_ics_escape(description)}'),
+            _ics_line('TRANSP:TRANSPARENT'),
+            _ics_line('END:VEVENT')
+        ])
+    yield _ics_line('END:VCALENDAR')
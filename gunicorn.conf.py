@@ -1,5 +1,6 @@
 # Gunicorn configuration file for production deployment
 import multiprocessing
+import os
 
 # Server socket
 bind = "0.0.0.0:5000"
@@ -7,7 +8,10 @@ backlog = 2048
 
 # Worker processes
 workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
+# "gthread" with several threads lets the /api/async/* routes wait on the
+# shared asyncio scrape engine for many requests per worker at once
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
 worker_connections = 1000
 timeout = 30
 keepalive = 2
@@ -38,3 +42,9 @@ tmp_upload_dir = None
 
 # Preload app for better performance
 preload_app = True
+
+
+def post_fork(server, worker):
+    # Threads do not survive the fork, and the job workers should run in one worker process only
+    from job_queue import start_job_workers_in_one_process
+    start_job_workers_in_one_process()
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Durable scrape job queue shared by every app instance through the database.
+
+Any instance can enqueue a case lookup. Any instance with an idle scrape slot
+claims the most urgent, oldest job and holds it under a lease that its worker
+renews (heartbeats) while the scrape runs. When a worker crashes it stops
+renewing; once the lease expires another worker claims the job, up to
+JOB_MAX_ATTEMPTS times in all. Claims run in BEGIN IMMEDIATE transactions, so
+no two processes ever claim the same job. A job whose lease was lost cannot
+complete, so only the current holder records the result.
+
+Probe jobs (refreshes of cases already stored) first ask the court adapter for a
+cheap change probe. When it shows the stored result is still current the job
+finishes as 'unchanged' without a browser; a change, an inconclusive probe or a
+stored result older than JOB_PROBE_MAX_AGE runs the full scrape.
+
+Usage (dedicated worker process; the web app also runs JOB_WORKERS in one of its worker processes):
+    python job_queue.py --workers 2
+    python job_queue.py --refresh-cases   # queue a probe refresh of every stored case
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from courts import get_court
+from database import (
+    init_db, get_connection, log_query, record_missing_case, clear_missing_case, is_mock_response, record_lookup,
+    get_last_known_result, DB_PATH, DEFAULT_COURT
+)
+from scheduler import scrape_scheduler, QueueTimeout, PRIORITY_CLASSES, API, BACKGROUND
+from scraper import Deadline, CASE_NOT_FOUND, DEADLINE_EXCEEDED
+
+# Seconds a claimed job stays leased without a heartbeat (renewed every third of it)
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 30))
+# Claims of a job (including ones lost to crashed workers) before it is marked failed
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+# Time budget of one job's scrape
+JOB_SCRAPE_DEADLINE_SECONDS = float(os.environ.get('JOB_SCRAPE_DEADLINE_SECONDS', 60))
+# Seconds an idle worker waits before looking for work again
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))
+# Job worker threads of the app worker process that runs them (0 = only enqueue here)
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 1))
+# Held by the one gunicorn worker process per host that runs the job workers
+JOB_WORKERS_LOCK = os.environ.get('JOB_WORKERS_LOCK', f'{DB_PATH}.job-workers.lock')
+# Probe jobs still scrape in full once the stored result is this old (hearing dates can move without a new order)
+JOB_PROBE_MAX_AGE = float(os.environ.get('JOB_PROBE_MAX_AGE', 7 * 24 * 3600))
+# Same default as the web app's NEGATIVE_CACHE_TTL
+NEGATIVE_CACHE_TTL = int(os.environ.get('NEGATIVE_CACHE_TTL', 15 * 60))
+
+JOB_COLUMNS = ('id', 'court', 'case_type', 'case_number', 'filing_year', 'priority', 'status', 'attempts',
+               'max_attempts', 'lease_owner', 'lease_expires_at', 'enqueued_at', 'started_at', 'finished_at',
+               'result', 'error', 'probe')
+
+# Claim order: interactive first, then api, then background; oldest first within a class
+PRIORITY_RANK = "CASE priority WHEN 'interactive' THEN 0 WHEN 'api' THEN 1 ELSE 2 END"
+
+
+def _connect():
+    # Explicit transactions: a claim must read and update the job under one write lock
+    conn = get_connection()
+    conn.isolation_level = None
+    return conn
+
+
+def _job_dict(row):
+    return dict(zip(JOB_COLUMNS, row)) if row else None
+
+
+def enqueue_job(case_type, case_number, filing_year, court=DEFAULT_COURT, priority=API, max_attempts=JOB_MAX_ATTEMPTS,
+                probe=False):
+    """
+    Queue a case lookup, unless the case is already queued or running (probe: try a change probe first)
+
+    Returns:
+        tuple: (job id, True when a new job was created)
+    """
+    priority = priority if priority in PRIORITY_CLASSES else API
+    conn = _connect()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        cursor = conn.execute('''
+            INSERT INTO scrape_jobs (court, case_type, case_number, filing_year, priority, max_attempts, enqueued_at, probe)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (court, case_type, case_number, filing_year) WHERE status IN ('queued', 'running') DO NOTHING
+        ''', (court, case_type, case_number, str(filing_year), priority, max_attempts, time.time(), int(bool(probe))))
+        created = cursor.rowcount == 1
+        job_id = conn.execute('''
+            SELECT id FROM scrape_jobs
+            WHERE court = ? AND case_type = ? AND case_number = ? AND filing_year = ? AND status IN ('queued', 'running')
+        ''', (court, case_type, case_number, str(filing_year))).fetchone()[0]
+        conn.execute('COMMIT')
+        return job_id, created
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+
+def enqueue_refresh_jobs(court=None, priority=BACKGROUND):
+    """Queue a probe job for every stored case (of one court); returns the number of new jobs"""
+    conn = get_connection()
+    cases = conn.execute(f'''
+        SELECT court, case_type, case_number, filing_year FROM cases {'WHERE court = ?' if court else ''}
+    ''', (court,) if court else ()).fetchall()
+    conn.close()
+    created = 0
+    for case_court, case_type, case_number, filing_year in cases:
+        created += enqueue_job(case_type, case_number, filing_year, court=case_court, priority=priority, probe=True)[1]
+    return created
+
+
+def get_job(job_id):
+    conn = _connect()
+    row = conn.execute(f'SELECT {", ".join(JOB_COLUMNS)} FROM scrape_jobs WHERE id = ?', (job_id,)).fetchone()
+    conn.close()
+    return _job_dict(row)
+
+
+def get_jobs(job_ids):
+    """The jobs with these ids (in no particular order)"""
+    conn = _connect()
+    rows = conn.execute(f'SELECT {", ".join(JOB_COLUMNS)} FROM scrape_jobs WHERE id IN ({", ".join("?" * len(job_ids))})',
+                        job_ids).fetchall()
+    conn.close()
+    return [_job_dict(row) for row in rows]
+
+
+def claim_job(owner, lease_seconds=JOB_LEASE_SECONDS, priorities=PRIORITY_CLASSES):
+    """Lease the next runnable job of these classes (queued, or running under an expired lease) to owner, or None"""
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        # Jobs that keep losing their worker give up instead of crashing the next one
+        conn.execute('''
+            UPDATE scrape_jobs
+            SET status = 'failed', error = 'Lease expired', lease_owner = NULL, finished_at = ?
+            WHERE status = 'running' AND lease_expires_at < ? AND attempts >= max_attempts
+        ''', (now, now))
+        row = conn.execute(f'''
+            SELECT id FROM scrape_jobs
+            WHERE (status = 'queued' OR (status = 'running' AND lease_expires_at < ?))
+              AND priority IN ({", ".join("?" * len(priorities))})
+            ORDER BY {PRIORITY_RANK}, id
+            LIMIT 1
+        ''', (now, *priorities)).fetchone()
+        if row is None:
+            conn.execute('COMMIT')
+            return None
+        conn.execute('''
+            UPDATE scrape_jobs
+            SET status = 'running', lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1, started_at = ?
+            WHERE id = ?
+        ''', (owner, now + lease_seconds, now, row[0]))
+        job = _job_dict(conn.execute(f'SELECT {", ".join(JOB_COLUMNS)} FROM scrape_jobs WHERE id = ?',
+                                     (row[0],)).fetchone())
+        conn.execute('COMMIT')
+        return job
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+
+def _update_leased(job_id, owner, assignments, params):
+    """Apply an update to a job only while owner still holds its lease; False once it was lost"""
+    conn = _connect()
+    try:
+        cursor = conn.execute(f'''
+            UPDATE scrape_jobs SET {assignments}
+            WHERE id = ? AND status = 'running' AND lease_owner = ? AND lease_expires_at >= ?
+        ''', (*params, job_id, owner, time.time()))
+        return cursor.rowcount == 1
+    finally:
+        conn.close()
+
+
+def renew_lease(job_id, owner, lease_seconds=JOB_LEASE_SECONDS):
+    return _update_leased(job_id, owner, 'lease_expires_at = ?', (time.time() + lease_seconds,))
+
+
+def complete_job(job_id, owner, status, result=None, error=None):
+    """Finish a leased job as 'done', 'unchanged', 'not_found' or 'failed'"""
+    return _update_leased(job_id, owner, '''
+        status = ?, result = ?, error = ?, lease_owner = NULL, lease_expires_at = NULL, finished_at = ?
+    ''', (status, json.dumps(result) if result is not None else None, error, time.time()))
+
+
+def retry_job(job_id, owner, error):
+    """Give a failed attempt back to the queue, or fail the job once its attempts are used up"""
+    return _update_leased(job_id, owner, '''
+        status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+        finished_at = CASE WHEN attempts >= max_attempts THEN ? ELSE NULL END,
+        error = ?, lease_owner = NULL, lease_expires_at = NULL
+    ''', (time.time(), error))
+
+
+def return_job(job_id, owner):
+    """Hand back a job that never started (no capacity here); the claim does not count as an attempt"""
+    return _update_leased(job_id, owner, '''
+        status = 'queued', attempts = attempts - 1, lease_owner = NULL, lease_expires_at = NULL
+    ''', ())
+
+
+def probe_unchanged(court, case, stored, max_age=JOB_PROBE_MAX_AGE):
+    """True when the court's change probe shows the stored (parsed_data, fetched_at) of a case is current"""
+    if stored is None:
+        return False
+    parsed_data, fetched_at = stored
+    if time.time() - datetime.fromisoformat(fetched_at).timestamp() > max_age:
+        return False
+    return court.probe(*case, parsed_data) == 'unchanged'
+
+
+@contextmanager
+def keep_lease(job_id, owner, lease_seconds=JOB_LEASE_SECONDS):
+    """Heartbeat the job's lease from a background thread for the duration of the with-block"""
+    stopped = threading.Event()
+
+    def heartbeat():
+        while not stopped.wait(lease_seconds / 3):
+            if not renew_lease(job_id, owner, lease_seconds):
+                print(f'Lost the lease on job {job_id}')
+                return
+
+    thread = threading.Thread(target=heartbeat, name=f'job-{job_id}-lease', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+class JobWorker(threading.Thread):
+    """Claims and runs queued jobs whenever this process has an idle scrape slot"""
+
+    def __init__(self, owner, lease_seconds=JOB_LEASE_SECONDS, poll_interval=JOB_POLL_INTERVAL):
+        super().__init__(name=owner, daemon=True)
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.is_set():
+            try:
+                # Only claim jobs this process has a usable browser slot for; others are left to other instances
+                priorities = [priority for priority in PRIORITY_CLASSES if scrape_scheduler.idle_slots(priority) > 0]
+                job = claim_job(self.owner, self.lease_seconds, priorities) if priorities else None
+                if job is None:
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                self.run_job(job)
+            except Exception as e:
+                print('Job worker error', e)
+                self.stopping.wait(self.poll_interval)
+
+    def stop(self):
+        self.stopping.set()
+
+    def run_job(self, job):
+        court = get_court(job['court'])
+        if court is None:
+            complete_job(job['id'], self.owner, 'failed', error=f"Unknown court: {job['court']}")
+            return
+        if not court.breaker.allow_request():
+            # The court is failing fast here; another instance (or a later claim) may do better
+            return_job(job['id'], self.owner)
+            self.stopping.wait(self.poll_interval)
+            return
+
+        case = (job['case_type'], job['case_number'], job['filing_year'])
+        if job['probe']:
+            stored = get_last_known_result(*case, court.code)
+            with keep_lease(job['id'], self.owner, self.lease_seconds):
+                unchanged = probe_unchanged(court, case, stored)
+            if unchanged:
+                if complete_job(job['id'], self.owner, 'unchanged', result=stored[0]):
+                    record_lookup('unchanged', court.code, case)
+                return
+
+        started = time.monotonic()
+        with keep_lease(job['id'], self.owner, self.lease_seconds):
+            try:
+                with court.capacity(job['priority'], timeout=self.lease_seconds):
+                    started = time.monotonic()
+                    parsed_data, raw_response = court.scrape_case(*case, deadline=Deadline(JOB_SCRAPE_DEADLINE_SECONDS))
+            except QueueTimeout:
+                return_job(job['id'], self.owner)
+                return
+            except Exception as e:
+                court.breaker.record(False, time.monotonic() - started, JOB_SCRAPE_DEADLINE_SECONDS)
+                record_lookup('failed', court.code, case)
+                retry_job(job['id'], self.owner, str(e))
+                return
+
+        scrape_failed = raw_response != CASE_NOT_FOUND and (parsed_data is None or is_mock_response(raw_response))
+        # Jobs have a longer budget than lookups: only one that used all of it counts as slow
+        court.breaker.record(not scrape_failed, time.monotonic() - started, JOB_SCRAPE_DEADLINE_SECONDS)
+        if raw_response == CASE_NOT_FOUND:
+            record_lookup('not_found', court.code, case)
+            if complete_job(job['id'], self.owner, 'not_found', error=CASE_NOT_FOUND) and NEGATIVE_CACHE_TTL > 0:
+                record_missing_case(*case, NEGATIVE_CACHE_TTL, court.code)
+        elif scrape_failed:
+            outcome = 'deadline' if raw_response == DEADLINE_EXCEEDED else 'failed' if parsed_data is None else 'mock'
+            record_lookup(outcome, court.code, case)
+            retry_job(job['id'], self.owner, raw_response)
+        elif complete_job(job['id'], self.owner, 'done', result=parsed_data):
+            log_query(*case, raw_response, parsed_data, court.code)
+            clear_missing_case(*case, court.code)
+
+
+_workers = []
+_workers_pid = None
+_workers_lock = threading.Lock()
+# Open for as long as this process runs the job workers (see start_job_workers_in_one_process)
+_workers_lock_file = None
+
+
+def start_job_workers(count=JOB_WORKERS):
+    """Start this process's job workers (once per process: forked workers start their own)"""
+    global _workers, _workers_pid
+    with _workers_lock:
+        if _workers_pid == os.getpid():
+            return _workers
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        _workers = [JobWorker(f'{prefix}:{index}') for index in range(count)]
+        _workers_pid = os.getpid()
+        for worker in _workers:
+            worker.start()
+        return _workers
+
+
+def start_job_workers_in_one_process(count=JOB_WORKERS, lock_path=JOB_WORKERS_LOCK):
+    """
+    Start this process's job workers once it holds the job workers lock
+
+    Called in every gunicorn worker: the first to lock the file runs the job
+    workers, the others wait on it in a thread and take over when that process
+    exits (the lock goes with it).
+    """
+    if count <= 0:
+        return
+
+    def wait_for_lock():
+        global _workers_lock_file
+        lock_file = open(lock_path, 'a')
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        _workers_lock_file = lock_file
+        start_job_workers(count)
+
+    threading.Thread(target=wait_for_lock, name='job-workers-lock', daemon=True).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run scrape jobs from the shared queue')
+    parser.add_argument('--workers', type=int, default=max(JOB_WORKERS, 1), help='concurrent jobs in this process')
+    parser.add_argument('--refresh-cases', action='store_true',
+                        help='queue a background probe job for every stored case and exit')
+    parser.add_argument('--court', default=None, help='with --refresh-cases, only this court\'s cases')
+    args = parser.parse_args()
+
+    init_db()
+    if args.refresh_cases:
+        print(f'{enqueue_refresh_jobs(args.court)} refresh job(s) queued')
+        return 0
+    # A worker process serves no interactive lookups: every slot is for jobs
+    scrape_scheduler.capacity, scrape_scheduler.reserved_interactive = args.workers, 0
+    workers = start_job_workers(args.workers)
+    print(f'{len(workers)} job worker(s) running as {socket.gethostname()}:{os.getpid()}')
+    try:
+        while any(worker.is_alive() for worker in workers):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.stop()
+        for worker in workers:
+            worker.join()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
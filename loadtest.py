@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Load test the API to size gunicorn.conf.py.
+
+Requests to /api/fetch-case, /api/query-history and /api/download-pdf arrive
+open-loop at --rate per second (Poisson arrivals), so queueing inside the
+server shows up as latency instead of slowing the generator down; latency is
+measured from each request's scheduled arrival. Every gunicorn configuration
+given with --config is started in turn on a scratch database with the stub
+scraper backend (SCRAPER_BACKEND=stub, no browser), and its p50/p95/p99
+latency, throughput, error rate and worker saturation are reported per
+endpoint. Saturation is estimated with Little's law: mean requests in flight
+(total time spent in requests / duration) over the request slots of the
+config (workers x threads). From about 1.0 up, requests queue in the listen backlog.
+
+Usage:
+    python loadtest.py --rate 5 --duration 60 \\
+        --config workers=3 --config workers=3,worker_class=gthread,threads=8
+    python loadtest.py --url http://localhost:5000 --slots 5 --rate 2
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+# gunicorn settings a --config may set, and the command-line flags that override gunicorn.conf.py
+GUNICORN_FLAGS = {
+    'workers': '--workers',
+    'worker_class': '--worker-class',
+    'threads': '--threads',
+    'timeout': '--timeout',
+    'backlog': '--backlog',
+}
+# Share of each endpoint in the generated traffic
+DEFAULT_MIX = 'fetch=8,history=1,download=1'
+CLIENT_TIMEOUT = 120
+# A small PDF-sized body served to /api/download-pdf by the harness itself
+PDF_BODY = b'%PDF-1.4\n' + b'0' * 100 * 1024 + b'\n%%EOF\n'
+
+
+def parse_pairs(text, name):
+    """Parse "key=value,key=value" into a dict"""
+    pairs = {}
+    for part in text.split(','):
+        key, _, value = part.partition('=')
+        if not key.strip() or not value.strip():
+            raise argparse.ArgumentTypeError(f'Bad {name}: {text}')
+        pairs[key.strip()] = value.strip()
+    return pairs
+
+
+def parse_config(text):
+    config = parse_pairs(text, 'config')
+    unknown = set(config) - set(GUNICORN_FLAGS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f'Unknown gunicorn setting(s): {", ".join(sorted(unknown))}')
+    return config
+
+
+def config_label(config):
+    return ','.join(f'{key}={value}' for key, value in config.items()) or 'gunicorn.conf.py defaults'
+
+
+def config_slots(config):
+    """Requests a configuration serves at once (same defaults as gunicorn.conf.py)"""
+    workers = int(config.get('workers', multiprocessing.cpu_count() * 2 + 1))
+    return workers * int(config.get('threads', os.environ.get('GUNICORN_THREADS', 1)))
+
+
+class PdfHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('Content-Length', str(len(PDF_BODY)))
+        self.end_headers()
+        self.wfile.write(PDF_BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_pdf_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PdfHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/order.pdf'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(config, port, env):
+    command = [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}']
+    for key, value in config.items():
+        command += [GUNICORN_FLAGS[key], value]
+    command.append('app:app')
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_healthy(base_url, server=None, timeout=60):
+    expires_at = time.monotonic() + timeout
+    while time.monotonic() < expires_at:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with status {server.returncode}')
+        try:
+            if requests.get(f'{base_url}/health', timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f'{base_url} did not become healthy within {timeout}s')
+
+
+def build_request(endpoint, number, pdf_url):
+    """(method, path, json body) of one generated request"""
+    if endpoint == 'fetch':
+        # Distinct cases, so the "not found" cache never short-cuts a scrape
+        return 'POST', '/api/fetch-case', {'caseType': 'W.P.(C)', 'caseNumber': str(random.randint(1, 10 ** 6)),
+                                           'filingYear': '2024'}
+    if endpoint == 'history':
+        return 'GET', '/api/query-history', None
+    return 'POST', '/api/download-pdf', {'pdfUrl': pdf_url, 'filename': f'loadtest-{os.getpid()}-{number}.pdf'}
+
+
+def is_success(endpoint, status):
+    # "Case not found" is a normal answer of the stub scraper, not a failure
+    return status is not None and (status < 400 or (endpoint == 'fetch' and status == 404))
+
+
+def run_load(base_url, rate, duration, mix, pdf_url, max_in_flight=512):
+    """
+    Send Poisson arrivals at `rate`/s for `duration` seconds
+
+    Returns:
+        tuple: (samples as (endpoint, latency, status or None on a client error), elapsed seconds)
+    """
+    endpoints, weights = zip(*mix.items())
+    sessions = threading.local()
+    samples = []
+    samples_lock = threading.Lock()
+
+    def send(endpoint, number, scheduled_at):
+        if not hasattr(sessions, 'http'):
+            sessions.http = requests.Session()
+        method, path, body = build_request(endpoint, number, pdf_url)
+        try:
+            status = sessions.http.request(method, base_url + path, json=body, timeout=CLIENT_TIMEOUT).status_code
+        except requests.RequestException:
+            status = None
+        with samples_lock:
+            samples.append((endpoint, time.monotonic() - scheduled_at, status))
+
+    started = time.monotonic()
+    next_at, number = started, 0
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        while next_at - started < duration:
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, random.choices(endpoints, weights)[0], number, next_at)
+            next_at += random.expovariate(rate)
+            number += 1
+    return samples, time.monotonic() - started
+
+
+def percentile(sorted_values, share):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * share))]
+
+
+def summarize(samples, elapsed, slots=None):
+    """p50/p95/p99, throughput and error rate per endpoint and overall, plus estimated saturation"""
+    groups = {'all': samples}
+    for endpoint, latency, status in samples:
+        groups.setdefault(endpoint, []).append((endpoint, latency, status))
+
+    summary = {}
+    for name, group in groups.items():
+        latencies = sorted(latency for _, latency, _ in group)
+        errors = sum(1 for endpoint, _, status in group if not is_success(endpoint, status))
+        statuses = {}
+        for _, _, status in group:
+            key = str(status) if status is not None else 'client_error'
+            statuses[key] = statuses.get(key, 0) + 1
+        summary[name] = {
+            'requests': len(group),
+            'throughput': round((len(group) - errors) / elapsed, 3) if elapsed else 0,
+            'errorRate': round(errors / len(group), 4) if group else 0,
+            'p50': round(percentile(latencies, 0.50), 3) if latencies else None,
+            'p95': round(percentile(latencies, 0.95), 3) if latencies else None,
+            'p99': round(percentile(latencies, 0.99), 3) if latencies else None,
+            'statuses': statuses
+        }
+    in_flight = sum(latency for _, latency, _ in samples) / elapsed if elapsed else 0
+    summary['all']['meanInFlight'] = round(in_flight, 2)
+    summary['all']['saturation'] = round(in_flight / slots, 3) if slots else None
+    return summary
+
+
+def report(label, summary):
+    overall = summary['all']
+    saturation = f"{overall['saturation']:.2f}" if overall['saturation'] is not None else 'n/a'
+    print(f'\n{label}: mean in flight {overall["meanInFlight"]}, worker saturation {saturation}')
+    print(f'  {"endpoint":<10} {"requests":>8} {"ok/s":>8} {"errors":>7} {"p50":>8} {"p95":>8} {"p99":>8}  statuses')
+    for name, stats in summary.items():
+        latencies = ' '.join(f'{stats[key]:>7.2f}s' if stats[key] is not None else f'{"-":>8}'
+                             for key in ('p50', 'p95', 'p99'))
+        print(f'  {name:<10} {stats["requests"]:>8} {stats["throughput"]:>8.2f} {stats["errorRate"]:>7.1%} {latencies}  '
+              + ' '.join(f'{status}={count}' for status, count in sorted(stats['statuses'].items())))
+
+
+def sweep_config(config, args, mix, pdf_url):
+    """Start gunicorn with one configuration on a scratch database, load it, and summarize"""
+    with tempfile.TemporaryDirectory() as scratch:
+        env = dict(os.environ,
+                   SCRAPER_BACKEND='stub',
+                   COURT_DB_PATH=os.path.join(scratch, 'court_data.db'),
+                   DOWNLOAD_DIR=scratch,
+                   JOB_WORKERS='0',
+                   # The stub is not the court site: measure the server, not the court's rate budget
+                   COURT_DELHI_HC_RATE_PER_MINUTE='0')
+        if args.stub_latency:
+            env['STUB_LATENCY'] = args.stub_latency
+        for extra in args.env:
+            env.update(extra)
+
+        port = free_port()
+        server = start_gunicorn(config, port, env)
+        try:
+            base_url = f'http://127.0.0.1:{port}'
+            wait_until_healthy(base_url, server)
+            samples, elapsed = run_load(base_url, args.rate, args.duration, mix, pdf_url)
+        finally:
+            server.terminate()
+            server.wait(30)
+    return summarize(samples, elapsed, config_slots(config))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the API across gunicorn configurations')
+    parser.add_argument('--config', action='append', type=parse_config, default=[],
+                        help='gunicorn settings to sweep, e.g. workers=4,worker_class=gthread,threads=8 (repeatable)')
+    parser.add_argument('--url', help='test an already running server instead of starting gunicorn')
+    parser.add_argument('--slots', type=int, help='request slots of the --url server, for the saturation estimate')
+    parser.add_argument('--rate', type=float, default=2.0, help='requests per second (default: 2)')
+    parser.add_argument('--duration', type=float, default=60, help='seconds of load per configuration (default: 60)')
+    parser.add_argument('--mix', type=lambda text: {key: float(value) for key, value in parse_pairs(text, 'mix').items()},
+                        default=DEFAULT_MIX, help=f'endpoint weights (default: {DEFAULT_MIX})')
+    parser.add_argument('--stub-latency', help='STUB_LATENCY of the stub scraper, e.g. lognormal:median=8,sigma=0.5')
+    parser.add_argument('--env', action='append', type=lambda text: parse_pairs(text, 'env'), default=[],
+                        help='extra environment for the started servers, e.g. SCRAPE_CAPACITY=4 (repeatable)')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    mix = args.mix
+    unknown = set(mix) - {'fetch', 'history', 'download'}
+    if unknown:
+        parser.error(f'Unknown endpoint(s) in --mix: {", ".join(sorted(unknown))}')
+
+    pdf_server, pdf_url = start_pdf_server()
+    results = []
+    try:
+        if args.url:
+            samples, elapsed = run_load(args.url.rstrip('/'), args.rate, args.duration, mix, pdf_url)
+            summary = summarize(samples, elapsed, args.slots)
+            report(args.url, summary)
+            results.append({'target': args.url, 'summary': summary})
+        else:
+            for config in args.config or [{}]:
+                summary = sweep_config(config, args, mix, pdf_url)
+                report(config_label(config), summary)
+                results.append({'config': config, 'summary': summary})
+    finally:
+        pdf_server.shutdown()
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump({'rate': args.rate, 'duration': args.duration, 'mix': mix, 'results': results}, json_file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Extract the text of order PDFs and index it for /api/orders/search.
+
+The latest order PDF of every stored case (its pdf_link) is downloaded to
+ORDER_PDF_DIR, and each download is hashed. Text is only extracted from content
+not seen before: the extraction runs with pypdf on a process pool, so
+CPU-heavy parsing never runs in the web app's request workers. A PDF whose
+content hash is already indexed (the same order linked from another case, or an
+unchanged file re-fetched with --recheck) just gets its source recorded. Results
+are written by this process alone, into order_documents (indexed by the
+order_search FTS5 table) and order_sources (case and order date of each link).
+
+Usage (run after lookups or bulk imports, e.g. from cron):
+    python order_index.py [--workers 4] [--recheck]
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import requests
+from pypdf import PdfReader
+
+from database import init_db, get_connection, to_iso_date
+from page_parser import read_latest_order_date, split_pages
+from scraper import USER_AGENT
+
+# Downloaded order PDFs, stored by content hash
+ORDER_PDF_DIR = os.environ.get('ORDER_PDF_DIR', 'orders')
+# Parallel PDF downloads (extraction parallelism is --workers)
+ORDER_DOWNLOAD_THREADS = int(os.environ.get('ORDER_DOWNLOAD_THREADS', 4))
+DOWNLOAD_TIMEOUT = 60
+
+
+def extract_pdf_text(path):
+    """Text and page count of a PDF (runs in a pool process)"""
+    reader = PdfReader(path)
+    pages = [page.extract_text() or '' for page in reader.pages]
+    return '\n'.join(pages).strip(), len(pages)
+
+
+def get_pending_orders(recheck=False):
+    """
+    Order PDF links of stored cases that are not indexed yet (all of them with recheck)
+
+    Returns:
+        list: (pdf_url, court, case_type, case_number, filing_year, order_date) tuples
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT c.pdf_link, c.court, c.case_type, c.case_number, c.filing_year, q.raw_response, c.last_date
+        FROM cases c
+        LEFT JOIN queries q ON q.id = c.last_query_id
+        WHERE c.pdf_link IS NOT NULL
+        {'' if recheck else 'AND c.pdf_link NOT IN (SELECT pdf_url FROM order_sources)'}
+    ''')
+    pending = []
+    for pdf_url, court, case_type, case_number, filing_year, raw_response, last_date in cursor.fetchall():
+        # The logged order listing's first row is the linked order
+        orders_html = split_pages(raw_response)[1]
+        order_date = to_iso_date(read_latest_order_date(orders_html)) if orders_html else None
+        pending.append((pdf_url, court, case_type, case_number, filing_year, order_date or last_date))
+    conn.close()
+    return pending
+
+
+def get_indexed_hashes():
+    conn = get_connection()
+    hashes = {row[0] for row in conn.execute('SELECT content_hash FROM order_documents')}
+    conn.close()
+    return hashes
+
+
+def download_pdf(pdf_url, directory=ORDER_PDF_DIR):
+    """Download a PDF to <directory>/<sha256>.pdf; returns (content hash, path)"""
+    digest = hashlib.sha256()
+    part_path = None
+    try:
+        with requests.get(pdf_url, stream=True, timeout=DOWNLOAD_TIMEOUT, headers={'User-Agent': USER_AGENT}) as response:
+            response.raise_for_status()
+            with tempfile.NamedTemporaryFile(dir=directory, suffix='.part', delete=False) as part_file:
+                part_path = part_file.name
+                for chunk in response.iter_content(chunk_size=65536):
+                    digest.update(chunk)
+                    part_file.write(chunk)
+        content_hash = digest.hexdigest()
+        path = os.path.join(directory, f'{content_hash}.pdf')
+        os.replace(part_path, path)
+        return content_hash, path
+    except Exception:
+        # A failed download leaves no partial file behind
+        if part_path is not None and os.path.exists(part_path):
+            os.unlink(part_path)
+        raise
+
+
+def store_document(cursor, content_hash, text, pages):
+    cursor.execute('''
+        INSERT OR IGNORE INTO order_documents (content_hash, text, pages, extracted_at) VALUES (?, ?, ?, ?)
+    ''', (content_hash, text, pages, datetime.now()))
+
+
+def store_source(cursor, source, content_hash):
+    pdf_url, court, case_type, case_number, filing_year, order_date = source
+    cursor.execute('''
+        INSERT INTO order_sources (pdf_url, court, case_type, case_number, filing_year, order_date, content_hash, fetched_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (pdf_url) DO UPDATE SET
+            court = excluded.court,
+            case_type = excluded.case_type,
+            case_number = excluded.case_number,
+            filing_year = excluded.filing_year,
+            order_date = excluded.order_date,
+            content_hash = excluded.content_hash,
+            fetched_at = excluded.fetched_at
+    ''', (pdf_url, court, case_type, case_number, filing_year, order_date, content_hash, datetime.now()))
+
+
+def run_index(workers=None, recheck=False):
+    init_db()
+    os.makedirs(ORDER_PDF_DIR, exist_ok=True)
+    pending = get_pending_orders(recheck)
+    if not pending:
+        print('No new order PDFs to index')
+        return {'downloaded': 0, 'extracted': 0, 'reused': 0, 'failed': 0}
+
+    indexed = get_indexed_hashes()
+    counts = {'downloaded': 0, 'extracted': 0, 'reused': 0, 'failed': 0}
+    waiting = {}  # content hash being extracted -> sources sharing it
+    started_at = time.time()
+    conn = get_connection()
+    cursor = conn.cursor()
+    print(f'{len(pending)} order PDF link(s) to check')
+
+    with ThreadPoolExecutor(max_workers=ORDER_DOWNLOAD_THREADS) as downloads, \
+            ProcessPoolExecutor(max_workers=workers) as extractors:
+        download_futures = {downloads.submit(download_pdf, source[0]): source for source in pending}
+        extraction_futures = {}
+        for future in as_completed(download_futures):
+            source = download_futures[future]
+            try:
+                content_hash, path = future.result()
+            except Exception as e:
+                counts['failed'] += 1
+                print(f'Download failed for {source[0]}: {e}')
+                continue
+            counts['downloaded'] += 1
+
+            if content_hash in indexed:
+                # Unchanged or duplicate content: nothing to parse
+                store_source(cursor, source, content_hash)
+                counts['reused'] += 1
+            elif content_hash in waiting:
+                waiting[content_hash].append(source)
+            else:
+                waiting[content_hash] = [source]
+                extraction_futures[extractors.submit(extract_pdf_text, path)] = content_hash
+        conn.commit()
+
+        for future in as_completed(extraction_futures):
+            content_hash = extraction_futures[future]
+            sources = waiting.pop(content_hash)
+            try:
+                text, pages = future.result()
+            except Exception as e:
+                counts['failed'] += len(sources)
+                print(f'Text extraction failed for {sources[0][0]}: {e}')
+                continue
+            store_document(cursor, content_hash, text, pages)
+            for source in sources:
+                store_source(cursor, source, content_hash)
+            conn.commit()
+            counts['extracted'] += 1
+
+    # Text of PDFs that changed under their link is no longer referenced by any source
+    cursor.execute('''
+        DELETE FROM order_documents
+        WHERE content_hash NOT IN (SELECT content_hash FROM order_sources WHERE content_hash IS NOT NULL)
+    ''')
+    conn.commit()
+    conn.close()
+
+    print(f"Indexed in {time.time() - started_at:.1f}s: {counts['downloaded']} downloaded, "
+          f"{counts['extracted']} extracted, {counts['reused']} unchanged/duplicate, {counts['failed']} failed")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract and index the text of order PDFs')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='text extraction processes (default: one per CPU)')
+    parser.add_argument('--recheck', action='store_true',
+                        help='download already indexed links again and re-extract those whose content changed')
+    args = parser.parse_args()
+
+    counts = run_index(args.workers, args.recheck)
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
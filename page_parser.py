@@ -0,0 +1,180 @@
+"""
+Browser-free parsing of the court's #caseTable pages from captured HTML.
+
+read_case_table_rows() returns the same row dicts as the scraper's
+READ_RESULT_ROWS_SCRIPT, so parse_result_row() works on either source.
+join_pages()/split_pages() store and take apart the results page and the order
+listing a lookup read, kept together as its raw_response.
+"""
+
+import re
+from html.parser import HTMLParser
+
+# Tags whose boundaries become line breaks in a cell's text (as with innerText)
+_LINE_BREAK_TAGS = {'br', 'p', 'div', 'li', 'tr'}
+_EMPTY_ROW_CLASSES = {'dataTables_empty', 'dt-empty'}
+# Where the order listing starts in a raw_response that holds both pages
+ORDER_LISTING_MARKER = '<!-- order listing -->'
+
+
+class CaseTableParser(HTMLParser):
+    """Collects the body rows of the table with the given id"""
+
+    def __init__(self, table_id='caseTable'):
+        super().__init__(convert_charrefs=True)
+        self.table_id = table_id
+        self.rows = []
+        self._table_depth = 0  # nesting level inside the target table, 0 when outside
+        self._in_body = False
+        self._row = None
+        self._cell = None
+        self._font = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'table':
+            if self._table_depth:
+                self._table_depth += 1
+            elif attrs.get('id') == self.table_id:
+                self._table_depth = 1
+            return
+        if not self._table_depth:
+            return
+
+        # Rows and cells of tables nested inside a cell are only text of that cell
+        structural = self._table_depth == 1
+        if structural and tag == 'tbody':
+            self._in_body = True
+        elif structural and tag == 'tr' and self._in_body:
+            self._row = {'cells': [], 'empty': False}
+        elif structural and tag == 'td' and self._row is not None:
+            self._cell = {'text': [], 'links': [], 'fonts': []}
+            if _EMPTY_ROW_CLASSES & set((attrs.get('class') or '').split()):
+                self._row['empty'] = True
+        elif self._cell is not None:
+            if tag == 'a' and attrs.get('href'):
+                self._cell['links'].append(attrs['href'])
+            elif tag == 'font':
+                self._font = {'color': attrs.get('color'), 'text': []}
+            if tag in _LINE_BREAK_TAGS:
+                self._cell['text'].append('\n')
+
+    def handle_endtag(self, tag):
+        if tag == 'table' and self._table_depth:
+            self._table_depth -= 1
+            return
+        if self._table_depth != 1:
+            return
+
+        if tag == 'tbody':
+            self._in_body = False
+        elif tag == 'tr' and self._row is not None:
+            self.rows.append(self._row)
+            self._row = None
+        elif tag == 'td' and self._cell is not None:
+            self._row['cells'].append(self._cell)
+            self._cell = None
+        elif tag == 'font' and self._font is not None and self._cell is not None:
+            self._cell['fonts'].append({'color': self._font['color'], 'text': _cell_text(self._font['text'])})
+            self._font = None
+        elif self._cell is not None and tag in _LINE_BREAK_TAGS:
+            self._cell['text'].append('\n')
+
+    def handle_data(self, data):
+        if self._cell is None:
+            return
+        # Source whitespace collapses to single spaces, as in rendered text
+        text = re.sub(r'\s+', ' ', data)
+        self._cell['text'].append(text)
+        if self._font is not None:
+            self._font['text'].append(text)
+
+
+def _cell_text(parts):
+    lines = (line.strip() for line in ''.join(parts).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def read_case_table_rows(html, table_id='caseTable'):
+    """
+    Read the rows of a results page
+
+    Returns:
+        list: {"cells": [cell texts], "status_font": str or None, "order_link": str or None}
+        per row, without DataTables' "no data" placeholder row
+    """
+    parser = CaseTableParser(table_id)
+    parser.feed(html or '')
+    parser.close()
+
+    rows = []
+    for row in parser.rows:
+        if row['empty']:
+            continue
+        cells = row['cells']
+        case_cell = cells[1] if len(cells) >= 2 else None
+        first_font = case_cell['fonts'][0] if case_cell and case_cell['fonts'] else None
+        rows.append({
+            'cells': [_cell_text(cell['text']) for cell in cells],
+            'status_font': first_font['text'] if first_font and first_font['color'] == 'green' else None,
+            'order_link': case_cell['links'][1] if case_cell and len(case_cell['links']) >= 2 else None
+        })
+    return rows
+
+
+def read_latest_order_link(html, table_id='caseTable'):
+    """Link of the first order on an order listing page, or None"""
+    parser = CaseTableParser(table_id)
+    parser.feed(html or '')
+    parser.close()
+
+    for row in parser.rows:
+        cells = row['cells']
+        if not row['empty'] and len(cells) >= 2 and cells[1]['links']:
+            return cells[1]['links'][0]
+    return None
+
+
+def read_latest_order_date(html, table_id='caseTable'):
+    """Date text of the first order on an order listing page (its third column), or None"""
+    parser = CaseTableParser(table_id)
+    parser.feed(html or '')
+    parser.close()
+
+    for row in parser.rows:
+        cells = row['cells']
+        if not row['empty'] and len(cells) >= 3:
+            return _cell_text(cells[2]['text']) or None
+    return None
+
+
+def is_case_result_row(row):
+    """Whether a row read by read_case_table_rows is a case on a results page (not an order)"""
+    cells = row['cells']
+    return len(cells) >= 4 and ('VS.' in cells[2] or 'NEXT DATE' in cells[3] or 'Last Date' in cells[3])
+
+
+def join_pages(results_html, orders_html=None):
+    """raw_response of a lookup: its results page, then its order listing when one was read"""
+    if not orders_html:
+        return results_html
+    if not results_html:
+        return orders_html
+    return f'{results_html}\n{ORDER_LISTING_MARKER}\n{orders_html}'
+
+
+def split_pages(raw_response):
+    """
+    (results page, order listing) of a raw_response, None for a page it does not hold
+
+    Responses logged before both pages were kept hold one of them, told apart by its rows
+    """
+    if not raw_response:
+        return None, None
+    if ORDER_LISTING_MARKER in raw_response:
+        results_html, orders_html = raw_response.split(ORDER_LISTING_MARKER, 1)
+        return results_html, orders_html
+    rows = read_case_table_rows(raw_response)
+    if rows and is_case_result_row(rows[0]):
+        return raw_response, None
+    return None, raw_response
@@ -0,0 +1,201 @@
+"""
+Opt-in profiling of single lookups.
+
+A profiled request samples the Python stack of its thread every
+PROFILE_INTERVAL_MS, times the scraper's stages and counts and times every
+WebDriver command (each one is a round trip to chromedriver; page loads are the
+"get" command). Two files are written per request to PROFILE_DIR:
+
+    <id>.collapsed   one "frame;frame;frame count" line per distinct stack,
+                     ready for flamegraph.pl or speedscope
+    <id>.json        stage and WebDriver command totals
+
+A request is profiled when its X-Profile header matches PROFILE_TOKEN, or at
+random for a PROFILE_SAMPLE_RATE share of requests. Otherwise nothing is hooked:
+the only cost is the header check, and stage() returns after one thread-local
+lookup.
+"""
+
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+# Where profiles are written
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+# Secret that enables profiling of a request sent with "X-Profile: <token>" (empty = header disabled)
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+# Share of requests profiled without the header
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+# Stack sampling interval of a profiled request
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+
+_current = threading.local()
+_sequence = 0
+_sequence_lock = threading.Lock()
+
+
+def should_profile(token=None):
+    """Whether to profile a request carrying this X-Profile header value"""
+    # Bytes: compare_digest rejects non-ASCII str, and a malformed header must not fail the request
+    if PROFILE_TOKEN and token and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode()):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def current_profile():
+    """The profile of the request running on this thread, or None"""
+    return getattr(_current, 'profile', None)
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f'{module}:{code.co_name}'
+
+
+class RequestProfile:
+    """Stack samples, stage timings and WebDriver command timings of one request"""
+
+    def __init__(self, name, interval=PROFILE_INTERVAL_MS / 1000):
+        global _sequence
+        with _sequence_lock:
+            _sequence += 1
+            sequence = _sequence
+        self.id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{sequence}-{name}"
+        self.name = name
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.samples = Counter()
+        self.stage = None
+        self.stages = {}
+        self.commands = {}
+        self.started = None
+        self.seconds = None
+        self.stopping = threading.Event()
+        self.sampler = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.sampler = threading.Thread(target=self._sample, name=f'profile-{self.id}', daemon=True)
+        self.sampler.start()
+
+    def stop(self):
+        self.seconds = time.perf_counter() - self.started
+        self.stopping.set()
+        self.sampler.join()
+
+    def _sample(self):
+        while not self.stopping.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.reverse()
+            # Samples are grouped under the scraper stage running at the time
+            root = [self.name] + ([f'stage:{self.stage}'] if self.stage else [])
+            self.samples[';'.join(root + stack)] += 1
+
+    def record_stage(self, stage, seconds):
+        totals = self.stages.setdefault(stage, {'count': 0, 'seconds': 0.0})
+        totals['count'] += 1
+        totals['seconds'] += seconds
+
+    def record_command(self, command, seconds):
+        totals = self.commands.setdefault(command, {'count': 0, 'seconds': 0.0, 'maxSeconds': 0.0})
+        totals['count'] += 1
+        totals['seconds'] += seconds
+        totals['maxSeconds'] = max(totals['maxSeconds'], seconds)
+
+    def summary(self):
+        commands = sorted(self.commands.items(), key=lambda item: item[1]['seconds'], reverse=True)
+        return {
+            'id': self.id,
+            'name': self.name,
+            'seconds': round(self.seconds, 4),
+            'samples': sum(self.samples.values()),
+            'intervalMs': self.interval * 1000,
+            'stages': {stage: {'count': totals['count'], 'seconds': round(totals['seconds'], 4)}
+                       for stage, totals in self.stages.items()},
+            'webdriverSeconds': round(sum(totals['seconds'] for totals in self.commands.values()), 4),
+            'webdriverCommands': [
+                {'command': command, 'count': totals['count'], 'seconds': round(totals['seconds'], 4),
+                 'maxSeconds': round(totals['maxSeconds'], 4)}
+                for command, totals in commands
+            ]
+        }
+
+    def write(self, directory=PROFILE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f'{self.id}.collapsed'), 'w') as collapsed_file:
+            for stack, count in self.samples.most_common():
+                collapsed_file.write(f'{stack} {count}\n')
+        with open(os.path.join(directory, f'{self.id}.json'), 'w') as summary_file:
+            json.dump(self.summary(), summary_file, indent=2)
+
+
+@contextmanager
+def profile_request(name, enabled=True):
+    """Profile the with-block on this thread; yields the profile, or None when not enabled"""
+    if not enabled:
+        yield None
+        return
+    profile = RequestProfile(name)
+    _current.profile = profile
+    profile.start()
+    try:
+        yield profile
+    finally:
+        profile.stop()
+        _current.profile = None
+        try:
+            profile.write()
+            summary = profile.summary()
+            print(f"Profile {profile.id}: {summary['seconds']:.2f}s, "
+                  f"{summary['webdriverSeconds']:.2f}s in WebDriver commands, written to {PROFILE_DIR}")
+        except OSError as e:
+            print(f'Could not write profile {profile.id}: {e}')
+
+
+@contextmanager
+def stage(name):
+    """Time a scraper stage in the current profile (no-op when this thread is not profiled)"""
+    profile = current_profile()
+    if profile is None:
+        yield
+        return
+    outer = profile.stage
+    profile.stage = name
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.record_stage(name, time.perf_counter() - started)
+        profile.stage = outer
+
+
+def instrument_driver(driver):
+    """Time the WebDriver commands of a driver created during a profiled request"""
+    if current_profile() is None:
+        return driver
+    execute = driver.execute
+
+    def timed_execute(driver_command, params=None):
+        started = time.perf_counter()
+        try:
+            return execute(driver_command, params)
+        finally:
+            # Recorded against whichever profiled request is using the driver now
+            profile = current_profile()
+            if profile is not None:
+                profile.record_command(driver_command, time.perf_counter() - started)
+
+    driver.execute = timed_execute
+    return driver
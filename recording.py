@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Record/replay archives of court-site traffic.
+
+In record mode the scraper stores every page it loads for a case (search form,
+results, order listing) and the latest order PDF in one gzip-compressed JSON
+archive per case. In replay mode those pages are served back to the browser
+from local files, so a scrape can be reproduced and profiled offline.
+
+Usage:
+    python recording.py list
+    python recording.py replay "ARB.P." 371 2024 [--pdf order.pdf]
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Directory holding one <case>.json.gz archive per recorded case
+RECORDINGS_DIR = os.environ.get('SCRAPE_RECORDINGS_DIR', 'recordings')
+
+
+class ReplayMissError(Exception):
+    """The recording has no exchange for a page the scraper asked for"""
+
+
+def recording_path(case_type, case_number, filing_year):
+    case_key = f'{case_type}|{case_number}|{filing_year}'
+    readable = re.sub(r'[^A-Za-z0-9]+', '_', case_key).strip('_')
+    # The hash keeps e.g. "W.P.(C)" and "W.P.C" apart after sanitising
+    digest = hashlib.sha1(case_key.encode('utf-8')).hexdigest()[:8]
+    return os.path.join(RECORDINGS_DIR, f'{readable}_{digest}.json.gz')
+
+
+class ScrapeRecorder:
+    """Collects the HTTP exchanges of one scrape and writes them as a single archive"""
+
+    def __init__(self, case_type, case_number, filing_year):
+        self.case = {'case_type': case_type, 'case_number': case_number, 'filing_year': filing_year}
+        self.exchanges = []
+
+    def record(self, stage, url, body, content_type='text/html', status=200):
+        if isinstance(body, bytes):
+            encoded, encoding = base64.b64encode(body).decode('ascii'), 'base64'
+        else:
+            encoded, encoding = body, 'text'
+        self.exchanges.append({
+            'stage': stage,
+            'url': url,
+            'status': status,
+            'content_type': content_type,
+            'encoding': encoding,
+            'body': encoded,
+            'recorded_at': time.time()
+        })
+
+    def save(self):
+        path = recording_path(self.case['case_type'], self.case['case_number'], self.case['filing_year'])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        archive = {'case': self.case, 'recorded_at': datetime.now().isoformat(), 'exchanges': self.exchanges}
+        # Write then rename so a crash never leaves a truncated archive behind
+        with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as archive_file:
+            json.dump(archive, archive_file)
+        os.replace(path + '.tmp', path)
+        return path
+
+
+class ScrapeReplay:
+    """Serves a recorded archive back to the browser as local file:// pages"""
+
+    def __init__(self, case_type, case_number, filing_year):
+        path = recording_path(case_type, case_number, filing_year)
+        if not os.path.exists(path):
+            raise ReplayMissError(f'No recording for {case_type}/{case_number}/{filing_year} at {path}')
+        with gzip.open(path, 'rt', encoding='utf-8') as archive_file:
+            self.archive = json.load(archive_file)
+        self.path = path
+        self.page_dir = tempfile.mkdtemp(prefix='court-replay-')
+
+    def get(self, stage=None, url=None):
+        """The last exchange recorded for a stage (or URL)"""
+        for exchange in reversed(self.archive['exchanges']):
+            if (stage is None or exchange['stage'] == stage) and (url is None or exchange['url'] == url):
+                return exchange
+        return None
+
+    def body(self, exchange):
+        if exchange['encoding'] == 'base64':
+            return base64.b64decode(exchange['body'])
+        return exchange['body']
+
+    def page_url(self, stage):
+        """file:// URL of the recorded page for a stage, with scripts removed"""
+        exchange = self.get(stage)
+        if exchange is None:
+            raise ReplayMissError(f'{self.path} has no recorded "{stage}" page')
+        # The snapshot is the rendered DOM; re-running its scripts would only hit the network
+        html = re.sub(r'<script\b[^>]*>.*?</script>', '', exchange['body'], flags=re.IGNORECASE | re.DOTALL)
+        page_path = os.path.join(self.page_dir, f'{stage}.html')
+        with open(page_path, 'w', encoding='utf-8') as page_file:
+            page_file.write(html)
+        return 'file://' + os.path.abspath(page_path)
+
+    def close(self):
+        shutil.rmtree(self.page_dir, ignore_errors=True)
+
+
+def list_recordings():
+    if not os.path.isdir(RECORDINGS_DIR):
+        return []
+    recordings = []
+    for filename in sorted(os.listdir(RECORDINGS_DIR)):
+        if not filename.endswith('.json.gz'):
+            continue
+        path = os.path.join(RECORDINGS_DIR, filename)
+        with gzip.open(path, 'rt', encoding='utf-8') as archive_file:
+            archive = json.load(archive_file)
+        recordings.append((path, archive['case'], archive['recorded_at'],
+                           [exchange['stage'] for exchange in archive['exchanges']], os.path.getsize(path)))
+    return recordings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect and replay recorded court-site scrapes')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='list recorded cases')
+    replay_parser = subparsers.add_parser('replay', help='re-run a recorded scrape offline')
+    replay_parser.add_argument('case_type')
+    replay_parser.add_argument('case_number')
+    replay_parser.add_argument('filing_year')
+    replay_parser.add_argument('--pdf', help='also write the recorded order PDF to this path')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for path, case, recorded_at, stages, size in list_recordings():
+            print(f"{case['case_type']}/{case['case_number']}/{case['filing_year']}  {recorded_at}  "
+                  f"{','.join(stages)}  {size} bytes  {path}")
+        return 0
+
+    from scraper import scrape_delhi_high_court
+
+    started = time.perf_counter()
+    parsed_data, raw_response = scrape_delhi_high_court(args.case_type, args.case_number, args.filing_year,
+                                                        headless=True, mode='replay')
+    print(json.dumps(parsed_data, indent=2))
+    print(f'Replayed in {time.perf_counter() - started:.2f}s', file=sys.stderr)
+
+    if args.pdf:
+        replay = ScrapeReplay(args.case_type, args.case_number, args.filing_year)
+        exchange = replay.get('pdf')
+        replay.close()
+        if exchange is None:
+            print('No PDF in this recording', file=sys.stderr)
+            return 1
+        with open(args.pdf, 'wb') as pdf_file:
+            pdf_file.write(replay.body(exchange))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Priority classes, most urgent first
+INTERACTIVE = 'interactive'
+API = 'api'
+BACKGROUND = 'background'
+PRIORITY_CLASSES = (INTERACTIVE, API, BACKGROUND)
+
+
+class QueueTimeout(Exception):
+    """No scrape slot became free in time"""
+
+
+def parse_weights(value):
+    """Parse "interactive=6,api=3,background=1" into {'interactive': 6.0, ...}"""
+    weights = {}
+    for part in (value or '').split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() in PRIORITY_CLASSES and weight.strip():
+            weights[name.strip()] = float(weight)
+    return weights
+
+
+class ScrapeScheduler:
+    """
+    Shares a fixed number of scrape slots (browser sessions) between priority classes.
+
+    Waiting scrapes are queued per class and served by weighted fair queuing:
+    each gets a virtual finish tag of max(virtual time, its class's last tag) +
+    1 / weight, and the free slot goes to the smallest tag. The last
+    `reserved_interactive` slots are only handed to interactive scrapes, so a
+    full batch queue can delay a person's lookup by at most one scrape.
+    """
+
+    DEFAULT_WEIGHTS = {INTERACTIVE: 6.0, API: 3.0, BACKGROUND: 1.0}
+
+    def __init__(self, capacity=2, weights=None, reserved_interactive=1, wait_samples=200):
+        self.capacity = max(1, capacity)
+        self.weights = dict(self.DEFAULT_WEIGHTS, **(weights or {}))
+        self.reserved_interactive = min(max(0, reserved_interactive), self.capacity - 1)
+
+        self.queues = {name: deque() for name in PRIORITY_CLASSES}
+        self.finish_tags = {name: 0.0 for name in PRIORITY_CLASSES}
+        self.virtual_time = 0.0
+        self.in_flight = {name: 0 for name in PRIORITY_CLASSES}
+        self.completed = {name: 0 for name in PRIORITY_CLASSES}
+        self.timeouts = {name: 0 for name in PRIORITY_CLASSES}
+        self.waits = {name: deque(maxlen=wait_samples) for name in PRIORITY_CLASSES}
+        self.condition = threading.Condition()
+
+    def _next_ticket(self):
+        """The queued ticket that may take a free slot now, or None"""
+        busy = sum(self.in_flight.values())
+        if busy >= self.capacity:
+            return None
+        candidates = [queue[0] for name, queue in self.queues.items()
+                      if queue and (name == INTERACTIVE or busy < self.capacity - self.reserved_interactive)]
+        return min(candidates, key=lambda ticket: ticket['tag'], default=None)
+
+    def acquire(self, priority=API, timeout=None):
+        """Take one scrape slot, waiting up to timeout seconds; raises QueueTimeout"""
+        priority = priority if priority in PRIORITY_CLASSES else API
+        queued_at = time.monotonic()
+        with self.condition:
+            tag = max(self.virtual_time, self.finish_tags[priority]) + 1.0 / self.weights[priority]
+            self.finish_tags[priority] = tag
+            ticket = {'class': priority, 'tag': tag}
+            self.queues[priority].append(ticket)
+
+            expires_at = queued_at + timeout if timeout is not None else None
+            while self._next_ticket() is not ticket:
+                remaining = expires_at - time.monotonic() if expires_at is not None else None
+                if remaining is not None and remaining <= 0:
+                    self.queues[priority].remove(ticket)
+                    self.timeouts[priority] += 1
+                    # Someone else may be eligible now that this ticket is gone
+                    self.condition.notify_all()
+                    raise QueueTimeout(f'No scrape slot free within {timeout:g}s')
+                self.condition.wait(remaining)
+
+            self.queues[priority].popleft()
+            self.virtual_time = tag
+            self.in_flight[priority] += 1
+            self.waits[priority].append(time.monotonic() - queued_at)
+            self.condition.notify_all()
+
+    def release(self, priority=API):
+        priority = priority if priority in PRIORITY_CLASSES else API
+        with self.condition:
+            self.in_flight[priority] -= 1
+            self.completed[priority] += 1
+            self.condition.notify_all()
+
+    @contextmanager
+    def slot(self, priority=API, timeout=None):
+        """Hold one scrape slot for the duration of the with-block"""
+        self.acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def idle_slots(self, priority=INTERACTIVE):
+        """Slots a scrape of this class could take: neither in use, already waited for nor reserved"""
+        reserved = 0 if priority == INTERACTIVE else self.reserved_interactive
+        with self.condition:
+            busy = sum(self.in_flight.values()) + sum(len(queue) for queue in self.queues.values())
+            return self.capacity - reserved - busy
+
+    def snapshot(self):
+        with self.condition:
+            classes = {}
+            for name in PRIORITY_CLASSES:
+                waits = sorted(self.waits[name])
+                classes[name] = {
+                    'weight': self.weights[name],
+                    'queued': len(self.queues[name]),
+                    'inFlight': self.in_flight[name],
+                    'completed': self.completed[name],
+                    'timeouts': self.timeouts[name],
+                    'waitP50': round(waits[len(waits) // 2], 3) if waits else None,
+                    'waitP95': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else None
+                }
+            return {
+                'capacity': self.capacity,
+                'reservedInteractive': self.reserved_interactive,
+                'classes': classes
+            }
+
+
+# Shared by every scrape started in this process (app routes, async engine, background refresh)
+scrape_scheduler = ScrapeScheduler(
+    capacity=int(os.environ.get('SCRAPE_CAPACITY', 2)),
+    weights=parse_weights(os.environ.get('SCRAPE_WEIGHTS')),
+    reserved_interactive=int(os.environ.get('SCRAPE_RESERVED_INTERACTIVE', 1))
+)
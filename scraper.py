@@ -12,6 +12,11 @@ import time
 import random
 import logging
 import os
+import requests
+from recording import ScrapeRecorder, ScrapeReplay
+from page_parser import read_case_table_rows, read_latest_order_link, join_pages
+from profiling import instrument_driver, stage as profile_stage
+from database import record_page_loads, DEFAULT_COURT
 from datetime import datetime
 import re
 
@@ -19,17 +24,296 @@ import re
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Case types offered by the court's search form, used until the live list is scraped
+DEFAULT_CASE_TYPES = [
+    'W.P.(C)', 'W.P.(CRL)', 'CRL.A.', 'CRL.M.C.', 'CRL.O.', 'CS(OS)', 'CS(COMM)', 'RFA',
+    'RFA(COMM)', 'FAO', 'FAO(OS)', 'LPA', 'MAT.', 'MAT.APP.', 'ARB.P.', 'O.M.P.',
+    'O.M.P. (COMM)', 'BAIL APPLN.', 'CONT.APP.(C)', 'CO.PET.', 'ITA', 'CUSAA', 'CUSTOM A.',
+    'VAT APPEAL', 'RERA APPEAL', 'DEATH SENTENCE REF.', 'LA.APP.', 'MAC.APP.', 'EX.P.',
+    'EX.F.A.', 'EX.S.A.', 'I.A.', 'CM(M)', 'C.O.', 'CO.APP.', 'CO.APPL.(C)', 'CO.APPL.(M)',
+    'TR.P.(C)', 'TR.P.(CRL.)', 'REVIEW PET.', 'C.R.P.', 'C.RULE', 'C.REF.(O)', 'O.REF.',
+    'ST.REF.', 'RC.REV.', 'RC.S.A.', 'RSA', 'SCA', 'SERTA', 'ST.APPL.', 'STC', 'SUR.T.REF.',
+    'TEST.CAS.', 'DEMO', 'ADMIN.REPORT', 'ARB.A.', 'ARB. A. (COMM.)', 'CA', 'CA (COMM.IPD-CR)',
+    'C.A.(COMM.IPD-GI)', 'C.A.(COMM.IPD-PAT)', 'C.A.(COMM.IPD-PV)', 'C.A.(COMM.IPD-TM)',
+    'CAVEAT(CO.)', 'CC(ARB.)', 'CCP(CO.)', 'CCP(REF)', 'CEAC', 'CEAR', 'CHAT.A.C.',
+    'CHAT.A.REF', 'CMI', 'CM(M)-IPD', 'CO.A(SB)', 'C.O.(COMM.IPD-CR)', 'C.O.(COMM.IPD-GI)',
+    'C.O.(COMM.IPD-PAT)', 'C.O. (COMM.IPD-TM)', 'CO.EX.', 'CONT.CAS(C)', 'CONT.CAS.(CRL)',
+    'CRL.L.P.', 'CRL.M.(CO.)', 'CRL.M.I.', 'CRL.O.(CO.)', 'CRL.REF.', 'CRL.REV.P.',
+    'CRL.REV.P.(MAT.)', 'CRL.REV.P.(NDPS)', 'CRL.REV.P.(NI)', 'CRP-IPD', 'CS(OS) GP',
+    'CUS.A.C.', 'CUS.A.R.', 'EDC', 'EDR', 'EFA(COMM)', 'EFA(OS)', 'EFA(OS)  (COMM)',
+    'EFA(OS)(IPD)', 'EL.PET.', 'ETR', 'FAO (COMM)', 'FAO-IPD', 'FAO(OS) (COMM)', 'FAO(OS)(IPD)',
+    'GCAC', 'GCAR', 'GTA', 'GTC', 'GTR', 'I.P.A.', 'ITC', 'ITR', 'ITSA', 'MAT.APP.(F.C.)',
+    'MAT.CASE', 'MAT.REF.', 'MISC. APPEAL(PMLA)', 'OA', 'OCJA', 'OMP (CONT.)', 'O.M.P. (E)',
+    'O.M.P. (E) (COMM.)', 'O.M.P.(EFA)(COMM.)', 'O.M.P. (ENF.)', 'OMP (ENF.) (COMM.)',
+    'O.M.P.(I)', 'O.M.P.(I) (COMM.)', 'O.M.P. (J) (COMM.)', 'O.M.P. (MISC.)',
+    'O.M.P.(MISC.)(COMM.)', 'O.M.P.(T)', 'O.M.P. (T) (COMM.)', 'RFA-IPD', 'RFA(OS)(COMM)',
+    'RF(OS)(IPD)', 'SDR', 'TR.P.(C.)', 'W.P.(C)-IPD', 'WP(C)(IPD)', 'WTA', 'WTC', 'WTR',
+]
+
+# raw_response returned by scrape_case when the court has no such case (distinct from errors)
+CASE_NOT_FOUND = "Case not found"
+
+# raw_response returned by scrape_case when its deadline ran out before any case data was read
+DEADLINE_EXCEEDED = "Deadline exceeded"
+
+# Optional stages are skipped when less than this many seconds of the deadline are left
+OPTIONAL_STAGE_MIN_SECONDS = float(os.environ.get('SCRAPE_OPTIONAL_STAGE_MIN_SECONDS', 6))
+
+# Attempts and backoff (seconds) per case scrape stage; a retry re-runs only the failed stage
+STAGE_RETRY_POLICIES = {
+    "form": {"attempts": 2, "backoff": 2},
+    "search": {"attempts": 2, "backoff": 1},
+    "results": {"attempts": 2, "backoff": 0},
+    "orders": {"attempts": 3, "backoff": 1},
+}
+
+# Filing years offered by the search form (current year back to 1951)
+DEFAULT_CASE_YEARS = [str(year) for year in range(datetime.now().year, 1950, -1)]
+
+# Browser identity, also sent by the HTTP-only requests of the async engine
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# The order listing page loads its rows from a server-side DataTables endpoint
+DATATABLES_AJAX_URL = re.compile(r"ajax:\s*\{\s*url:\s*'([^']+)'")
+HREF = re.compile(r'href="([^"]+)"')
+ORDER_LISTING_COLUMNS = ['DT_RowIndex', 'case_no_order_link', 'order_date.timestamp', 'corrigendum', 'hindi_order']
+ORDER_LISTING_TIMEOUT = 20
+
+# Read the browser's Navigation/Resource Timing after every court page load ("0" disables)
+SCRAPE_PAGE_TIMINGS = os.environ.get('SCRAPE_PAGE_TIMINGS', '1') != '0'
+# Subresources kept per page load, slowest first
+SLOWEST_RESOURCES = 10
+
+# Timing of the page just loaded, in ms: navigation phases plus its slowest subresources
+PAGE_TIMING_SCRIPT = """
+    const nav = performance.getEntriesByType('navigation')[0];
+    if (!nav) return null;
+    const resources = performance.getEntriesByType('resource');
+    return {
+        url: nav.name,
+        dns_ms: nav.domainLookupEnd - nav.domainLookupStart,
+        connect_ms: nav.connectEnd - nav.connectStart,
+        tls_ms: nav.secureConnectionStart > 0 ? nav.connectEnd - nav.secureConnectionStart : null,
+        ttfb_ms: nav.responseStart - nav.requestStart,
+        download_ms: nav.responseEnd - nav.responseStart,
+        dom_content_loaded_ms: nav.domContentLoadedEventEnd || null,
+        load_ms: nav.loadEventEnd || null,
+        transfer_bytes: resources.reduce((sum, entry) => sum + (entry.transferSize || 0), nav.transferSize || 0),
+        resource_count: resources.length,
+        slowest_resources: resources
+            .sort((a, b) => b.duration - a.duration)
+            .slice(0, arguments[0])
+            .map((entry) => ({
+                url: entry.name.split('?')[0],
+                initiator: entry.initiatorType,
+                duration_ms: entry.duration,
+                transfer_bytes: entry.transferSize || 0
+            }))
+    };
+"""
+
+# Case status search form (results are drawn into the same page)
+CASE_STATUS_URL = "https://delhihighcourt.nic.in/app/get-case-type-status"
+# Party-name search form (experimental: URL and form ids follow the case-type form, unverified on the live site)
+PARTY_SEARCH_URL = "https://delhihighcourt.nic.in/app/case-type-status-party"
+
+# Clicks the search form's own captcha refresh control, if it has one
+CAPTCHA_REFRESH_SCRIPT = """
+    const captcha = document.getElementById('captcha-code');
+    if (!captcha) return false;
+    const scope = captcha.closest('form') || document;
+    const control = Array.from(scope.querySelectorAll('a, button, i, img, span')).find((element) =>
+        /refresh|reload/i.test([element.id, element.getAttribute('class'), element.getAttribute('title'),
+                                element.getAttribute('onclick')].join(' ')));
+    if (!control) return false;
+    control.click();
+    return true;
+"""
+
+# Reads every row of the current #caseTable page in a single WebDriver round trip
+READ_RESULT_ROWS_SCRIPT = """
+    return Array.from(document.querySelectorAll('#caseTable tbody tr'))
+        .filter((row) => !row.querySelector('.dataTables_empty, .dt-empty'))
+        .map((row) => {
+            const cells = Array.from(row.querySelectorAll('td'));
+            const caseCell = cells[1];
+            const font = caseCell ? caseCell.querySelector('font') : null;
+            const links = caseCell ? caseCell.querySelectorAll('a') : [];
+            return {
+                cells: cells.map((cell) => cell.innerText),
+                status_font: font && font.getAttribute('color') === 'green' ? font.innerText : null,
+                order_link: links.length >= 2 ? links[1].href : null
+            };
+        });
+"""
+
+
+def parse_party_text(party_text):
+    """Split the "Petitioner VS. Respondent" cell text into both parties"""
+    parties = {"petitioner": "N/A", "respondent": "N/A"}
+    party_text = party_text.strip()
+    
+    # Handle the format: "AATMNIRBHAR INFRATECH PVT. LTD. AND ANR.\nVS.\nYASH PAL BATRA AND ORS."
+    if "VS." in party_text:
+        parts = party_text.split("VS.")
+        if len(parts) >= 2:
+            # Clean up any extra whitespace and newlines
+            parties["petitioner"] = parts[0].strip().replace('\n', ' ').strip()
+            parties["respondent"] = parts[1].strip().replace('\n', ' ').strip()
+    else:
+        parties["petitioner"] = party_text.replace('\n', ' ').strip()
+    
+    return parties
+
+
+def parse_date_text(date_text):
+    """Parse the date cell: "NEXT DATE: 11/08/2025\nLast Date: 13/05/2025\nCOURT NO:41" """
+    dates = {"filing_date": "N/A", "next_hearing": "N/A"}
+    date_text = date_text.strip()
+    
+    if date_text:
+        for line in date_text.split('\n'):
+            line = line.strip()
+            if line.startswith("NEXT DATE:"):
+                dates["next_hearing"] = line.replace("NEXT DATE:", "").strip()
+            elif line.startswith("Last Date:"):
+                dates["filing_date"] = line.replace("Last Date:", "").strip()
+            elif line.startswith("COURT NO:"):
+                dates["court_no"] = line.replace("COURT NO:", "").strip()
+    else:
+        dates["next_hearing"] = "No hearing date available"
+    
+    return dates
+
+
+def parse_case_status_text(case_text, status_font_text=None):
+    """Pick the status out of the case cell: green <font> text first, then a [STATUS] marker"""
+    if status_font_text is not None:
+        status = status_font_text.strip()
+        # Remove brackets if present
+        if status.startswith("[") and status.endswith("]"):
+            status = status[1:-1]
+        return status
+    
+    case_text = case_text.strip()
+    if "[" in case_text and "]" in case_text:
+        return case_text[case_text.find("[") + 1:case_text.find("]")]
+    return "Active"
+
+
+def parse_result_row(row):
+    """
+    Parse one result row read by READ_RESULT_ROWS_SCRIPT
+    
+    Args:
+        row (dict): {"cells": [cell texts], "status_font": str or None, "order_link": str or None}
+    
+    Returns:
+        dict: case, parties, dates, order_page_link and case_status of the row
+    """
+    cells = row.get("cells") or []
+    case_text = cells[1] if len(cells) >= 2 else ""
+    return {
+        "case": case_text.strip().split('\n')[0] if case_text.strip() else "N/A",
+        "parties": parse_party_text(cells[2]) if len(cells) >= 3 else {"petitioner": "N/A", "respondent": "N/A"},
+        "dates": parse_date_text(cells[3]) if len(cells) >= 4 else {"filing_date": "N/A", "next_hearing": "N/A"},
+        "order_page_link": row.get("order_link") or '#',
+        "case_status": parse_case_status_text(case_text, row.get("status_font")) if len(cells) >= 2 else "Pending"
+    }
+
+
+def order_listing_params(length=1):
+    """DataTables request for the first rows of an order listing, in the page's own order"""
+    params = {'draw': 1, 'start': 0, 'length': length, 'order[0][column]': 0, 'order[0][dir]': 'asc'}
+    for index, name in enumerate(ORDER_LISTING_COLUMNS):
+        params[f'columns[{index}][data]'] = name
+        params[f'columns[{index}][name]'] = name
+        params[f'columns[{index}][orderable]'] = 'true' if index else 'false'
+    return params
+
+
+def read_order_listing_link(listing):
+    """Link of the first order in a DataTables listing response, or None"""
+    rows = listing.get('data') or []
+    link = HREF.search(rows[0].get('case_no_order_link') or '') if rows else None
+    return link.group(1) if link else None
+
+
+def fetch_latest_order_link(order_page_link, cookies=None, timeout=ORDER_LISTING_TIMEOUT):
+    """Link of the latest order on an order listing page, over plain HTTP (no browser)"""
+    headers = {'User-Agent': USER_AGENT}
+    response = requests.get(order_page_link, cookies=cookies, headers=headers, timeout=timeout)
+    response.raise_for_status()
+
+    match = DATATABLES_AJAX_URL.search(response.text)
+    if match is None:
+        # Rows rendered into the page itself
+        return read_latest_order_link(response.text)
+
+    response = requests.get(match.group(1), params=order_listing_params(), cookies=cookies, timeout=timeout,
+                            headers={**headers, 'X-Requested-With': 'XMLHttpRequest', 'Referer': order_page_link})
+    response.raise_for_status()
+    return read_order_listing_link(response.json())
+
+
+class DeadlineExceeded(Exception):
+    """The scrape ran out of its time budget"""
+
+
+class StageFailed(Exception):
+    """A scrape stage finished without producing its result"""
+
+
+class Deadline:
+    """Time budget of one scrape, shared by all of its stages"""
+    
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+    
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    def expired(self):
+        return self.remaining() <= 0
+
+
 class DelhiHighCourtScraper:
     """
     Scraper class for Delhi High Court website - Production Ready
     """
     
-    def __init__(self, headless=True):
+    def __init__(self, headless=True, mode=None, deadline=None, session=False, fetch_orders=True, court=DEFAULT_COURT):
         self.headless = headless
+        # Court code the stored page timings are filed under
+        self.court = court
         self.driver = None
         self.wait = None
+        self.case_not_found = False
+        # Optional Deadline; every wait, sleep and page load is cut to what is left of it
+        self.deadline = deadline
+        self.skipped_stages = []
+        # Intermediate state of the current case scrape, kept across stage retries
+        self.checkpoint = {}
+        # Session mode keeps one browser (and its loaded search form) across scrape_case calls
+        self.session = session
+        self.last_captcha = None
+        self.pages_loaded = 0
+        self.cases_scraped = 0
+        self.form_reuses = 0
+        # With fetch_orders=False the orders stage is left to the caller (pdf_link stays '#'),
+        # which gets the browser's cookies for it in self.cookies
+        self.fetch_orders = fetch_orders
+        self.cookies = {}
+        # "record" archives every page of a case scrape, "replay" serves them back offline
+        self.mode = mode if mode is not None else os.environ.get('SCRAPE_MODE') or None
+        self.recorder = None
+        self.replay = None
+        # Timed page loads not stored yet, and the case they belong to
+        self.page_loads = []
+        self.current_case = None
         
-    def setup_driver(self):
+    def setup_driver(self, page_load_strategy=None):
         """Setup Chrome WebDriver with production-ready anti-detection measures"""
         try:
             chrome_options = Options()
@@ -49,21 +333,26 @@ class DelhiHighCourtScraper:
             chrome_options.add_argument('--disable-features=TranslateUI')
             chrome_options.add_argument('--disable-ipc-flooding-protection')
             chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+            chrome_options.add_argument(f'--user-agent={USER_AGENT}')
             chrome_options.add_argument('--disable-blink-features=AutomationControlled')
             chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
             chrome_options.add_experimental_option('useAutomationExtension', False)
             
             # Production-specific options for Render/Heroku
-            chrome_options.add_argument('--remote-debugging-port=9222')
+            # Any free DevTools port: several browsers run at once (pool workers, tabs, job workers)
+            chrome_options.add_argument('--remote-debugging-port=0')
             chrome_options.add_argument('--disable-web-security')
             chrome_options.add_argument('--allow-running-insecure-content')
             chrome_options.add_argument('--disable-features=VizDisplayCompositor')
             
+            if page_load_strategy:
+                # "none" makes driver.get return at once, for callers that poll pages themselves
+                chrome_options.page_load_strategy = page_load_strategy
+            
             # Use webdriver-manager to automatically download and manage Chrome driver
             # service = Service(ChromeDriverManager().install())
             
-            self.driver = webdriver.Chrome(options=chrome_options)
+            self.driver = instrument_driver(webdriver.Chrome(options=chrome_options))
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             self.wait = WebDriverWait(self.driver, 15)  # Increased timeout for production
             
@@ -74,34 +363,138 @@ class DelhiHighCourtScraper:
     
     def random_delay(self, min_seconds=1, max_seconds=3):
         """Add random delay to avoid detection (reduced for production)"""
+        if self.replay is not None:
+            # Nobody to hide from when replaying local recordings
+            return
         delay = random.uniform(min_seconds, max_seconds)
+        if self.deadline is not None:
+            # Never sleep away the time the remaining stages need
+            delay = min(delay, max(0.0, self.deadline.remaining() - OPTIONAL_STAGE_MIN_SECONDS))
         time.sleep(delay)
     
+    def check_deadline(self, stage):
+        if self.deadline is not None and self.deadline.expired():
+            raise DeadlineExceeded(f"Deadline of {self.deadline.seconds:g}s exceeded before {stage}")
+    
+    def wait_until(self, condition, timeout=15, stage="wait"):
+        """WebDriverWait for the condition, bounded by the remaining deadline"""
+        if self.deadline is None:
+            return WebDriverWait(self.driver, timeout).until(condition)
+        
+        self.check_deadline(stage)
+        remaining = self.deadline.remaining()
+        try:
+            return WebDriverWait(self.driver, min(timeout, remaining)).until(condition)
+        except TimeoutException:
+            # A wait cut short by the deadline says nothing about the page itself
+            if remaining < timeout:
+                raise DeadlineExceeded(f"Deadline of {self.deadline.seconds:g}s exceeded during {stage}")
+            raise
+    
+    def load_page(self, url, stage):
+        """driver.get the URL, or in replay mode the recorded page of that stage"""
+        if self.deadline is not None:
+            self.check_deadline(stage)
+            self.driver.set_page_load_timeout(max(1, self.deadline.remaining()))
+        self.pages_loaded += 1
+        try:
+            if self.replay is not None:
+                self.driver.get(self.replay.page_url(stage))
+            else:
+                started = time.perf_counter()
+                self.driver.get(url)
+                self.read_page_timing(stage, time.perf_counter() - started)
+        except TimeoutException:
+            if self.deadline is not None:
+                raise DeadlineExceeded(f"Deadline of {self.deadline.seconds:g}s exceeded loading {stage}")
+            raise
+    
+    def read_page_timing(self, stage, get_seconds):
+        """Keep the browser's timing of the page just loaded (stored by store_page_loads)"""
+        if not SCRAPE_PAGE_TIMINGS:
+            return
+        try:
+            timing = self.driver.execute_script(PAGE_TIMING_SCRIPT, SLOWEST_RESOURCES)
+        except WebDriverException as e:
+            logger.warning(f"Could not read page timing of {stage}: {e}")
+            return
+        if not timing:
+            return
+        # driver.get as seen from here: beyond the browser's own load time it is chromedriver and us
+        timing.update(stage=stage, get_ms=get_seconds * 1000, loaded_at=datetime.now(), case=self.current_case)
+        self.page_loads.append(timing)
+    
+    def store_page_loads(self):
+        """Write the timed page loads to the database (never fails the scrape)"""
+        if not self.page_loads:
+            return
+        page_loads, self.page_loads = self.page_loads, []
+        try:
+            record_page_loads(page_loads, self.court)
+        except Exception as e:
+            logger.warning(f"Could not store page timings: {e}")
+    
+    def record_page(self, stage):
+        """Add the currently loaded page to the recording (record mode only)"""
+        if self.recorder is not None:
+            self.recorder.record(stage, self.driver.current_url, self.driver.page_source)
+    
+    def record_pdf(self, pdf_link):
+        """Download the order PDF with the browser's cookies into the recording (record mode only)"""
+        if self.recorder is None or not pdf_link or pdf_link == '#':
+            return
+        try:
+            cookies = {cookie['name']: cookie['value'] for cookie in self.driver.get_cookies()}
+            response = requests.get(pdf_link, cookies=cookies, timeout=30)
+            self.recorder.record('pdf', pdf_link, response.content,
+                                 response.headers.get('Content-Type', 'application/pdf'), response.status_code)
+        except Exception as e:
+            logger.warning(f"Could not record order PDF: {e}")
+    
     def navigate_to_court_website(self):
         """Navigate to Delhi High Court website"""
         try:
             logger.info("Navigating to Delhi High Court website...")
             # Navigate directly to the case status page
-            self.driver.get("https://delhihighcourt.nic.in/app/get-case-type-status")
+            self.load_page(CASE_STATUS_URL, "form")
             self.random_delay(2, 4)
             
             # Wait for page to load and form to be present
-            self.wait.until(EC.presence_of_element_located((By.ID, "case_type")))
+            self.wait_until(EC.presence_of_element_located((By.ID, "case_type")), stage="form")
+            self.record_page("form")
             logger.info("Successfully loaded Delhi High Court case status page")
             
         except Exception as e:
             logger.error(f"Failed to navigate to court website: {e}")
             raise
     
+    def extract_search_form_options(self):
+        """Read the case type and filing year options from the loaded search form"""
+        try:
+            # One script call instead of a find_element round trip per <option>
+            options = self.driver.execute_script("""
+                const values = (id) => Array.from(document.querySelectorAll('#' + id + ' option'))
+                    .map((option) => option.value)
+                    .filter((value) => value.trim() !== '');
+                return {case_types: values('case_type'), years: values('case_year')};
+            """)
+            logger.info(f"Found {len(options['case_types'])} case types and {len(options['years'])} filing years")
+            return options
+        except Exception as e:
+            logger.error(f"Error reading search form options: {e}")
+            raise
+    
     def get_captcha_code(self):
         """Get the captcha code from the page"""
         try:
             # Wait for captcha to load
-            captcha_element = self.wait.until(EC.presence_of_element_located((By.ID, "captcha-code")))
+            captcha_element = self.wait_until(EC.presence_of_element_located((By.ID, "captcha-code")), stage="captcha")
             captcha_code = captcha_element.text.strip()
 
             logger.info(f"Captcha code found: {captcha_code}")
             return captcha_code
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error getting captcha code: {e}")
             return None
@@ -139,6 +532,7 @@ class DelhiHighCourtScraper:
                 captcha_input = self.driver.find_element(By.ID, "captchaInput")
                 captcha_input.clear()
                 captcha_input.send_keys(captcha_code)
+                self.last_captcha = captcha_code
                 logger.info(f"Filled captcha code: {captcha_code}")
                 self.random_delay(1, 2)
             else:
@@ -169,19 +563,28 @@ class DelhiHighCourtScraper:
             
             # Wait for results table to load
             try:
-                self.wait.until(EC.presence_of_element_located((By.ID, "caseTable")))
+                self.wait_until(EC.presence_of_element_located((By.ID, "caseTable")), stage="results")
                 logger.info("Results table found")
             except TimeoutException:
                 logger.warning("No results table found, case might not exist")
+                self.case_not_found = True
                 return None
             
+            # Captured once, so a failed read below never costs a new search
+            self.checkpoint["results_html"] = self.driver.page_source
+            
             # Check if case was found by looking for table rows
             table = self.driver.find_element(By.ID, "caseTable")
             tbody = table.find_element(By.TAG_NAME, "tbody")
             rows = tbody.find_elements(By.TAG_NAME, "tr")
             
+            # DataTables renders a single "No data available" row for empty results
+            if len(rows) == 1 and rows[0].find_elements(By.CSS_SELECTOR, ".dataTables_empty, .dt-empty"):
+                rows = []
+            
             if not rows:
                 logger.warning("No case data found in table")
+                self.case_not_found = True
                 return None
             
             # Extract case information from the table
@@ -197,7 +600,7 @@ class DelhiHighCourtScraper:
             
         except Exception as e:
             logger.error(f"Error extracting case data: {e}")
-            return None
+            raise
     
 
     def extract_parties_from_table(self, rows):
@@ -212,20 +615,7 @@ class DelhiHighCourtScraper:
                 
                 if len(cells) >= 3:  # Should have at least 3 columns
                     # The third column contains "Petitioner VS. Respondent"
-                    party_cell = cells[2]
-                    party_text = party_cell.text.strip()
-                    
-                    # Handle the format: "AATMNIRBHAR INFRATECH PVT. LTD. AND ANR.\nVS.\nYASH PAL BATRA AND ORS."
-                    if "VS." in party_text:
-                        parts = party_text.split("VS.")
-                        if len(parts) >= 2:
-                            petitioner = parts[0].strip()
-                            respondent = parts[1].strip()
-                            # Clean up any extra whitespace and newlines
-                            parties["petitioner"] = petitioner.replace('\n', ' ').strip()
-                            parties["respondent"] = respondent.replace('\n', ' ').strip()
-                    else:
-                        parties["petitioner"] = party_text.replace('\n', ' ').strip()
+                    parties = parse_party_text(cells[2].text)
             
             return parties
             
@@ -245,27 +635,7 @@ class DelhiHighCourtScraper:
                 cells = first_row.find_elements(By.TAG_NAME, "td")
                 
                 if len(cells) >= 4:  # Should have at least 4 columns
-                    # The fourth column contains "NEXT DATE: 11/08/2025\nLast Date: 13/05/2025\nCOURT NO:41"
-                    date_cell = cells[3]
-                    date_text = date_cell.text.strip()
-                    
-                    if date_text and date_text != "":
-                        # Parse the date information
-                        lines = date_text.split('\n')
-
-                        for line in lines:
-                            line = line.strip()
-                            if line.startswith("NEXT DATE:"):
-                                next_date = line.replace("NEXT DATE:", "").strip()
-                                dates["next_hearing"] = next_date
-                            elif line.startswith("Last Date:"):
-                                last_date = line.replace("Last Date:", "").strip()
-                                dates["filing_date"] = last_date
-                            elif line.startswith("COURT NO:"):
-                                court_no = line.replace("COURT NO:", "").strip()
-                                dates["court_no"] = court_no
-                    else:
-                        dates["next_hearing"] = "No hearing date available"
+                    dates = parse_date_text(cells[3].text)
             
             return dates
             
@@ -306,32 +676,43 @@ class DelhiHighCourtScraper:
 
         
     def get_latest_order_pdf_link(self, order_page_link):
-
+        """Extract order link, navigate, and get target link"""
         if order_page_link == '#':
             return '#'
         
-        """Extract order link, navigate, and get target link"""
+        if self.checkpoint.get("orders_html") is not None:
+            # The order page was already fetched by an earlier attempt
+            return read_latest_order_link(self.checkpoint["orders_html"]) or '#'
+        
+        logger.info("Getting latest order pdf link")
+        
+        form_window = None
+        if self.session:
+            # A separate tab keeps the search form loaded for the next case
+            form_window = self.driver.current_window_handle
+            self.driver.switch_to.new_window('tab')
         try:
-            logger.info("Getting latest order pdf link")
-
-            self.driver.get(order_page_link)
+            self.load_page(order_page_link, "orders")
 
             self.random_delay(1, 2)
 
             # Wait for page to load and form to be present
-            self.wait.until(EC.presence_of_element_located((By.ID, "caseTable")))
+            self.wait_until(EC.presence_of_element_located((By.ID, "caseTable")), stage="orders")
+            self.record_page("orders")
+            self.checkpoint["orders_html"] = self.driver.page_source
 
             target_link = self.driver.find_element(
                 By.XPATH, "//*[@id='caseTable']/tbody/tr[1]/td[2]/a"
             ).get_attribute("href")
 
             return target_link
-
-            
-
-        except Exception as e:
-            logger.error(f"Error extracting orders from table: {e}")
-            return '#'
+        finally:
+            if form_window is not None:
+                try:
+                    self.driver.close()
+                    self.driver.switch_to.window(form_window)
+                except WebDriverException as e:
+                    logger.warning(f"Could not return to the search form tab: {e}")
 
 
 
@@ -352,26 +733,15 @@ class DelhiHighCourtScraper:
                     case_cell = cells[1]
                     
                     # Look for status in font tag with green color
+                    status_font_text = None
                     try:
                         status_font = case_cell.find_element(By.TAG_NAME, "font")
                         if status_font and status_font.get_attribute("color") == "green":
-                            status = status_font.text.strip()
-                            # Remove brackets if present
-                            if status.startswith("[") and status.endswith("]"):
-                                status = status[1:-1]
-                            return status
+                            status_font_text = status_font.text
                     except NoSuchElementException:
                         pass
                     
-                    # Fallback: extract from text content
-                    case_text = case_cell.text.strip()
-                    if "[" in case_text and "]" in case_text:
-                        status_start = case_text.find("[") + 1
-                        status_end = case_text.find("]")
-                        status = case_text[status_start:status_end]
-                        return status
-                    else:
-                        return "Active"
+                    return parse_case_status_text(case_cell.text, status_font_text)
             
             return "Pending"
             
@@ -379,46 +749,318 @@ class DelhiHighCourtScraper:
             logger.error(f"Error extracting case status from table: {e}")
             return "Pending"
     
+    def run_stage(self, stage, step, *args):
+        """Run one stage of a case scrape, retrying only that stage per STAGE_RETRY_POLICIES"""
+        policy = STAGE_RETRY_POLICIES[stage]
+        for attempt in range(1, policy["attempts"] + 1):
+            try:
+                with profile_stage(stage):
+                    return step(*args)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                if attempt >= policy["attempts"]:
+                    raise
+                logger.warning(f"Stage {stage} failed (attempt {attempt}/{policy['attempts']}): {e}; retrying")
+                self.random_delay(policy["backoff"], policy["backoff"] * 2)
+    
+    def search_form_ready(self):
+        """Whether the browser still shows a usable search form (session mode)"""
+        try:
+            if not self.driver.current_url.startswith(CASE_STATUS_URL):
+                return False
+            return bool(self.driver.execute_script(
+                "return !!document.getElementById('case_type') && !!document.getElementById('captchaInput');"
+            ))
+        except WebDriverException as e:
+            # The browser itself is gone (crash, killed session): start a new one
+            logger.warning(f"Browser session lost, starting a new one: {e}")
+            self.close()
+            return False
+    
+    def refresh_captcha(self):
+        """Make sure the loaded form shows a captcha that was not used for the last search"""
+        current = self.get_captcha_code()
+        if current and current != self.last_captcha:
+            return True
+        if not self.driver.execute_script(CAPTCHA_REFRESH_SCRIPT):
+            return False
+        try:
+            self.wait_until(
+                lambda driver: driver.find_element(By.ID, "captcha-code").text.strip() not in ("", self.last_captcha),
+                timeout=5, stage="captcha"
+            )
+            return True
+        except TimeoutException:
+            return False
+    
+    def load_form_stage(self):
+        """Stage "form": a browser with the case status form loaded"""
+        if self.session and self.driver is not None and self.search_form_ready() and self.refresh_captcha():
+            # Reuse the form left by the previous search instead of reloading the page
+            logger.info("Reusing the loaded search form")
+            self.form_reuses += 1
+            self.checkpoint["form_loaded"] = True
+            return
+        if self.driver is None:
+            self.setup_driver()
+        self.navigate_to_court_website()
+        self.checkpoint["form_loaded"] = True
+    
+    def search_stage(self, case_type, case_number, filing_year):
+        """Stage "search": fill and submit the form, leaving the results page loaded"""
+        if self.replay is not None:
+            # The recorded results page stands in for filling and submitting the form
+            self.load_page(None, "results")
+            return
+        
+        if not self.checkpoint.get("form_loaded"):
+            # An earlier attempt already used up the form (and its captcha)
+            self.navigate_to_court_website()
+        # Rows of the previous search in this session must not be read as this one's
+        previous_rows = self.driver.find_elements(By.CSS_SELECTOR, "#caseTable tbody tr") if self.session else []
+        self.fill_case_search_form(case_type, case_number, filing_year)
+        self.checkpoint["form_loaded"] = False
+        if not self.submit_search_form():
+            raise StageFailed("Could not submit search form")
+        if previous_rows:
+            try:
+                self.wait_until(EC.staleness_of(previous_rows[0]), stage="search")
+            except TimeoutException:
+                raise StageFailed("Results of the previous search were not replaced")
+    
+    def results_stage(self):
+        """Stage "results": the case row, read live or from the captured results HTML"""
+        if self.checkpoint.get("results_html") is None:
+            case_data = self.extract_case_data()
+        else:
+            rows = read_case_table_rows(self.checkpoint["results_html"])
+            if not rows:
+                self.case_not_found = True
+                return None
+            row = parse_result_row(rows[0])
+            case_data = {key: row[key] for key in ("parties", "dates", "order_page_link", "case_status")}
+        
+        if case_data is None and not self.case_not_found:
+            raise StageFailed("No case data extracted")
+        return case_data
+    
     def scrape_case(self, case_type, case_number, filing_year):
         """Main method to scrape case information"""
+        pages_before = self.pages_loaded
         try:
             logger.info(f"Starting case scrape: {case_type}/{case_number}/{filing_year}")
+            self.current_case = (case_type, case_number, filing_year)
+            self.checkpoint = {"form_loaded": False, "results_html": None, "orders_html": None}
+            self.case_not_found = False
+            self.skipped_stages = []
             
-            # Setup driver
-            self.setup_driver()
-            
-            # Navigate to website
-            self.navigate_to_court_website()
-            
-            # Fill search form
-            self.fill_case_search_form(case_type, case_number, filing_year)
+            if self.mode == "record":
+                self.recorder = ScrapeRecorder(case_type, case_number, filing_year)
+            elif self.mode == "replay":
+                # Replay never falls back to mock data: a missing recording is an error
+                self.replay = ScrapeReplay(case_type, case_number, filing_year)
             
-            # Submit form
-            if not self.submit_search_form():
-                logger.warning("Could not submit search form, using mock data")
-                return self.create_mock_data(case_type, case_number, filing_year), "Mock data - submit failed"
-            
-            # Extract data
-            case_data = self.extract_case_data()
+            self.run_stage("form", self.load_form_stage)
+            self.run_stage("search", self.search_stage, case_type, case_number, filing_year)
+            case_data = self.run_stage("results", self.results_stage)
+            self.record_page("results")
             
             if case_data:
+                if not self.fetch_orders:
+                    self.cookies = {cookie['name']: cookie['value'] for cookie in self.driver.get_cookies()}
+                    pdf_link = '#'
+                elif self.deadline is not None and self.deadline.remaining() < OPTIONAL_STAGE_MIN_SECONDS:
+                    # Better a result without the order PDF than no result at all
+                    logger.warning("Deadline nearly used up, skipping latest order PDF link")
+                    self.skipped_stages.append("order_pdf_link")
+                    pdf_link = '#'
+                else:
+                    try:
+                        pdf_link = self.run_stage("orders", self.get_latest_order_pdf_link, case_data['order_page_link'])
+                        self.record_pdf(pdf_link)
+                    except DeadlineExceeded as e:
+                        logger.warning(f"Skipping latest order PDF link: {e}")
+                        self.skipped_stages.append("order_pdf_link")
+                        pdf_link = '#'
+                    except Exception as e:
+                        # The case itself was read; only the optional order lookup is lost
+                        logger.error(f"Error extracting orders from table: {e}")
+                        self.skipped_stages.append("order_pdf_link")
+                        pdf_link = '#'
+                
                 # Add case metadata
                 case_data.update({
                     "case_type": case_type,
                     "case_number": case_number,
-                    "pdf_link": self.get_latest_order_pdf_link(case_data['order_page_link'])
+                    "pdf_link": pdf_link
                 })
+                if self.skipped_stages:
+                    case_data["partial"] = True
+                    case_data["skipped_stages"] = list(self.skipped_stages)
 
                 logger.info("Case data extracted successfully")
                 
-                return case_data, self.driver.page_source
+                # Both pages are kept, so a parser fix can re-read parties, dates and status later
+                return case_data, join_pages(self.checkpoint["results_html"] or self.driver.page_source,
+                                             self.checkpoint["orders_html"])
             else:
-                logger.warning("No case data extracted, using mock data")
-                return self.create_mock_data(case_type, case_number, filing_year), "Mock data - extraction failed"
+                logger.warning("Case not found on court website")
+                return None, CASE_NOT_FOUND
                 
+        except DeadlineExceeded as e:
+            logger.warning(f"Case scrape abandoned: {e}")
+            return None, DEADLINE_EXCEEDED
         except Exception as e:
             logger.error(f"Error during case scraping: {e}")
+            if self.mode == "replay":
+                raise
             return self.create_mock_data(case_type, case_number, filing_year), f"Mock data - error: {str(e)}"
+        finally:
+            self.cases_scraped += 1
+            logger.info(f"Case scrape loaded {self.pages_loaded - pages_before} page(s)")
+            self.store_page_loads()
+            self.current_case = None
+            if not self.session:
+                self.close()
+            if self.recorder is not None:
+                logger.info(f"Recorded scrape to {self.recorder.save()}")
+                self.recorder = None
+            if self.replay is not None:
+                self.replay.close()
+                self.replay = None
+    
+    def close(self):
+        """Quit the browser (ends a session)"""
+        # Page loads outside case scrapes (party search, form options)
+        self.store_page_loads()
+        if self.driver:
+            try:
+                self.driver.quit()
+            except WebDriverException as e:
+                logger.warning(f"Error quitting browser: {e}")
+            self.driver = None
+    
+    def session_stats(self):
+        """Cases scraped and pages loaded so far by this scraper"""
+        return {
+            "cases": self.cases_scraped,
+            "pages_loaded": self.pages_loaded,
+            "pages_per_case": round(self.pages_loaded / self.cases_scraped, 2) if self.cases_scraped else None,
+            "form_reuses": self.form_reuses
+        }
+    
+    def navigate_to_party_search(self):
+        """Navigate to the Delhi High Court party-name search page"""
+        try:
+            logger.info("Navigating to Delhi High Court party search...")
+            self.load_page(PARTY_SEARCH_URL, "party form")
+            self.random_delay(2, 4)
+            
+            # Wait for page to load and form to be present
+            self.wait_until(EC.presence_of_element_located((By.ID, "party_name")), stage="party form")
+            logger.info("Successfully loaded Delhi High Court party search page")
+            
+        except Exception as e:
+            logger.error(f"Failed to navigate to party search page: {e}")
+            raise
+    
+    def fill_party_search_form(self, party_name, filing_year=None):
+        """Fill the party-name search form (filing year is optional)"""
+        try:
+            logger.info(f"Filling party search form: {party_name}/{filing_year or 'any year'}")
+            
+            party_input = self.driver.find_element(By.ID, "party_name")
+            party_input.clear()
+            party_input.send_keys(party_name)
+            self.random_delay(1, 2)
+            
+            if filing_year:
+                from selenium.webdriver.support.ui import Select
+                Select(self.driver.find_element(By.ID, "case_year")).select_by_value(filing_year)
+                self.random_delay(1, 2)
+            
+            captcha_code = self.get_captcha_code()
+            if captcha_code:
+                captcha_input = self.driver.find_element(By.ID, "captchaInput")
+                captcha_input.clear()
+                captcha_input.send_keys(captcha_code)
+            else:
+                logger.warning("Could not get captcha code")
+            
+        except Exception as e:
+            logger.error(f"Error filling party search form: {e}")
+            raise
+    
+    def read_result_rows(self):
+        """Read all rows of the current results page as plain dicts (one WebDriver call)"""
+        return self.driver.execute_script(READ_RESULT_ROWS_SCRIPT)
+    
+    def go_to_next_results_page(self):
+        """Advance the results table to its next page; returns False on the last page"""
+        # DataTables 2 renders a "next" paging button; older versions use #caseTable_next
+        next_buttons = self.driver.find_elements(
+            By.CSS_SELECTOR, "#caseTable_wrapper .dt-paging-button.next, #caseTable_next"
+        )
+        if not next_buttons:
+            return False
+        
+        next_button = next_buttons[0]
+        if "disabled" in (next_button.get_attribute("class") or ""):
+            return False
+        
+        first_row = self.driver.find_element(By.CSS_SELECTOR, "#caseTable tbody tr")
+        next_button.click()
+        # The old rows are replaced once the next page has been drawn
+        self.wait_until(EC.staleness_of(first_row), stage="next page")
+        self.wait_until(EC.presence_of_element_located((By.CSS_SELECTOR, "#caseTable tbody tr")), stage="next page")
+        return True
+    
+    def iter_party_search(self, party_name, filing_year=None, max_pages=None):
+        """
+        Search cases by party name and yield every parsed result row, page by page.
+        Only one results page is held in memory at a time; the browser is closed
+        when the generator is exhausted or closed early.
+        """
+        try:
+            logger.info(f"Starting party search: {party_name}/{filing_year or 'any year'}")
+            self.setup_driver()
+            self.navigate_to_party_search()
+            self.fill_party_search_form(party_name, filing_year)
+            
+            if not self.submit_search_form():
+                raise RuntimeError("Could not submit party search form")
+            
+            try:
+                self.wait_until(EC.presence_of_element_located((By.ID, "caseTable")), stage="party results")
+            except TimeoutException:
+                logger.warning("No results table found for party search")
+                return
+            
+            page = 1
+            while True:
+                for row in self.read_result_rows():
+                    yield parse_result_row(row)
+                
+                if max_pages and page >= max_pages:
+                    break
+                # Stop between pages rather than in the middle of one when time is running out
+                if self.deadline is not None and self.deadline.remaining() < OPTIONAL_STAGE_MIN_SECONDS:
+                    raise DeadlineExceeded(f"Deadline of {self.deadline.seconds:g}s reached after page {page}")
+                if not self.go_to_next_results_page():
+                    break
+                page += 1
+            
+            logger.info(f"Party search finished after {page} page(s)")
+        finally:
+            self.close()
+    
+    def scrape_case_metadata(self):
+        """Scrape the case types and filing years accepted by the search form"""
+        try:
+            self.setup_driver()
+            self.navigate_to_court_website()
+            return self.extract_search_form_options()
         finally:
             if self.driver:
                 self.driver.quit()
@@ -447,7 +1089,7 @@ class DelhiHighCourtScraper:
         }
 
 # Convenience function for external use
-def scrape_delhi_high_court(case_type, case_number, filing_year, headless=True):
+def scrape_delhi_high_court(case_type, case_number, filing_year, headless=True, mode=None, deadline=None):
     """
     Convenience function to scrape Delhi High Court case information
     
@@ -456,9 +1098,41 @@ def scrape_delhi_high_court(case_type, case_number, filing_year, headless=True):
         case_number (str): Case number
         filing_year (str): Filing year
         headless (bool): Run browser in headless mode (default: True for production)
+        mode (str): "record" or "replay" court-site traffic (default: SCRAPE_MODE env var)
+        deadline (Deadline): Time budget for the whole scrape (default: none)
     
     Returns:
-        tuple: (parsed_data, raw_response)
+        tuple: (parsed_data, raw_response); raw_response is DEADLINE_EXCEEDED when
+        the budget ran out before the case was read
     """
-    scraper = DelhiHighCourtScraper(headless=headless)
+    scraper = DelhiHighCourtScraper(headless=headless, mode=mode, deadline=deadline)
     return scraper.scrape_case(case_type, case_number, filing_year)
+
+
+def fetch_case_metadata(headless=True):
+    """
+    Scrape the case type and filing year options from the Delhi High Court search form
+    
+    Returns:
+        dict: {"case_types": [...], "years": [...]}
+    """
+    scraper = DelhiHighCourtScraper(headless=headless)
+    return scraper.scrape_case_metadata()
+
+
+def search_delhi_high_court_by_party(party_name, filing_year=None, max_pages=None, headless=True, deadline=None):
+    """
+    Generator over the parsed result rows of a party-name search (experimental)
+    
+    Args:
+        party_name (str): Petitioner or respondent name
+        filing_year (str): Optional filing year filter
+        max_pages (int): Stop after this many result pages (default: all)
+        headless (bool): Run browser in headless mode (default: True for production)
+        deadline (Deadline): Optional time budget; DeadlineExceeded is raised when it runs out
+    
+    Yields:
+        dict: case, parties, dates, order_page_link and case_status of one result row
+    """
+    scraper = DelhiHighCourtScraper(headless=headless, deadline=deadline)
+    return scraper.iter_party_search(party_name, filing_year, max_pages)
@@ -4,13 +4,17 @@ const Api = {
         try {
             const response = await fetch(url, {
                 method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
+                // The page's session cookie gets these lookups the scraper's interactive lane
+                headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify(body)
             });
             
             if (!response.ok) {
+                // Validation and "case not found" errors carry a message worth showing
+                const body = await response.json().catch(() => null);
+                if (body && body.error) {
+                    return body;
+                }
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
 
@@ -47,12 +51,19 @@ const searchHistory = document.getElementById('searchHistory');
 const loadingOverlay = document.getElementById('loadingOverlay');
 const errorModal = document.getElementById('errorModal');
 const errorMessage = document.getElementById('errorMessage');
+const partySearchForm = document.getElementById('partySearchForm');
+const partyResults = document.getElementById('partyResults');
+const partySearchStatus = document.getElementById('partySearchStatus');
 
 // Event listeners
 document.addEventListener('DOMContentLoaded', function() {
     loadSearchHistory();
     
     caseSearchForm.addEventListener('submit', handleCaseSearch);
+    // The party search form is only rendered when PARTY_SEARCH_ENABLED is set
+    if (partySearchForm) {
+        partySearchForm.addEventListener('submit', handlePartySearch);
+    }
 });
 
 // Handle case search form submission
@@ -82,7 +93,7 @@ async function handleCaseSearch(event) {
         console.log('response ------ ' , response.data)
         
         if (response.success) {
-            displayCaseResults(response.data);
+            displayCaseResults(response.data, response);
             loadSearchHistory(); // Refresh history
         } else {
             showError(response.error || 'Failed to fetch case data.');
@@ -95,7 +106,21 @@ async function handleCaseSearch(event) {
     }
 }
 
-function displayCaseResults(data) {
+function displayCaseResults(data, meta = {}) {
+    // Served from storage while the court website is unavailable
+    const staleHtml = meta.stale ? `
+        <div class="stale-notice">
+            <i class="fas fa-exclamation-triangle"></i> ${meta.message} Last fetched: ${formatTimestamp(meta.fetchedAt)}
+        </div>
+    ` : '';
+
+    // The scrape ran short of time and skipped the latest order lookup
+    const partialHtml = data.partial ? `
+        <div class="stale-notice">
+            <i class="fas fa-exclamation-triangle"></i> The court website was slow; the latest order could not be fetched this time.
+        </div>
+    ` : '';
+
     const caseInfoHtml = `
         <div class="case-info">
             <h4><i class="fas fa-info-circle"></i> Case Information</h4>
@@ -160,13 +185,98 @@ function displayCaseResults(data) {
     ` : ''}
     `;
     
-    caseDetails.innerHTML = caseInfoHtml + ordersHtml;
+    caseDetails.innerHTML = staleHtml + partialHtml + caseInfoHtml + ordersHtml;
     resultsSection.style.display = 'block';
     
     resultsSection.scrollIntoView({ behavior: 'smooth' });
 }
 
 
+// Handle party search: results arrive as newline-delimited JSON, one row per line
+async function handlePartySearch(event) {
+    event.preventDefault();
+
+    const formData = new FormData(partySearchForm);
+    const searchData = {
+        partyName: (formData.get('partyName') || '').trim(),
+        filingYear: formData.get('partyFilingYear')
+    };
+
+    if (searchData.partyName.length < 3) {
+        showError('Please enter at least 3 characters of the party name.');
+        return;
+    }
+
+    partyResults.innerHTML = '';
+    partySearchStatus.textContent = 'Searching court records...';
+    let count = 0;
+
+    try {
+        const response = await fetch('/api/search-party', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(searchData)
+        });
+
+        if (!response.ok) {
+            const body = await response.json().catch(() => null);
+            throw new Error((body && body.error) || `HTTP error! status: ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffered += decoder.decode(value, { stream: true });
+            const lines = buffered.split('\n');
+            buffered = lines.pop();
+
+            for (const line of lines) {
+                if (!line.trim()) continue;
+                const item = JSON.parse(line);
+
+                if (item.error) {
+                    throw new Error(item.error);
+                } else if (item.done) {
+                    partySearchStatus.textContent = item.partial
+                        ? `${item.count} matching case(s) before the time limit; narrow the search for more`
+                        : `${item.count} matching case(s)`;
+                } else {
+                    count += 1;
+                    appendPartyResult(item);
+                    partySearchStatus.textContent = `${count} matching case(s) so far...`;
+                }
+            }
+        }
+    } catch (error) {
+        partySearchStatus.textContent = `${count} matching case(s) before the search stopped`;
+        showError(error.message || 'Network error. Please try again.');
+        console.error('Party search error:', error);
+    }
+}
+
+function appendPartyResult(item) {
+    const element = document.createElement('div');
+    element.className = 'history-item';
+    // Scraped court text goes in as text, never as markup
+    const lines = [
+        ['history-case', item.case || 'N/A'],
+        ['history-details', `${item.parties?.petitioner || 'N/A'} vs. ${item.parties?.respondent || 'N/A'}`],
+        ['history-details', `Status: ${item.case_status || 'N/A'} | Next hearing: ${item.dates?.next_hearing || 'N/A'}`],
+    ];
+    for (const [className, text] of lines) {
+        const line = document.createElement('div');
+        line.className = className;
+        line.textContent = text;
+        element.appendChild(line);
+    }
+    partyResults.appendChild(element);
+}
+
 // Load search history
 async function loadSearchHistory() {
     try {
@@ -219,7 +329,7 @@ async function loadHistoryItem(caseType, caseNumber, filingYear) {
 
         
         if (response.success) {
-            displayCaseResults(response.data);
+            displayCaseResults(response.data, response);
             // Scroll to results section
             document.getElementById('resultsSection').scrollIntoView({ behavior: 'smooth' });
         } else {
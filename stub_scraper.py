@@ -0,0 +1,91 @@
+"""
+Browser-free stand-in for the court scrapers, for load tests (SCRAPER_BACKEND=stub).
+
+StubScraper.scrape_case() has the same contract as DelhiHighCourtScraper's but
+only sleeps for a latency drawn from STUB_LATENCY and returns a synthetic case,
+so the web stack can be driven at full rate without Chrome or the court site.
+
+STUB_LATENCY takes "<distribution>:<param>=<value>,...":
+    fixed:seconds=3
+    uniform:low=2,high=6
+    exponential:mean=5
+    lognormal:median=8,sigma=0.5   (the default; long-tailed like the real site)
+"""
+
+import math
+import os
+import random
+import time
+
+from scraper import CASE_NOT_FOUND, DEADLINE_EXCEEDED
+
+# Latency distribution of one stub scrape
+STUB_LATENCY = os.environ.get('STUB_LATENCY', 'lognormal:median=8,sigma=0.5')
+# Share of stub scrapes answering "case not found" / failing with mock data
+STUB_NOT_FOUND_RATE = float(os.environ.get('STUB_NOT_FOUND_RATE', 0.05))
+STUB_ERROR_RATE = float(os.environ.get('STUB_ERROR_RATE', 0.0))
+
+LATENCY_DISTRIBUTIONS = {
+    'fixed': lambda p: lambda: p['seconds'],
+    'uniform': lambda p: lambda: random.uniform(p['low'], p['high']),
+    'exponential': lambda p: lambda: random.expovariate(1 / p['mean']),
+    'lognormal': lambda p: lambda: random.lognormvariate(math.log(p['median']), p['sigma']),
+}
+
+
+def parse_latency(spec):
+    """Turn a STUB_LATENCY spec into a function returning one latency in seconds"""
+    name, _, params = spec.partition(':')
+    if name not in LATENCY_DISTRIBUTIONS:
+        raise ValueError(f'Unknown latency distribution: {name}')
+    values = {}
+    for part in params.split(','):
+        key, _, value = part.partition('=')
+        if key.strip():
+            values[key.strip()] = float(value)
+    try:
+        return LATENCY_DISTRIBUTIONS[name](values)
+    except KeyError as e:
+        raise ValueError(f'{name} latency needs {e.args[0]}') from None
+
+
+class StubScraper:
+    """Sleeps like a scrape and answers with a synthetic case"""
+
+    def __init__(self, deadline=None, latency=None, not_found_rate=STUB_NOT_FOUND_RATE, error_rate=STUB_ERROR_RATE):
+        self.deadline = deadline
+        self.latency = latency or parse_latency(STUB_LATENCY)
+        self.not_found_rate = not_found_rate
+        self.error_rate = error_rate
+        self.cookies = None
+
+    def scrape_case(self, case_type, case_number, filing_year):
+        latency = self.latency()
+        if self.deadline is not None and latency > self.deadline.remaining():
+            time.sleep(max(0, self.deadline.remaining()))
+            return None, DEADLINE_EXCEEDED
+        time.sleep(latency)
+
+        draw = random.random()
+        if draw < self.not_found_rate:
+            return None, CASE_NOT_FOUND
+        if draw < self.not_found_rate + self.error_rate:
+            return self.create_mock_data(case_type, case_number, filing_year), "Mock data - error: stub failure"
+        return {
+            "parties": {"petitioner": f"Stub Petitioner {case_number}", "respondent": "Stub Respondent"},
+            "dates": {"filing_date": f"15/01/{filing_year}", "next_hearing": "20/12/2030", "court_no": "1"},
+            "case_status": "Pending",
+            "order_page_link": "#",
+            "pdf_link": "#",
+            "case_type": case_type,
+            "case_number": case_number
+        }, f"<html><!-- stub scrape of {case_type} {case_number}/{filing_year} --></html>"
+
+    def create_mock_data(self, case_type, case_number, filing_year):
+        return {
+            "parties": {"petitioner": "Sample Petitioner", "respondent": "Sample Respondent"},
+            "dates": {},
+            "case_status": "Pending",
+            "case_type": case_type,
+            "case_number": case_number
+        }
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Scrape several cases concurrently in the tabs of a single Chrome instance.
+
+WebDriver executes one command at a time against the active tab, so each case
+runs as a generator that only issues short, non-blocking commands (pages are
+loaded with page_load_strategy "none") and yields while it waits for the site.
+A round-robin loop switches window_handles and advances each case one step;
+the pages of all tabs load and render in parallel inside the one browser.
+
+Usage (benchmark, reports memory per concurrent scrape):
+    python tab_scraper.py cases.csv --tabs 4
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+from selenium.common.exceptions import TimeoutException
+
+from database import is_mock_response
+from page_parser import read_case_table_rows, read_latest_order_link
+from scraper import DelhiHighCourtScraper, parse_result_row, CASE_NOT_FOUND, CASE_STATUS_URL
+
+logger = logging.getLogger(__name__)
+
+# Concurrent searches per browser
+TABS_PER_BROWSER = int(os.environ.get('SCRAPE_TABS_PER_BROWSER', 4))
+# Pause between scheduler rounds when no tab had anything to do
+POLL_INTERVAL = 0.2
+# Same per-wait timeout as the single-tab scraper
+WAIT_TIMEOUT = 15
+
+# Set before each navigation so the ready checks never match the page being left
+MARK_LEAVING_SCRIPT = "window.__tabScrapeLeaving = true;"
+
+FORM_READY_SCRIPT = """
+    if (window.__tabScrapeLeaving || document.readyState === 'loading') return false;
+    const captcha = document.getElementById('captcha-code');
+    return !!document.getElementById('case_type') && !!captcha && captcha.innerText.trim() !== '';
+"""
+
+# Fills and submits the form in one round trip; returns the captcha used (null if none yet)
+FILL_AND_SUBMIT_SCRIPT = """
+    const [caseType, caseNumber, caseYear] = arguments;
+    const code = document.getElementById('captcha-code').innerText.trim();
+    if (!code) return null;
+    const setValue = (id, value) => {
+        const field = document.getElementById(id);
+        field.value = value;
+        field.dispatchEvent(new Event('input', {bubbles: true}));
+        field.dispatchEvent(new Event('change', {bubbles: true}));
+    };
+    setValue('case_type', caseType);
+    setValue('case_number', caseNumber);
+    setValue('case_year', caseYear);
+    setValue('captchaInput', code);
+    document.querySelectorAll('#caseTable tbody tr').forEach((row) => { row.dataset.beforeSearch = '1'; });
+    document.getElementById('search').click();
+    return code;
+"""
+
+# Rows drawn after the search was submitted (DataTables' empty row counts too)
+RESULTS_READY_SCRIPT = """
+    const processing = document.querySelector('#caseTable_processing, .dt-processing');
+    if (processing && processing.offsetParent !== null) return false;
+    const rows = document.querySelectorAll('#caseTable tbody tr');
+    return rows.length > 0 && !rows[0].dataset.beforeSearch;
+"""
+
+ORDERS_READY_SCRIPT = """
+    if (window.__tabScrapeLeaving || document.readyState === 'loading') return false;
+    return !!document.querySelector('#caseTable tbody tr');
+"""
+
+
+def _wait_for(driver, script, stage, *args):
+    """Yield until the script returns true in the current tab"""
+    expires_at = time.monotonic() + WAIT_TIMEOUT
+    while not driver.execute_script(script, *args):
+        if time.monotonic() >= expires_at:
+            raise TimeoutException(f"Timed out waiting for {stage}")
+        yield
+
+
+def _pause(seconds):
+    """The tab equivalent of random_delay: other tabs keep working meanwhile"""
+    resume_at = time.monotonic() + seconds
+    while time.monotonic() < resume_at:
+        yield
+
+
+def _navigate(driver, url, stats):
+    driver.execute_script(MARK_LEAVING_SCRIPT)
+    driver.get(url)
+    stats['pages_loaded'] += 1
+
+
+def scrape_case_steps(driver, case_type, case_number, filing_year, stats):
+    """
+    One case scrape as a generator; the caller switches to its tab before each step
+
+    Returns (via StopIteration): (parsed_data, raw_response) as scrape_case does
+    """
+    _navigate(driver, CASE_STATUS_URL, stats)
+    yield from _wait_for(driver, FORM_READY_SCRIPT, "search form")
+    yield from _pause(random.uniform(1, 2))
+
+    if driver.execute_script(FILL_AND_SUBMIT_SCRIPT, case_type, case_number, filing_year) is None:
+        raise RuntimeError("Could not get captcha code")
+    try:
+        yield from _wait_for(driver, RESULTS_READY_SCRIPT, "results")
+    except TimeoutException:
+        return None, CASE_NOT_FOUND
+
+    results_html = driver.page_source
+    rows = read_case_table_rows(results_html)
+    if not rows:
+        return None, CASE_NOT_FOUND
+    row = parse_result_row(rows[0])
+    case_data = {key: row[key] for key in ("parties", "dates", "order_page_link", "case_status")}
+
+    pdf_link, raw_response = '#', results_html
+    if case_data["order_page_link"] != '#':
+        _navigate(driver, case_data["order_page_link"], stats)
+        try:
+            yield from _wait_for(driver, ORDERS_READY_SCRIPT, "orders")
+            raw_response = driver.page_source
+            pdf_link = read_latest_order_link(raw_response) or '#'
+        except TimeoutException as e:
+            logger.warning(f"Skipping latest order PDF link: {e}")
+            case_data["partial"] = True
+            case_data["skipped_stages"] = ["order_pdf_link"]
+
+    case_data.update({"case_type": case_type, "case_number": case_number, "pdf_link": pdf_link})
+    return case_data, raw_response
+
+
+def scrape_cases_in_tabs(cases, tabs=TABS_PER_BROWSER, headless=True, on_round=None):
+    """
+    Scrape (case_type, case_number, filing_year) tuples, up to `tabs` at a time in one browser
+
+    Yields:
+        tuple: (case, parsed_data, raw_response, pages_loaded) in completion order
+    """
+    scraper = DelhiHighCourtScraper(headless=headless)
+    scraper.setup_driver(page_load_strategy="none")
+    driver = scraper.driver
+    try:
+        free_tabs = [driver.current_window_handle]
+        while len(free_tabs) < tabs:
+            driver.switch_to.new_window('tab')
+            free_tabs.append(driver.current_window_handle)
+
+        pending = iter(cases)
+        active = {}  # window handle -> (case, generator, stats)
+        while True:
+            while free_tabs:
+                case = next(pending, None)
+                if case is None:
+                    break
+                handle = free_tabs.pop()
+                driver.switch_to.window(handle)
+                stats = {'pages_loaded': 0}
+                active[handle] = (case, scrape_case_steps(driver, *case, stats), stats)
+            if not active:
+                break
+
+            for handle, (case, steps, stats) in list(active.items()):
+                driver.switch_to.window(handle)
+                try:
+                    next(steps)
+                    continue
+                except StopIteration as finished:
+                    parsed_data, raw_response = finished.value
+                except Exception as e:
+                    logger.error(f"Error during case scraping in tab: {e}")
+                    parsed_data, raw_response = scraper.create_mock_data(*case), f"Mock data - error: {str(e)}"
+                del active[handle]
+                free_tabs.append(handle)
+                yield case, parsed_data, raw_response, stats['pages_loaded']
+
+            if on_round is not None:
+                on_round(driver)
+            time.sleep(POLL_INTERVAL)
+    finally:
+        scraper.close()
+
+
+def _child_pids(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as stat_file:
+                # The command name may contain spaces; the parent pid follows the closing parenthesis
+                fields = stat_file.read().rsplit(')', 1)[1].split()
+            if int(fields[1]) == pid:
+                children.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+
+def _memory_kb(pid, field):
+    path = f'/proc/{pid}/smaps_rollup' if field == 'Pss' else f'/proc/{pid}/status'
+    key = 'Pss:' if field == 'Pss' else 'VmRSS:'
+    try:
+        with open(path) as proc_file:
+            for line in proc_file:
+                if line.startswith(key):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def process_tree_memory(root_pid):
+    """(RSS, PSS) in kB of a process and all of its descendants, read from /proc"""
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(_child_pids(pid))
+    return sum(_memory_kb(pid, 'VmRSS') for pid in pids), sum(_memory_kb(pid, 'Pss') for pid in pids)
+
+
+def main():
+    from bulk_import import read_cases
+
+    parser = argparse.ArgumentParser(description='Benchmark concurrent case scrapes in the tabs of one browser')
+    parser.add_argument('csv_path', help='CSV with case_type, case_number, filing_year columns')
+    parser.add_argument('--tabs', type=int, default=TABS_PER_BROWSER,
+                        help=f'concurrent searches in the browser (default: {TABS_PER_BROWSER})')
+    args = parser.parse_args()
+
+    cases = [(case_type, case_number, filing_year) for _, case_type, case_number, filing_year in read_cases(args.csv_path)]
+    peak = {'rss': 0, 'pss': 0}
+
+    def sample(driver):
+        # chromedriver's process tree holds the browser and all of its helper processes
+        rss, pss = process_tree_memory(driver.service.process.pid)
+        peak['rss'], peak['pss'] = max(peak['rss'], rss), max(peak['pss'], pss)
+
+    started = time.perf_counter()
+    outcomes = {}
+    for case, parsed_data, raw_response, _ in scrape_cases_in_tabs(cases, tabs=args.tabs, on_round=sample):
+        if raw_response == CASE_NOT_FOUND:
+            outcome = 'not_found'
+        elif parsed_data is None or is_mock_response(raw_response):
+            outcome = 'failed'
+        else:
+            outcome = 'ok'
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    elapsed = time.perf_counter() - started
+
+    concurrent = min(args.tabs, len(cases)) or 1
+    print(f'{len(cases)} case(s) with {args.tabs} tab(s) in {elapsed:.1f}s '
+          f'({len(cases) / elapsed * 60 if elapsed else 0:.1f} cases/min): '
+          + ', '.join(f'{outcome}={count}' for outcome, count in sorted(outcomes.items())))
+    print(f'Peak browser memory: RSS {peak["rss"] / 1024:.0f} MB, PSS {peak["pss"] / 1024:.0f} MB; '
+          f'per concurrent scrape: RSS {peak["rss"] / 1024 / concurrent:.0f} MB, '
+          f'PSS {peak["pss"] / 1024 / concurrent:.0f} MB')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
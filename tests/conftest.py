@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The modules live at the repository root; they read these at import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('COURT_DB_PATH', os.path.join(tempfile.mkdtemp(), 'court_data.db'))
+os.environ['JOB_WORKERS'] = '0'
+
+import database  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh, initialized database for one test"""
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'court_data.db'))
+    database.init_db()
+    return database
@@ -0,0 +1,35 @@
+import pytest
+from flask import session
+
+from scheduler import INTERACTIVE, API, BACKGROUND
+
+
+@pytest.fixture
+def app(db):
+    import app as app_module
+    return app_module
+
+
+@pytest.mark.parametrize('web_ui, header, expected', [
+    (False, None, API),
+    (True, None, INTERACTIVE),
+    # The header can only lower the class decided by the server
+    (False, INTERACTIVE, API),
+    (False, BACKGROUND, BACKGROUND),
+    (True, API, API),
+    (True, BACKGROUND, BACKGROUND),
+    (True, 'urgent', INTERACTIVE),
+])
+def test_request_priority(app, web_ui, header, expected):
+    headers = {'X-Scrape-Priority': header} if header else {}
+    with app.app.test_request_context('/api/fetch-case', method='POST', headers=headers):
+        if web_ui:
+            session['web_ui'] = True
+        assert app.request_priority() == expected
+
+
+def test_web_ui_session_is_set_by_the_page(app):
+    client = app.app.test_client()
+    client.get('/')
+    with client.session_transaction() as stored:
+        assert stored.get('web_ui')
@@ -0,0 +1,58 @@
+import json
+
+from backfill import reparse_row
+from page_parser import join_pages
+
+RESULTS_HTML = '''
+<table id="caseTable"><tbody><tr>
+  <td>1</td>
+  <td>W.P.(C) - 1/2024<br><font color="green">[DISPOSED]</font>
+      <a href="https://example.org/case">Case</a> <a href="https://example.org/orders/1">Orders</a></td>
+  <td>ACME LTD.<br>VS.<br>STATE</td>
+  <td>NEXT DATE: 11/08/2025<br>Last Date: 13/05/2025<br>COURT NO:41</td>
+</tr></tbody></table>
+'''
+
+ORDERS_HTML = '''
+<table id="caseTable"><tbody><tr>
+  <td>1</td>
+  <td><a href="https://example.org/order.pdf">W.P.(C) 1/2024</a></td>
+  <td>01/08/2025</td>
+</tr></tbody></table>
+'''
+
+STORED = json.dumps({
+    'case': 'W.P.(C) - 1/2024',
+    'parties': {'petitioner': 'N/A', 'respondent': 'N/A'},
+    'dates': {'filing_date': 'N/A', 'next_hearing': 'N/A'},
+    'order_page_link': '#',
+    'case_status': 'Pending',
+    'pdf_link': '#'
+})
+
+
+def test_both_pages_are_parsed_again():
+    parsed = reparse_row(join_pages(RESULTS_HTML, ORDERS_HTML), STORED)
+    assert parsed['parties'] == {'petitioner': 'ACME LTD.', 'respondent': 'STATE'}
+    assert parsed['dates'] == {'filing_date': '13/05/2025', 'next_hearing': '11/08/2025', 'court_no': '41'}
+    assert parsed['order_page_link'] == 'https://example.org/orders/1'
+    assert parsed['case_status'] == 'DISPOSED'
+    assert parsed['pdf_link'] == 'https://example.org/order.pdf'
+    assert parsed['case'] == 'W.P.(C) - 1/2024'
+
+
+def test_responses_holding_one_page():
+    # Rows logged before both pages were kept: told apart by their rows
+    parsed = reparse_row(RESULTS_HTML, STORED)
+    assert parsed['parties']['petitioner'] == 'ACME LTD.'
+    assert parsed['pdf_link'] == '#'
+
+    parsed = reparse_row(ORDERS_HTML, STORED)
+    assert parsed['pdf_link'] == 'https://example.org/order.pdf'
+    assert parsed['parties']['petitioner'] == 'N/A'
+
+
+def test_nothing_to_reparse():
+    assert reparse_row('Mock data - scraping failed', STORED) is None
+    assert reparse_row(RESULTS_HTML, 'not json') is None
+    assert reparse_row('<html>no table</html>', STORED) is None
@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+
+from exports import hearings_ics, local_to_utc
+
+
+def hearing(**values):
+    row = {
+        'court': 'delhi_hc', 'case_type': 'W.P.(C)', 'case_number': '1', 'filing_year': '2024',
+        'petitioner': 'ACME LTD.', 'respondent': 'STATE', 'case_status': 'Pending',
+        'next_hearing': '2026-10-22', 'last_date': None, 'court_no': '41', 'pdf_link': None,
+        'updated_at': '2026-10-19 10:00:00'
+    }
+    row.update(values)
+    return row
+
+
+def feed_lines(rows, **kwargs):
+    return ''.join(hearings_ics(rows, **kwargs)).split('\r\n')
+
+
+def test_uid_is_stable_per_case_and_date():
+    lines = feed_lines([hearing(), hearing(updated_at='2026-10-20 09:00:00'), hearing(next_hearing='2026-11-05')])
+    uids = [line for line in lines if line.startswith('UID:')]
+    assert uids == [
+        'UID:W-P--C--1-2024-20261022@court-scraper',
+        'UID:W-P--C--1-2024-20261022@court-scraper',
+        'UID:W-P--C--1-2024-20261105@court-scraper'
+    ]
+
+
+def test_dtstamp_is_updated_at_in_utc():
+    expected = datetime(2026, 10, 19, 10, 0).astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    lines = feed_lines([hearing()])
+    assert f'DTSTAMP:{expected}' in lines
+
+    # A row without a usable timestamp is stamped now, still in UTC
+    stamp = next(line for line in feed_lines([hearing(updated_at=None)]) if line.startswith('DTSTAMP:'))
+    assert stamp.endswith('Z') and len(stamp) == len('DTSTAMP:20261019T043000Z')
+
+
+def test_location_and_calendar_name_come_from_the_court():
+    lines = feed_lines([hearing()], calendar_name='Delhi High Court hearings',
+                       court_names={'delhi_hc': 'Delhi High Court'})
+    assert 'X-WR-CALNAME:Delhi High Court hearings' in lines
+    assert 'LOCATION:Delhi High Court\\, Court No. 41' in lines
+
+
+def test_local_to_utc():
+    assert local_to_utc(None) is None
+    assert local_to_utc('not a date') is None
+    stamp = local_to_utc('2026-10-19 10:00:00')
+    assert stamp.tzinfo is timezone.utc
+    assert stamp == datetime(2026, 10, 19, 10, 0).astimezone()
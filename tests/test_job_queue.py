@@ -0,0 +1,51 @@
+import job_queue
+from scheduler import INTERACTIVE, BACKGROUND
+
+
+def test_expired_lease_is_claimed_again(db):
+    job_id, created = job_queue.enqueue_job('W.P.(C)', '1', '2024')
+    assert created
+    assert job_queue.enqueue_job('W.P.(C)', '1', '2024') == (job_id, False)
+
+    # A negative lease has already run out when the next worker looks
+    job = job_queue.claim_job('worker-a', lease_seconds=-1)
+    assert (job['id'], job['attempts']) == (job_id, 1)
+    job = job_queue.claim_job('worker-b')
+    assert (job['id'], job['attempts'], job['lease_owner']) == (job_id, 2, 'worker-b')
+
+    # The first worker lost its lease and can no longer finish the job
+    assert not job_queue.complete_job(job_id, 'worker-a', 'done', result={'case': 'x'})
+    assert job_queue.complete_job(job_id, 'worker-b', 'done', result={'case': 'x'})
+    assert job_queue.get_job(job_id)['status'] == 'done'
+
+
+def test_retry_until_attempts_run_out(db):
+    job_id, _ = job_queue.enqueue_job('W.P.(C)', '2', '2024', max_attempts=2)
+
+    job_queue.claim_job('worker')
+    assert job_queue.retry_job(job_id, 'worker', 'timeout')
+    assert job_queue.get_job(job_id)['status'] == 'queued'
+
+    assert job_queue.claim_job('worker')['attempts'] == 2
+    assert job_queue.retry_job(job_id, 'worker', 'timeout')
+    job = job_queue.get_job(job_id)
+    assert (job['status'], job['error']) == ('failed', 'timeout')
+    assert job_queue.claim_job('worker') is None
+
+
+def test_expired_lease_on_last_attempt_fails_the_job(db):
+    job_id, _ = job_queue.enqueue_job('W.P.(C)', '3', '2024', max_attempts=1)
+    job_queue.claim_job('worker', lease_seconds=-1)
+
+    assert job_queue.claim_job('worker') is None
+    job = job_queue.get_job(job_id)
+    assert (job['status'], job['error']) == ('failed', 'Lease expired')
+
+
+def test_claim_only_the_given_classes(db):
+    background_id, _ = job_queue.enqueue_job('W.P.(C)', '4', '2024', priority=BACKGROUND)
+    interactive_id, _ = job_queue.enqueue_job('W.P.(C)', '5', '2024', priority=INTERACTIVE)
+
+    assert job_queue.claim_job('worker', priorities=[BACKGROUND])['id'] == background_id
+    assert job_queue.claim_job('worker', priorities=[BACKGROUND]) is None
+    assert job_queue.claim_job('worker')['id'] == interactive_id
@@ -0,0 +1,16 @@
+import pytest
+
+
+def test_reserve_keeps_tokens_back(db):
+    # 60 per minute: one token a second, starting full at burst=2
+    assert db.take_rate_token('court', 60, burst=2, reserve=1) == 0
+    # One token left: a reserve=1 caller waits for a second one, a reserve=0 caller takes it
+    assert db.take_rate_token('court', 60, burst=2, reserve=1) == pytest.approx(1, abs=0.1)
+    assert db.take_rate_token('court', 60, burst=2, reserve=0) == 0
+    assert db.take_rate_token('court', 60, burst=2, reserve=0) == pytest.approx(1, abs=0.1)
+
+
+def test_buckets_are_per_name(db):
+    assert db.take_rate_token('first', 60) == 0
+    assert db.take_rate_token('first', 60) > 0
+    assert db.take_rate_token('second', 60) == 0
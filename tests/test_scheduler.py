@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+from scheduler import ScrapeScheduler, QueueTimeout, INTERACTIVE, API, BACKGROUND
+
+
+def wait_until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not met in time'
+        time.sleep(0.01)
+
+
+def test_free_slot_goes_to_smallest_finish_tag():
+    scheduler = ScrapeScheduler(capacity=1, reserved_interactive=0)
+    scheduler.acquire(API)
+    order = []
+
+    def lookup(priority):
+        with scheduler.slot(priority, timeout=2):
+            order.append(priority)
+
+    threads = []
+    # Queued lowest class first, so arrival order alone would give the wrong answer
+    for priority in (BACKGROUND, API, INTERACTIVE):
+        thread = threading.Thread(target=lookup, args=(priority,))
+        thread.start()
+        threads.append(thread)
+        wait_until(lambda: len(scheduler.queues[priority]) == 1)
+
+    scheduler.release(API)
+    for thread in threads:
+        thread.join(2)
+    assert order == [INTERACTIVE, API, BACKGROUND]
+
+
+def test_reserved_slot_is_only_for_interactive():
+    scheduler = ScrapeScheduler(capacity=2, reserved_interactive=1)
+    scheduler.acquire(BACKGROUND)
+    assert scheduler.idle_slots(BACKGROUND) == 0
+    assert scheduler.idle_slots(INTERACTIVE) == 1
+
+    with pytest.raises(QueueTimeout):
+        scheduler.acquire(API, timeout=0.05)
+    assert scheduler.snapshot()['classes'][API]['timeouts'] == 1
+
+    scheduler.acquire(INTERACTIVE, timeout=0.05)
+    assert scheduler.idle_slots(INTERACTIVE) == 0
+
+
+def test_timed_out_ticket_leaves_the_queue():
+    scheduler = ScrapeScheduler(capacity=1, reserved_interactive=0)
+    scheduler.acquire(API)
+    with pytest.raises(QueueTimeout):
+        scheduler.acquire(BACKGROUND, timeout=0.05)
+    assert not scheduler.queues[BACKGROUND]
+
+    scheduler.release(API)
+    scheduler.acquire(BACKGROUND, timeout=0.05)